@@ -1,10 +1,78 @@
-import json 
+import asyncio
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pipeline import process_user_input
+from fastapi.responses import JSONResponse, PlainTextResponse
+import inicializacao
+import metrics
+import protocolo
+from services.status_service import StatusPoller, default_source
+from executor import STAGES, shutdown_stages
 
-app = FastAPI()
+# FAQ, rotas, LLM e pipeline carregam em segundo plano depois que a porta abre
+# (inicializacao.py); até o /readyz ficar pronto, nada aqui os importa no event loop
+status_poller: StatusPoller | None = None
+
+
+def _iniciar_poller():
+    global status_poller
+    from services import rota_service
+    # Consulta de status das linhas em segundo plano (não bloqueia o start do servidor)
+    status_poller = StatusPoller(default_source(), rota_service.atualizar_status)
+    status_poller.start()
+
+
+def _de(modulo: str, ler):
+    # Leitura do /metrics que sai sem amostras enquanto o módulo não carregou
+    def leitura():
+        m = inicializacao.carregado(modulo)
+        return ler(m) if m is not None else None
+    return leitura
+
+
+# Leituras do /metrics: os mesmos números do /status, lidos na hora da coleta
+metrics.Leitura("ceci_subsistema_pronto", "Subsistemas carregados e aquecidos (inicializacao.py).",
+                lambda: {(nome,): int(sub.estado == "pronto") for nome, sub in inicializacao.SUBSISTEMAS.items()},
+                ("subsistema",))
+metrics.Leitura("ceci_ws_conexoes", "Conexões WebSocket abertas.",
+                lambda: protocolo.stats()["conexoes_abertas"])
+metrics.Leitura("ceci_ws_em_andamento", "Respostas em andamento nos WebSockets.",
+                lambda: protocolo.stats()["em_andamento"])
+metrics.Leitura("ceci_ws_mensagens_total", "Mensagens do WebSocket por resultado (recebidas, canceladas, recusadas).",
+                lambda: {(k,): protocolo.stats()[k] for k in ("mensagens", "canceladas", "recusadas")},
+                ("resultado",), "counter")
+metrics.Leitura("ceci_llm_em_uso", "Streams da LLM abertos.", _de("llm", lambda llm: llm.CLIENTE.em_uso))
+metrics.Leitura("ceci_llm_esperando", "Streams esperando vaga na LLM.", _de("llm", lambda llm: llm.CLIENTE.esperando))
+metrics.Leitura("ceci_llm_retentativas_total", "Novas tentativas de requisições à LLM.",
+                _de("llm", lambda llm: llm.CLIENTE.retentativas), tipo="counter")
+metrics.Leitura("ceci_executor_pendentes", "Tarefas na fila ou rodando por estágio do executor.",
+                lambda: {(nome,): stage.pendentes for nome, stage in STAGES.items()}, ("estagio",))
+metrics.Leitura("ceci_executor_recusadas_total", "Tarefas recusadas (fila cheia) por estágio do executor.",
+                lambda: {(nome,): stage.recusadas for nome, stage in STAGES.items()}, ("estagio",), "counter")
+metrics.Leitura("ceci_llm_cache_total", "Consultas ao llm_cache por intent e resultado.",
+                _de("llm_cache", lambda llm_cache: {(intent, r): c[r]
+                                                    for intent, c in llm_cache.stats()["intencoes"].items()
+                                                    for r in ("acertos", "acertos_semanticos", "faltas")}),
+                ("intent", "resultado"), "counter")
+metrics.Leitura("ceci_cache_rotas_total", "Consultas ao cache de rotas por resultado.",
+                _de("services.rota_service", lambda rota: {(k,): rota.cache_stats()[k] for k in ("hits", "misses")}),
+                ("resultado",), "counter")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carga e aquecimento dos subsistemas; o StatusPoller liga assim que o motor de rotas existe
+    subida = asyncio.create_task(inicializacao.iniciar({"rota": _iniciar_poller}))
+    yield
+    subida.cancel()
+    if status_poller is not None:
+        await status_poller.stop()
+    llm = inicializacao.carregado("llm")
+    if llm is not None:
+        await llm.CLIENTE.aclose()
+    shutdown_stages()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,16 +82,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/healthz")
+async def healthz():
+    # Vivo enquanto o event loop responde; falha na subida pede um restart
+    return JSONResponse(inicializacao.estado(), status_code=500 if inicializacao.falhou() else 200)
+
+@app.get("/readyz")
+async def readyz():
+    # 200 só com FAQ, rotas, LLM e pipeline carregados (e aquecidos, com CECI_AQUECER=1)
+    return JSONResponse(inicializacao.estado(), status_code=200 if inicializacao.pronto() else 503)
+
+@app.get("/status")
+async def status_linhas():
+    if not inicializacao.pronto():
+        return JSONResponse(inicializacao.estado(), status_code=503)
+    import llm
+    import llm_cache
+    from services import rota_service, faq_service
+    return {
+        "linhas": rota_service.status_operacao,
+        "poller": status_poller.info(),
+        "cache_rotas": rota_service.cache_stats(),
+        "estagios": {nome: stage.stats() for nome, stage in STAGES.items()},
+        "faq": faq_service.stats(),
+        "llm": llm.CLIENTE.stats(),
+        "llm_cache": llm_cache.stats(),
+        "ws": protocolo.stats(),
+        "subida": inicializacao.estado()["subsistemas"],
+    }
+
+@app.get("/metrics")
+async def metricas():
+    # Formato texto do Prometheus; CECI_METRICS=0 desliga a coleta e o endpoint
+    if not metrics.ATIVO:
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(metrics.expor(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.websocket("/ws/ceci")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, formato: str = "texto"):
+    # ?formato=json para quadros com id/intent/fim/erro e respostas em paralelo (com
+    # cancelamento); sem parâmetro, texto puro + "[DONE]", uma resposta por vez
+    if formato not in protocolo.FORMATOS:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
+    # Conexão aberta durante a subida espera o pipeline (até CECI_ESPERA_PRONTO s)
+    if not await inicializacao.esperar():
+        await websocket.close(code=1013)
+        return
+    from pipeline import process_user_input
     try:
-        while True:
-            user_msg = await websocket.receive_text()
-            
-            async for chunk in process_user_input(user_msg):
-                await websocket.send_text(chunk)
-            await websocket.send_text("[DONE]")
+        await protocolo.atender(websocket, process_user_input, formato)
     except WebSocketDisconnect:
         print("Client disconnected")
         
@@ -31,4 +140,10 @@ async def websocket_endpoint(websocket: WebSocket):
 if __name__ == "__main__":
     import os
     port = int(os.environ.get("PORT", 5000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # CECI_WORKERS=N: N workers que compartilham os recursos carregados uma vez (prefork.py)
+    workers = int(os.environ.get("CECI_WORKERS", 1))
+    if workers > 1:
+        import prefork
+        prefork.servir(app, host="0.0.0.0", porta=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,141 @@
+# benchmarks/bench_app_startup.py
+"""
+Custo da subida do app: o tempo cumulativo de 'import app' e dos módulos mais
+pesados segundo python -X importtime; e, com o app de verdade (uvicorn
+app:app, LLM falsa de benchmarks/fake_llm.py), o tempo desde o Popen até a
+porta aceitar conexões, até o /readyz responder 200 e a duração das primeiras
+perguntas no /ws/ceci (uma rota e uma do FAQ que vai para a LLM), que pagam o
+que não foi aquecido. Árvores sem /readyz carregam tudo antes de abrir a
+porta: "pronto" é a porta aberta. Com --sem-aquecer, CECI_AQUECER=0.
+
+Precisa do modelo e do índice do FAQ como o app normal.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_app_startup [--repeticoes 5] [--sem-aquecer]
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORTA_LLM = 8017
+PORTA_APP = 8018
+
+MODULOS = ("app", "fastapi", "uvicorn", "llm", "llm_cache", "pipeline", "services.faq_service",
+           "services.rota_service", "inicializacao")
+PERGUNTAS = ("quero ir da Sé até a Luz", "como funciona o bilhete único?")
+
+
+def importtime() -> dict[str, float]:
+    """ms cumulativos por módulo num 'import app' de um processo novo."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                          capture_output=True, text=True, check=True)
+    tempos = {}
+    for linha in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$", linha)
+        if m and m.group(3) in MODULOS and m.group(3) not in tempos:
+            tempos[m.group(3)] = int(m.group(1)) / 1000
+    return tempos
+
+
+def _porta_aberta() -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", PORTA_APP), timeout=0.05).close()
+        return True
+    except OSError:
+        return False
+
+
+async def _perguntar(texto: str) -> float:
+    import websockets
+
+    inicio = time.perf_counter()
+    async with websockets.connect(f"ws://127.0.0.1:{PORTA_APP}/ws/ceci") as ws:
+        await ws.send(texto)
+        while await ws.recv() != "[DONE]":
+            pass
+    return time.perf_counter() - inicio
+
+
+def subida(env: dict) -> dict[str, float]:
+    app = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(PORTA_APP),
+                            "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL)
+    inicio = time.perf_counter()
+    try:
+        while not _porta_aberta():
+            if app.poll() is not None:
+                raise RuntimeError("o app terminou")
+            time.sleep(0.005)
+        porta = time.perf_counter() - inicio
+        # Uma conexão só e sondagem espaçada: com 1 CPU, sondar demais atrasa a subida que se mede
+        with httpx.Client(timeout=5) as cliente:
+            while True:
+                r = cliente.get(f"http://127.0.0.1:{PORTA_APP}/readyz")
+                if r.status_code == 404:
+                    pronto = porta
+                    break
+                if r.status_code == 200:
+                    pronto = time.perf_counter() - inicio
+                    break
+                time.sleep(0.05)
+        tempos = {"porta": porta, "pronto": pronto}
+        for i, texto in enumerate(PERGUNTAS):
+            tempos[f"pergunta{i + 1}"] = asyncio.run(_perguntar(texto))
+        return tempos
+    finally:
+        app.terminate()
+        app.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--sem-aquecer", action="store_true")
+    args = parser.parse_args()
+
+    imports = [importtime() for _ in range(args.repeticoes)]
+    print(f"python -X importtime -c 'import app' (ms cumulativos, mediana de {args.repeticoes}):")
+    for modulo in MODULOS:
+        valores = [t[modulo] for t in imports if modulo in t]
+        if valores:
+            print(f"  {modulo:<22} {statistics.median(valores):7.1f}")
+        else:
+            print(f"  {modulo:<22}       -   (não importado)")
+
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--porta", str(PORTA_LLM),
+                            "--ttft", "0.2", "--tokens-por-s", "200", "--tokens", "20"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(os.environ, CECI_LLM_BASE_URL=f"http://127.0.0.1:{PORTA_LLM}/v1", CECI_LLM_API_KEY="fake",
+               CECI_LLM_CACHE="0", CECI_AQUECER="0" if args.sem_aquecer else "1")
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{PORTA_LLM}/stats", timeout=0.5).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > limite:
+                    raise
+                time.sleep(0.1)
+        subidas = [subida(env) for _ in range(args.repeticoes)]
+    finally:
+        llm.terminate()
+        llm.wait()
+
+    print(f"\nuvicorn app:app (s desde o Popen, mediana de {args.repeticoes}):")
+    nomes = {"porta": "porta aberta", "pronto": "pronto (/readyz 200)",
+             "pergunta1": f"1ª pergunta ({PERGUNTAS[0]!r})", "pergunta2": f"2ª pergunta ({PERGUNTAS[1]!r})"}
+    for chave, nome in nomes.items():
+        valores = [s[chave] for s in subidas]
+        print(f"  {nome:<50} {statistics.median(valores):6.3f}  (mín {min(valores):.3f}, máx {max(valores):.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_encoders.py
+"""
+Backends de embedding do FAQ (services/encoders.py): tempo de carga, memória
+residente (VmRSS) após carregar e codificar, latência de uma consulta (p50/p99)
+e vazão em lotes de 32. Cada backend roda em um processo separado para que a
+memória de um (torch, por exemplo) não contamine a medição do outro.
+
+Requer o modelo ONNX exportado (python -m services.encoders export).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_encoders [--backends torch,onnx,onnx-fp32]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+CONSULTAS = 200
+TEXTOS_VAZAO = 512
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def medir(backend: str) -> dict:
+    inicio = time.perf_counter()
+    from services import encoders
+    if backend == "onnx-fp32":
+        encoder = encoders.OnnxEncoder(arquivo=encoders.ARQ_ONNX_FP32)
+    else:
+        encoder = encoders.carregar_encoder(backend)
+    t_carga = time.perf_counter() - inicio
+
+    from services.faq_index import carregar_faq
+    perguntas, _ = carregar_faq()
+    textos = (perguntas + encoders.CONSULTAS_VALIDACAO) * (TEXTOS_VAZAO // len(perguntas) + 1)
+    encoder.encode(textos[:8])  # aquecimento
+
+    latencias = []
+    for i in range(CONSULTAS):
+        t = time.perf_counter()
+        encoder.encode([textos[i % len(textos)]], batch_size=1)
+        latencias.append((time.perf_counter() - t) * 1e3)
+
+    t = time.perf_counter()
+    encoder.encode(textos[:TEXTOS_VAZAO], batch_size=32)
+    vazao = TEXTOS_VAZAO / (time.perf_counter() - t)
+
+    latencias.sort()
+    return {
+        "carga_s": t_carga,
+        "rss_mb": _rss_mb(),
+        "p50_ms": statistics.median(latencias),
+        "p99_ms": latencias[int(len(latencias) * 0.99) - 1],
+        "textos_s": vazao,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="torch,onnx,onnx-fp32")
+    parser.add_argument("--worker")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(medir(args.worker)))
+        return
+
+    for backend in args.backends.split(","):
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_encoders", "--worker", backend],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend:>10}: falhou\n{proc.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{backend:>10}: carga {r['carga_s']:5.2f} s | RSS {r['rss_mb']:6.0f} MB | "
+              f"1 consulta p50 {r['p50_ms']:6.2f} ms p99 {r['p99_ms']:6.2f} ms | {r['textos_s']:7.1f} textos/s (lote 32)")
+
+
+if __name__ == "__main__":
+    main()
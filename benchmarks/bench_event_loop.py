@@ -0,0 +1,92 @@
+# benchmarks/bench_event_loop.py
+"""
+Latência entre chunks do streaming da conexão A enquanto a conexão B dispara
+consultas FAQ pesadas, com o estágio "faq" em modo "inline" (no event loop,
+como antes) e "thread" (executor.py).
+
+A consulta pesada é um substituto do encode MiniLM + busca FAISS (multiplicação
+de matrizes NumPy de ~30 ms), para rodar sem baixar o modelo; com
+--real usa services.faq_service.resposta_faq.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_event_loop [--real]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from executor import Stage
+
+INTERVALO_TOKEN = 0.01  # LLM falso: um token a cada 10 ms
+TOKENS = 200
+
+
+def faq_sintetica(_: str) -> str:
+    a = np.random.rand(700, 700)
+    for _ in range(3):
+        a = a @ a
+        a /= np.abs(a).max()
+    return "ok"
+
+
+async def llm_falso():
+    for i in range(TOKENS):
+        await asyncio.sleep(INTERVALO_TOKEN)
+        yield f"tok{i} "
+
+
+async def conexao_a() -> list[float]:
+    gaps = []
+    anterior = time.perf_counter()
+    async for _ in llm_falso():
+        agora = time.perf_counter()
+        gaps.append((agora - anterior) * 1e3)
+        anterior = agora
+    return gaps
+
+
+async def conexao_b(stage: Stage, fn, parar: asyncio.Event) -> int:
+    consultas = 0
+    while not parar.is_set():
+        await stage.run(fn, "Como eu recarrego meu Bilhete Único?")
+        consultas += 1
+        # Outras mensagens da conexão B chegam pelo socket: devolve o controle ao loop
+        await asyncio.sleep(0)
+    return consultas
+
+
+async def cenario(modo: str, fn) -> tuple[list[float], int]:
+    stage = Stage("faq", modo=modo, workers=2, max_fila=32)
+    parar = asyncio.Event()
+    tarefas_b = [asyncio.create_task(conexao_b(stage, fn, parar)) for _ in range(2)]
+    gaps = await conexao_a()
+    parar.set()
+    consultas = sum(await asyncio.gather(*tarefas_b))
+    stage.shutdown()
+    return gaps, consultas
+
+
+def _resumo(gaps: list[float]) -> str:
+    gaps = sorted(gaps)
+    p99 = gaps[int(len(gaps) * 0.99) - 1]
+    return f"p50 {statistics.median(gaps):6.1f} ms | p99 {p99:6.1f} ms | máx {gaps[-1]:6.1f} ms"
+
+
+def main():
+    if "--real" in sys.argv:
+        from services.faq_service import resposta_faq as fn
+    else:
+        fn = faq_sintetica
+
+    base = asyncio.run(conexao_a())
+    print(f"{'sem carga':>18}: {_resumo(base)}")
+    for modo in ("inline", "thread"):
+        gaps, consultas = asyncio.run(cenario(modo, fn))
+        print(f"{'FAQ ' + modo:>18}: {_resumo(gaps)} | consultas FAQ de B: {consultas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_faq_batching.py
+"""
+Latência (p50/p99) e vazão (consultas/s) da busca FAQ com N clientes
+concorrentes: uma consulta por chamada (caminho antigo) vs. o Batcher de
+executor.py (micro-batching com janela configurável).
+
+Por padrão usa um encoder sintético com o custo aproximado do MiniLM em CPU
+(6 camadas densas sobre ~24 tokens por frase + custo fixo por chamada), para
+rodar sem baixar o modelo; com --real usa services.faq_service.buscar_faq.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_faq_batching [--real] [--janela 3] [--lote 32]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import numpy as np
+
+# O caminho uma a uma com 64 clientes passaria da fila padrão do estágio (32)
+os.environ.setdefault("CECI_FAQ_QUEUE", "1000")
+
+from executor import STAGES, Batcher, run_stage, shutdown_stages
+
+CONCORRENCIAS = (1, 4, 16, 64)
+CONSULTAS_POR_CLIENTE = 20
+PERGUNTAS = [
+    "Como eu recarrego meu Bilhete Único?",
+    "Posso levar bicicleta no trem?",
+    "Qual o horário de funcionamento da linha 9?",
+    "Onde fica o achados e perdidos?",
+    "Criança paga passagem?",
+    "Como peço reembolso de uma viagem?",
+]
+
+_rng = np.random.default_rng(0)
+_CAMADAS = [(_rng.standard_normal((384, 1536), dtype=np.float32) * 0.05,
+             _rng.standard_normal((1536, 384), dtype=np.float32) * 0.05) for _ in range(6)]
+_TOKENS = 24
+
+
+def buscar_sintetica(queries: list[str]) -> list[tuple[str, float, int]]:
+    time.sleep(0.0005)  # tokenização + overhead fixo por chamada do encode
+    x = np.ones((len(queries) * _TOKENS, 384), dtype=np.float32)
+    for w1, w2 in _CAMADAS:
+        x = np.maximum(x @ w1, 0) @ w2
+        x /= np.abs(x).max() + 1e-6
+    return [("vetorial", 0.9, i % 10) for i in range(len(queries))]
+
+
+async def _cliente(buscar, latencias: list[float]):
+    for i in range(CONSULTAS_POR_CLIENTE):
+        inicio = time.perf_counter()
+        await buscar(PERGUNTAS[i % len(PERGUNTAS)])
+        latencias.append((time.perf_counter() - inicio) * 1e3)
+
+
+async def cenario(concorrencia: int, fn, batcher: Batcher | None) -> tuple[list[float], float]:
+    if batcher is None:
+        async def buscar(q):
+            return (await run_stage("faq", fn, [q]))[0]
+    else:
+        buscar = batcher.buscar
+
+    latencias: list[float] = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*[_cliente(buscar, latencias) for _ in range(concorrencia)])
+    return latencias, len(latencias) / (time.perf_counter() - inicio)
+
+
+def _resumo(latencias: list[float], qps: float) -> str:
+    latencias = sorted(latencias)
+    p99 = latencias[max(int(len(latencias) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(latencias):7.1f} ms | p99 {p99:7.1f} ms | {qps:7.1f} consultas/s"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true")
+    parser.add_argument("--janela", type=float, default=3, help="janela do batcher em ms")
+    parser.add_argument("--lote", type=int, default=32, help="tamanho máximo do lote")
+    args = parser.parse_args()
+
+    if args.real:
+        from services.faq_service import buscar_faq as fn
+    else:
+        fn = buscar_sintetica
+
+    for concorrencia in CONCORRENCIAS:
+        for nome in ("uma a uma", "batcher"):
+            batcher = Batcher("faq", fn, janela_ms=args.janela, max_lote=args.lote) if nome == "batcher" else None
+            latencias, qps = asyncio.run(cenario(concorrencia, fn, batcher))
+            extra = f" | lote médio {batcher.stats()['tamanho_medio']:.1f}" if batcher else ""
+            print(f"c={concorrencia:<3} {nome:>10}: {_resumo(latencias, qps)}{extra}")
+            shutdown_stages()
+            STAGES.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_faq_direto.py
+"""
+Tempo até o primeiro byte no caminho do FAQ, com e sem a resposta direta
+(faq_service.DIRETO_ATIVO): consultas rotuladas
+(benchmarks/dados/consultas_faq.json) passam por resposta_faq_async; quando a
+resposta não sai direta, o prompt vai para uma LLM falsa local (mesma de
+bench_llm_cache, sem cache). Também conta quantas saem diretas e se a resposta
+direta é a do rótulo.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_faq_direto [--ttft 0.3] [--limiar 0.85]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.bench_llm_cache import LLMFalsa
+from idioma import detectar
+from prompt_builder import build_prompt
+from services import faq_service
+from services.faq_index import carregar_entradas
+from services.faq_traducoes import carregar_traducoes, hash_resposta
+
+CORPUS = "benchmarks/dados/consultas_faq.json"
+
+
+async def rodar(consultas, falsa: LLMFalsa) -> list[tuple[float, str | None]]:
+    """(tempo até o primeiro byte, resposta direta ou None) por consulta."""
+    resultados = []
+    for c in consultas:
+        faq_service.QUERY_CACHE.clear()
+        lang = detectar(c["texto"])
+        inicio = time.perf_counter()
+        texto, direta = await faq_service.resposta_faq_async(c["texto"], lang)
+        if direta:
+            resultados.append((time.perf_counter() - inicio, texto))
+            continue
+        prompt = build_prompt({"tipo": "faq", "texto_faq": texto}, c["texto"], lang)
+        async for _ in falsa.stream(prompt, lang):
+            resultados.append((time.perf_counter() - inicio, None))
+            break
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--limiar", type=float, default=faq_service.DIRETO_SIM)
+    args = parser.parse_args()
+
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        consultas = json.load(f)
+    traducoes = carregar_traducoes()
+    renderizadas = {e["question"]: traducoes.get(hash_resposta(e["answer"]), {}) for e in carregar_entradas()}
+    faq_service.DIRETO_SIM = args.limiar
+
+    for ativo in (False, True):
+        faq_service.DIRETO_ATIVO = ativo
+        falsa = LLMFalsa(args.ttft, 0.0, 1)
+        resultados = asyncio.run(rodar(consultas, falsa))
+        ms = [t * 1e3 for t, _ in resultados]
+        diretas = [(c, t * 1e3, texto) for c, (t, texto) in zip(consultas, resultados) if texto is not None]
+        corretas = sum(c["esperado"] is not None and texto in renderizadas[c["esperado"]].values()
+                       for c, _, texto in diretas)
+        print(f"direta {'ligada ' if ativo else 'desligada'}: primeiro byte p50 {statistics.median(ms):7.2f} ms | "
+              f"média {statistics.mean(ms):7.2f} ms | diretas {len(diretas)}/{len(consultas)} "
+              f"(com a resposta do rótulo: {corretas}) | chamadas à LLM {falsa.chamadas}")
+        if diretas:
+            print(f"  só as diretas: p50 {statistics.median(t for _, t, _ in diretas):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_faq_index.py
+"""
+Compara os tipos de índice FAQ (services/faq_index.py): recall@1 em relação à
+busca exata, latência por consulta (uma consulta por chamada, como no serviço),
+tempo de construção e memória (tamanho serializado do índice).
+
+Corpora sintéticos: embeddings de 384 dimensões agrupados em tópicos (perguntas
+parecidas entre si, como num FAQ real) e consultas = perguntas do corpus com
+ruído (paráfrases). Com --real usa os embeddings já gerados por
+`python -m services.faq_index build`.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_faq_index [--real] [--tamanhos 50,5000,50000]
+"""
+import argparse
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from services import faq_index
+
+DIM = 384
+CONSULTAS = 500
+RUIDO = 1.5  # consulta com cosseno ~0.55 em relação à pergunta original (paráfrase distante)
+
+
+def corpus_sintetico(n: int, rng: np.random.Generator) -> np.ndarray:
+    topicos = rng.standard_normal((max(n // 20, 1), DIM)).astype(np.float32)
+    embs = topicos[rng.integers(0, len(topicos), n)] + rng.standard_normal((n, DIM)).astype(np.float32)
+    return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+
+def consultas_para(embs: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    base = embs[rng.integers(0, len(embs), CONSULTAS)]
+    q = base + RUIDO * rng.standard_normal(base.shape).astype(np.float32) / DIM ** 0.5
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+
+
+def indice_legado(embs: np.ndarray) -> faiss.Index:
+    """
+    Configuração anterior do faq_service: IVFFlat com nlist=26 e nprobe=1 (padrão).
+    """
+    quantizer = faiss.IndexFlatIP(embs.shape[1])
+    index = faiss.IndexIVFFlat(quantizer, embs.shape[1], min(26, len(embs)), faiss.METRIC_INNER_PRODUCT)
+    index.train(embs)
+    index.add(embs)
+    return index
+
+
+def medir(nome: str, embs: np.ndarray, consultas: np.ndarray, verdade: np.ndarray, tipos):
+    print(f"\n{nome}: {len(embs)} entradas (auto → {faq_index.escolher_tipo(len(embs), 'auto')})")
+    for tipo in tipos:
+        if tipo in ("ivf", "sq8") and len(embs) < 39:
+            continue
+        inicio = time.perf_counter()
+        index = indice_legado(embs) if tipo == "legado" else faq_index.construir_indice(embs, tipo)
+        t_build = time.perf_counter() - inicio
+
+        latencias, acertos = [], 0
+        for i in range(len(consultas)):
+            q = consultas[i:i + 1]
+            inicio = time.perf_counter()
+            _, idx = index.search(q, 1)
+            latencias.append((time.perf_counter() - inicio) * 1e6)
+            acertos += int(idx[0][0] == verdade[i])
+
+        latencias.sort()
+        memoria = len(faiss.serialize_index(index)) / 2 ** 20
+        print(f"  {tipo:>5}: recall@1 {acertos / len(consultas):6.3f} | "
+              f"p50 {statistics.median(latencias):7.1f} µs | p99 {latencias[int(len(latencias) * 0.99) - 1]:7.1f} µs | "
+              f"build {t_build * 1e3:8.1f} ms | {memoria:7.2f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true")
+    parser.add_argument("--tamanhos", default="50,5000,50000")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    corpora = []
+    if args.real:
+        faq = faq_index.carregar()
+        if faq is None:
+            raise SystemExit("Sem artefatos: rode `python -m services.faq_index build` antes.")
+        corpora.append(("FAQ real", np.ascontiguousarray(faq.embs, dtype=np.float32)))
+    else:
+        for n in (int(t) for t in args.tamanhos.split(",")):
+            corpora.append(("sintético", corpus_sintetico(n, rng)))
+
+    for nome, embs in corpora:
+        consultas = consultas_para(embs, rng)
+        exato = faiss.IndexFlatIP(embs.shape[1])
+        exato.add(embs)
+        _, verdade = exato.search(consultas, 1)
+        medir(nome, embs, consultas, verdade[:, 0], ("legado",) + faq_index.TIPOS_INDICE)
+
+
+if __name__ == "__main__":
+    main()
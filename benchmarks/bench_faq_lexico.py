@@ -0,0 +1,94 @@
+# benchmarks/bench_faq_lexico.py
+"""
+Replay de consultas FAQ rotuladas (benchmarks/dados/consultas_faq.json) pelo
+pré-filtro BM25 (services/faq_lexico.py): fração que sai pelo caminho rápido,
+acertos/erros do atalho em relação ao rótulo e latência do BM25.
+
+Com --modelo carrega o faq_service e também mede, para cada consulta, o encode +
+busca vetorial (sem cache), a latência economizada pelo atalho, a concordância
+do atalho com o top-1 vetorial (listando as discordâncias, com o cosseno do
+top-1) e a acurácia com e sem fusão dos escores.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_faq_lexico [--modelo] [--min 5] [--margem 0.4]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from services.faq_index import carregar_entradas
+from services.faq_lexico import BM25_MARGEM, BM25_MIN, BM25Index
+
+CORPUS = "benchmarks/dados/consultas_faq.json"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modelo", action="store_true")
+    parser.add_argument("--min", type=float, default=BM25_MIN)
+    parser.add_argument("--margem", type=float, default=BM25_MARGEM)
+    args = parser.parse_args()
+
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        consultas = json.load(f)
+    entradas = carregar_entradas()
+    perguntas = [e["question"] for e in entradas]
+
+    inicio = time.perf_counter()
+    lexico = BM25Index(entradas)
+    print(f"BM25 sobre {len(lexico)} entradas construído em {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    vencedores, lat_bm25 = [], []
+    for c in consultas:
+        t = time.perf_counter()
+        vencedores.append(lexico.vencedor(c["texto"], args.min, args.margem))
+        lat_bm25.append((time.perf_counter() - t) * 1e6)
+
+    rapidas = [i for i, v in enumerate(vencedores) if v is not None]
+    erros = [i for i in rapidas if perguntas[vencedores[i][0]] != consultas[i]["esperado"]]
+    print(f"caminho rápido: {len(rapidas)}/{len(consultas)} ({len(rapidas) / len(consultas):.0%}) | "
+          f"erros do atalho: {len(erros)} | BM25 p50 {statistics.median(lat_bm25):.1f} µs")
+    for i in erros:
+        print(f"  ✗ {consultas[i]['texto']!r} → {perguntas[vencedores[i][0]]!r}")
+
+    if not args.modelo:
+        return
+
+    from services import faq_service
+
+    lat_vetor, top1 = [], []
+    for c in consultas:
+        faq_service.QUERY_CACHE.clear()
+        t = time.perf_counter()
+        top1.append(faq_service.buscar_faq([c["texto"]])[0])
+        lat_vetor.append((time.perf_counter() - t) * 1e3)
+
+    discordam = [i for i in rapidas if top1[i][2] != vencedores[i][0]]
+    concorda = len(rapidas) - len(discordam)
+    economia = sum(lat_vetor[i] - lat_bm25[i] / 1e3 for i in rapidas)
+    antes = statistics.mean(lat_vetor)
+    depois = statistics.mean(lat_bm25[i] / 1e3 if vencedores[i] else lat_vetor[i] + lat_bm25[i] / 1e3
+                             for i in range(len(consultas)))
+    print(f"atalho concorda com o top-1 vetorial em {concorda}/{len(rapidas)}")
+    for i in discordam:
+        _, sim, idx = top1[i]
+        vetorial = perguntas[idx] if idx >= 0 else "(nenhuma)"
+        print(f"  ≠ {consultas[i]['texto']!r}: BM25 {vencedores[i][1]:.1f} → {perguntas[vencedores[i][0]]!r} | "
+              f"vetorial {sim:.2f} → {vetorial!r}")
+    print(f"latência média por consulta: {antes:.2f} ms só vetorial (encode + busca) → {depois:.2f} ms "
+          f"com pré-filtro ({economia:.1f} ms economizados no replay)")
+
+    for fusao in (False, True):
+        faq_service.FUSAO = fusao
+        acertos = 0
+        for c in consultas:
+            if c["esperado"] is None:
+                continue
+            faq_service.QUERY_CACHE.clear()
+            acertos += perguntas[faq_service.buscar_faq([c["texto"]])[0][2]] == c["esperado"]
+        rotuladas = sum(c["esperado"] is not None for c in consultas)
+        print(f"acurácia top-1 vetorial {'com' if fusao else 'sem'} fusão: {acertos}/{rotuladas}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_faq_startup.py
+"""
+Tempo de inicialização do faq_service: processo novo importando o serviço com o
+diretório de artefatos vazio (codifica todas as perguntas e treina o índice, como
+antes) vs. com os artefatos já gerados (mmap, sem encode nem treino).
+
+Com --sem-modelo mede só a parte do índice, com embeddings aleatórios de vários
+tamanhos (construir + gravar vs. carregar com mmap), sem baixar o modelo.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_faq_startup [--sem-modelo]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPETICOES = 3
+TAMANHOS = (26, 2_000, 20_000)
+
+
+def _importar_servico(diretorio: str) -> float:
+    env = dict(os.environ, CECI_FAQ_INDEX_DIR=diretorio)
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import services.faq_service"], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - inicio
+
+
+def com_modelo():
+    frio, quente = [], []
+    for _ in range(REPETICOES):
+        with tempfile.TemporaryDirectory() as diretorio:
+            frio.append(_importar_servico(diretorio))
+            quente.append(_importar_servico(diretorio))
+    print(f"import faq_service, sem artefatos (antes): {min(frio):6.2f} s")
+    print(f"import faq_service, com artefatos (mmap) : {min(quente):6.2f} s")
+
+
+def sem_modelo():
+    from services import faq_index
+
+    for n in TAMANHOS:
+        rng = np.random.default_rng(0)
+        base = rng.standard_normal((n, 384)).astype(np.float32)
+        perguntas = [f"pergunta {i}" for i in range(n)]
+
+        def encode(textos, convert_to_numpy=True, batch_size=8):
+            return base[:len(textos)]
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            faq_index.carregar_faq = lambda: (perguntas, perguntas)
+            inicio = time.perf_counter()
+            faq_index.construir(encode, diretorio=diretorio, hash_="bench")
+            t_construir = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            faq = faq_index.carregar(diretorio=diretorio, hash_="bench")
+            t_carregar = time.perf_counter() - inicio
+        print(f"n={n:>6}: construir + gravar {t_construir * 1e3:8.1f} ms | "
+              f"carregar {t_carregar * 1e3:6.1f} ms (mmap índice: {faq.mmap})")
+
+
+if __name__ == "__main__":
+    if "--sem-modelo" in sys.argv:
+        sem_modelo()
+    else:
+        com_modelo()
@@ -0,0 +1,61 @@
+# benchmarks/bench_idioma.py
+"""
+Detector de idioma do pipeline (idioma.detectar_idioma, perfil de n-gramas
+restrito a pt/en/es) vs. langdetect: acurácia em mensagens curtas rotuladas
+(benchmarks/dados/idiomas.json, como digitadas e em minúsculas sem "¿"),
+tempo por mensagem e estabilidade (langdetect sem semente, 5 execuções).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_idioma
+"""
+import json
+import time
+
+import langdetect
+
+from idioma import detectar_idioma, detectar_idioma_langdetect
+
+CORPUS = "benchmarks/dados/idiomas.json"
+EXECUCOES = 5
+
+
+def _langdetect_sem_semente(texto: str) -> str:
+    langdetect.DetectorFactory.seed = None
+    try:
+        return langdetect.detect(texto)
+    except langdetect.LangDetectException:
+        return "pt"
+
+
+def main():
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    variantes = {
+        "original": [c["texto"] for c in corpus],
+        "minúsculas": [c["texto"].lower().replace("¿", "").replace("¡", "") for c in corpus],
+    }
+    esperado = [c["idioma"] for c in corpus]
+
+    detectores = {
+        "n-gramas pt/en/es": detectar_idioma,
+        "langdetect (semente 0)": detectar_idioma_langdetect,
+        "langdetect (sem semente)": _langdetect_sem_semente,
+    }
+    for nome, fn in detectores.items():
+        linha = []
+        for variante, textos in variantes.items():
+            inicio = time.perf_counter()
+            resultado = [fn(t) for t in textos]
+            us = (time.perf_counter() - inicio) / len(textos) * 1e6
+            acertos = sum(r == e for r, e in zip(resultado, esperado))
+            linha.append(f"{variante} {acertos}/{len(textos)}")
+        print(f"{nome:>24}: {' | '.join(linha)} | {us:7.1f} µs/mensagem")
+
+    textos = variantes["original"]
+    execucoes = [[_langdetect_sem_semente(t) for t in textos] for _ in range(EXECUCOES)]
+    instaveis = sum(len({e[i] for e in execucoes}) > 1 for i in range(len(textos)))
+    print(f"langdetect sem semente: {instaveis}/{len(textos)} mensagens mudam de idioma entre {EXECUCOES} execuções")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_intent.py
+"""
+Motor de intenções compilado (intent.INTENT_ENGINE) vs. a cascata anterior
+(9 regex de smalltalk no pipeline + detect_intent com um re.search por
+padrão): confere cada mensagem do conjunto-ouro
+(benchmarks/dados/intents_golden.json, gerado com o código anterior) e mede
+o tempo por mensagem. Sai com código 1 se alguma classificação divergir.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_intent [--repeticoes 20]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+from intent import (
+    FUNCTIONAL_PATTERNS, INTENT_ENGINE, SMALLTALK_PATTERNS, SMALLTALK_PIPELINE, Intencao, FALLBACK,
+)
+
+GOLDEN = "benchmarks/dados/intents_golden.json"
+
+# Cascata anterior, com os padrões das mesmas tabelas e na mesma ordem
+_PIPELINE = [
+    (re.compile(pat, re.IGNORECASE), Intencao(intent, lang, True))
+    for lang, padroes in SMALLTALK_PIPELINE.items()
+    for intent, pat in padroes.items()
+]
+_SMALLTALK = {intent: list(padroes.values()) for intent, padroes in SMALLTALK_PATTERNS.items()}
+_FUNCIONAIS = {
+    intent: [pat for padroes in por_idioma.values() for pat in padroes]
+    for intent, por_idioma in FUNCTIONAL_PATTERNS.items()
+}
+
+
+def cascata(texto: str) -> Intencao:
+    for regex, intencao in _PIPELINE:
+        if regex.search(texto):
+            return intencao
+    text = texto.lower()
+    for tabela in (_SMALLTALK, _FUNCIONAIS):
+        for intent, patterns in tabela.items():
+            for pat in patterns:
+                if re.search(pat, text, re.IGNORECASE):
+                    return Intencao(intent, None, False)
+    return FALLBACK
+
+
+def _confere(intencao: Intencao, esperado: dict) -> bool:
+    if (intencao.intent, intencao.local) != (esperado["intent"], esperado["local"]):
+        return False
+    return not esperado["local"] or intencao.lang == esperado["lang"]
+
+
+def _tempo(fn, textos: list[str], repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for t in textos:
+            fn(t)
+    return (time.perf_counter() - inicio) / (repeticoes * len(textos)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(GOLDEN, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    textos = [g["texto"] for g in golden]
+
+    divergencias = 0
+    for nome, fn in (("cascata", cascata), ("motor", INTENT_ENGINE.detectar)):
+        erros = [(g, fn(g["texto"])) for g in golden if not _confere(fn(g["texto"]), g)]
+        divergencias += len(erros)
+        print(f"{nome:>8}: {len(golden) - len(erros)}/{len(golden)} iguais ao conjunto-ouro")
+        for g, obtido in erros:
+            print(f"  ✗ {g['texto']!r}: esperado {g['intent']}/{g['lang']}/{g['local']}, obtido {tuple(obtido)}")
+
+    us_cascata = _tempo(cascata, textos, args.repeticoes)
+    us_motor = _tempo(INTENT_ENGINE.detectar, textos, args.repeticoes)
+    print(f"{len(INTENT_ENGINE)} regras | cascata {us_cascata:.1f} µs/mensagem | motor {us_motor:.1f} µs/mensagem "
+          f"({us_cascata / us_motor:.1f}x)")
+
+    fallback = [t for t, g in zip(textos, golden) if g["intent"] == "fallback"]
+    print(f"só mensagens sem intenção ({len(fallback)}): cascata {_tempo(cascata, fallback, args.repeticoes):.1f} µs | "
+          f"motor {_tempo(INTENT_ENGINE.detectar, fallback, args.repeticoes):.1f} µs")
+
+    if divergencias:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
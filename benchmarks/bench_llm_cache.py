@@ -0,0 +1,146 @@
+# benchmarks/bench_llm_cache.py
+"""
+llm_cache contra uma LLM falsa local (latência até o primeiro token + atraso
+por token, sem rede): replay de consultas rotuladas
+(benchmarks/dados/consultas_faq.json) sorteadas com repetição (Zipf), prompts
+montados pelo build_prompt como no pipeline. Mede tempo até o primeiro pedaço,
+tempo total, chamadas à LLM e taxa de acerto, com o cache desligado e ligado,
+e confere que o replay devolve exatamente o texto gerado.
+
+Com --semantico também liga a camada semântica (carrega o encoder do faq_service).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_llm_cache [--requisicoes 300] [--ttft 0.05] [--semantico]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import llm_cache
+from idioma import detectar
+from prompt_builder import build_prompt
+from services.faq_index import carregar_entradas
+
+CORPUS = "benchmarks/dados/consultas_faq.json"
+PALAVRAS = "a Ceci responde com base no contexto do prompt em poucas frases claras".split()
+
+
+class LLMFalsa:
+    def __init__(self, ttft: float, por_token: float, tokens: int):
+        self.ttft = ttft
+        self.por_token = por_token
+        self.tokens = tokens
+        self.chamadas = 0
+
+    def resposta(self, prompt: str) -> list[str]:
+        semente = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        rng = random.Random(semente)
+        return [rng.choice(PALAVRAS) + " " for _ in range(self.tokens)]
+
+    async def stream(self, prompt: str, lang: str):
+        self.chamadas += 1
+        await asyncio.sleep(self.ttft)
+        for i, token in enumerate(self.resposta(prompt)):
+            if i:
+                await asyncio.sleep(self.por_token)
+            yield token
+
+
+def carregar_requisicoes(n: int, zipf: float) -> list[tuple[str, str, str, str]]:
+    """(texto, idioma, intenção, prompt) sorteados com popularidade Zipf."""
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        consultas = json.load(f)
+    respostas = {e["question"]: e["answer"] for e in carregar_entradas()}
+    unicas = []
+    for c in consultas:
+        lang = detectar(c["texto"])
+        if c["esperado"] is not None:
+            intent, contexto = "faq_passageiro", {"tipo": "faq", "texto_faq": respostas[c["esperado"]]}
+        else:
+            intent = "fallback"
+            contexto = {"texto": "Desculpe, não entendi exatamente o que você quis dizer. Poderia reformular?"}
+        unicas.append((c["texto"], lang, intent, build_prompt(contexto, c["texto"], lang)))
+    rng = random.Random(0)
+    pesos = [1 / (i + 1) ** zipf for i in range(len(unicas))]
+    rng.shuffle(unicas)
+    return rng.choices(unicas, weights=pesos, k=n)
+
+
+async def rodar(requisicoes, falsa: LLMFalsa, concorrencia: int, embeddings=None):
+    ttfts, totais, divergentes = [], [], 0
+    sem = asyncio.Semaphore(concorrencia)
+
+    async def uma(i, texto, lang, intent, prompt):
+        nonlocal divergentes
+        async with sem:
+            emb = embeddings[texto] if embeddings else None
+            inicio = time.perf_counter()
+            primeiro = None
+            pedacos = []
+            async for pedaco in llm_cache.stream_com_cache(prompt, lang, intent, emb, gerar=falsa.stream):
+                if primeiro is None:
+                    primeiro = time.perf_counter() - inicio
+                pedacos.append(pedaco)
+            totais.append(time.perf_counter() - inicio)
+            ttfts.append(primeiro)
+            if embeddings is None and "".join(pedacos) != "".join(falsa.resposta(prompt)):
+                divergentes += 1
+
+    await asyncio.gather(*(uma(i, *r) for i, r in enumerate(requisicoes)))
+    return ttfts, totais, divergentes
+
+
+def _ms(valores: list[float], q: float) -> float:
+    return statistics.quantiles(valores, n=100)[int(q) - 1] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=300)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--por-token", type=float, default=0.002)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--semantico", action="store_true")
+    args = parser.parse_args()
+
+    requisicoes = carregar_requisicoes(args.requisicoes, args.zipf)
+    print(f"{len(requisicoes)} requisições, {len({r[3] for r in requisicoes})} prompts distintos, "
+          f"{len({r[0] for r in requisicoes})} perguntas distintas")
+
+    embeddings = None
+    if args.semantico:
+        from services import faq_service
+        textos = sorted({r[0] for r in requisicoes})
+        embeddings = dict(zip(textos, faq_service.ENCODER.encode(textos)))
+        llm_cache.SEMANTICO = True
+
+    cenarios = [("sem cache", False, None), ("cache exato", True, None)]
+    if embeddings:
+        cenarios.append(("exato + semântico", True, embeddings))
+    for nome, ativo, embs in cenarios:
+        llm_cache.CACHE_ATIVO = ativo
+        llm_cache.limpar()
+        antes = {i: dict(c) for i, c in llm_cache._CONTADORES.items()}
+        falsa = LLMFalsa(args.ttft, args.por_token, args.tokens)
+        ttfts, totais, divergentes = asyncio.run(rodar(requisicoes, falsa, args.concorrencia, embs))
+        acertos = sum(llm_cache._CONTADORES[i]["acertos"] - antes[i]["acertos"]
+                      + llm_cache._CONTADORES[i]["acertos_semanticos"] - antes[i]["acertos_semanticos"]
+                      for i in antes)
+        print(f"{nome:>18}: primeiro pedaço p50 {_ms(ttfts, 50):6.1f} ms p95 {_ms(ttfts, 95):6.1f} ms | "
+              f"total p50 {_ms(totais, 50):6.1f} ms | chamadas à LLM {falsa.chamadas} | "
+              f"acertos {acertos}/{len(requisicoes)} | replay divergente {divergentes}")
+
+    print(json.dumps(llm_cache.stats()["intencoes"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/bench_llm_cliente.py
+"""
+Rajada de streams contra o servidor falso (benchmarks/fake_llm.py): cliente
+AsyncOpenAI padrão (sem limite de concorrência, novas tentativas do SDK) vs.
+llm.ClienteLLM (pool, semáforo, prazos, novas tentativas com jitter antes do
+primeiro token), em dois cenários:
+  - capacidade: o servidor responde 429 acima de --capacidade streams abertos
+    e 500 em --erro-500 das requisições;
+  - travado: --travar das requisições ficam --ttft-travado segundos sem
+    responder.
+Mostra streams concluídos, falhas, tempo até o primeiro token, pico de streams
+simultâneos no servidor e a latência da primeira requisição com e sem
+aquecimento. Cada cenário sobe um servidor novo em outro processo.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_llm_cliente [--requisicoes 200] [--capacidade 32] [--travar 0.1]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from openai import AsyncOpenAI
+
+from llm import ClienteLLM, OpenAIBackend
+
+PORTA = 8011
+URL = f"http://127.0.0.1:{PORTA}/v1"
+MENSAGENS = [{"role": "user", "content": "Como recarrego o Bilhete Único?"}]
+
+
+def subir_servidor(args, *extras: str) -> subprocess.Popen:
+    proc = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_llm", "--porta", str(PORTA), "--ttft", str(args.ttft),
+        "--tokens-por-s", str(args.tokens_por_s), "--tokens", str(args.tokens), *extras,
+    ])
+    for _ in range(100):
+        try:
+            httpx.get(f"{URL}/models", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("servidor falso não subiu")
+
+
+async def _padrao(cliente: AsyncOpenAI):
+    stream = await cliente.chat.completions.create(model="fake", messages=MENSAGENS, stream=True)
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def rajada(gerar, n: int) -> dict:
+    ttfts, erros = [], {}
+
+    async def uma():
+        inicio = time.perf_counter()
+        primeiro = None
+        try:
+            async for _ in gerar():
+                if primeiro is None:
+                    primeiro = time.perf_counter() - inicio
+            ttfts.append(primeiro)
+        except Exception as e:
+            nome = type(e).__name__
+            erros[nome] = erros.get(nome, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma() for _ in range(n)))
+    return {"ttfts": ttfts, "erros": erros, "duracao": time.perf_counter() - inicio}
+
+
+async def primeira_requisicao(gerar, aquecer=None) -> float:
+    if aquecer is not None:
+        await aquecer()
+    inicio = time.perf_counter()
+    async for _ in gerar():
+        return time.perf_counter() - inicio
+
+
+def _linha(nome: str, r: dict, n: int, pico: int):
+    t = sorted(x * 1e3 for x in r["ttfts"])
+    erros = ", ".join(f"{k} {v}" for k, v in r["erros"].items()) or "nenhuma"
+    latencia = "sem tokens"
+    if len(t) > 1:
+        q = statistics.quantiles(t, n=100)
+        latencia = f"primeiro token p50 {q[49]:.0f} ms p95 {q[94]:.0f} ms"
+    print(f"{nome:>22}: {len(t)}/{n} concluídos em {r['duracao']:.1f} s | {latencia} | "
+          f"pico no servidor {pico} streams | falhas: {erros}")
+
+
+async def cenario(nome: str, args, servidor: list[str], cliente_llm: bool, **kw):
+    proc = subir_servidor(args, *servidor)
+    try:
+        if cliente_llm:
+            backend = OpenAIBackend(URL, "bench", conexoes=kw.get("concorrencia", 16))
+            cliente = ClienteLLM(backend, max_fila=args.requisicoes, espera_max=120, **kw)
+            gerar = lambda: cliente.stream(MENSAGENS, model="fake")
+        else:
+            cliente = AsyncOpenAI(api_key="bench", base_url=URL)
+            gerar = lambda: _padrao(cliente)
+        r = await rajada(gerar, args.requisicoes)
+        estado = httpx.get(f"http://127.0.0.1:{PORTA}/stats").json()
+        _linha(nome, r, args.requisicoes, estado["pico_streams"])
+        print(f"{'':>22}  servidor: {estado['requisicoes']} requisições, {estado['erros_429']} × 429, "
+              f"{estado['erros_500']} × 500, {estado['travados']} travadas")
+        if cliente_llm:
+            print(f"{'':>22}  {cliente.stats()}")
+            await cliente.aclose()
+        else:
+            await cliente.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def aquecimento(args):
+    proc = subir_servidor(args, "--ttft", "0")
+    try:
+        for aquecer in (False, True):
+            backend = OpenAIBackend(URL, "bench")
+            cliente = ClienteLLM(backend)
+            ms = await primeira_requisicao(lambda: cliente.stream(MENSAGENS, model="fake"),
+                                           cliente.aquecer if aquecer else None) * 1e3
+            print(f"primeira requisição {'com' if aquecer else 'sem'} aquecimento: {ms:.1f} ms")
+            await cliente.aclose()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def main_async(args):
+    capacidade = ["--capacidade", str(args.capacidade), "--erro-500", str(args.erro_500)]
+    await cenario("padrão, capacidade", args, capacidade, False)
+    await cenario("ClienteLLM, capacidade", args, capacidade, True, concorrencia=args.concorrencia)
+    travado = ["--travar", str(args.travar), "--ttft-travado", str(args.ttft_travado)]
+    await cenario("padrão, travado", args, travado, False)
+    await cenario("ClienteLLM, travado", args, travado, True, concorrencia=args.concorrencia,
+                  timeout_primeiro=args.timeout_primeiro)
+    await aquecimento(args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-por-s", type=float, default=100)
+    parser.add_argument("--tokens", type=int, default=30)
+    parser.add_argument("--capacidade", type=int, default=32)
+    parser.add_argument("--erro-500", type=float, default=0.02)
+    parser.add_argument("--travar", type=float, default=0.1)
+    parser.add_argument("--ttft-travado", type=float, default=20.0)
+    parser.add_argument("--timeout-primeiro", type=float, default=1.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
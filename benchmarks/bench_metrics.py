@@ -0,0 +1,113 @@
+# benchmarks/bench_metrics.py
+"""
+Custo das métricas (metrics.py) no caminho quente: nanossegundos por span,
+contador e histograma, com a coleta ligada e desligada; tempo por mensagem de
+pipeline.process_user_input sobre o corpus do loadgen (benchmarks/dados/
+carga.jsonl), alternando rodadas com metrics.ATIVO ligado e desligado; e o
+tempo de gerar o texto do /metrics. A LLM é um backend falso que responde na
+hora (o ClienteLLM continua no caminho) e o llm_cache fica desligado, para
+toda mensagem passar pelos mesmos estágios em todas as rodadas.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_metrics [--rodadas 7]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["CECI_LLM_CACHE"] = "0"
+
+import metrics
+
+CORPUS = os.path.join(os.path.dirname(__file__), "dados", "carga.jsonl")
+
+
+class BackendFalso:
+    base_url = "falso"
+
+    async def stream(self, messages, **params):
+        for token in ("Claro", "!", " A", " Ceci", " pode", " ajudar", "."):
+            yield token
+
+    async def aquecer(self) -> int:
+        return 0
+
+    async def aclose(self):
+        pass
+
+
+def micro(n: int = 200_000):
+    contador = metrics.Contador("bench_contador_total", "bench", ("a",))
+    histograma = metrics.Histograma("bench_segundos", "bench", ("a",))
+    for ativo in (False, True):
+        metrics.ATIVO = ativo
+        inicio = time.perf_counter()
+        for _ in range(n):
+            with metrics.estagio("bench"):
+                pass
+        span = (time.perf_counter() - inicio) / n * 1e9
+        inicio = time.perf_counter()
+        for _ in range(n):
+            contador.inc("x")
+        inc = (time.perf_counter() - inicio) / n * 1e9
+        inicio = time.perf_counter()
+        for _ in range(n):
+            histograma.observar(0.003, "x")
+        obs = (time.perf_counter() - inicio) / n * 1e9
+        print(f"métricas {'ligadas   ' if ativo else 'desligadas'}: span {span:4.0f} ns | "
+              f"contador {inc:4.0f} ns | histograma {obs:4.0f} ns")
+    metrics._METRICAS.remove(contador)
+    metrics._METRICAS.remove(histograma)
+
+
+async def rodada(process_user_input, textos: list[str]) -> float:
+    inicio = time.perf_counter()
+    for texto in textos:
+        async for _ in process_user_input(texto):
+            pass
+    return (time.perf_counter() - inicio) / len(textos)
+
+
+async def pipeline(rodadas: int):
+    import llm
+    from pipeline import process_user_input
+
+    llm.CLIENTE.backend = BackendFalso()
+    with open(CORPUS, encoding="utf-8") as f:
+        textos = [json.loads(linha)["texto"] for linha in f if linha.strip()]
+
+    # Aquecimento: caches de consulta do FAQ e de rotas, regex, ONNX
+    await rodada(process_user_input, textos)
+    tempos = {False: [], True: []}
+    for i in range(rodadas * 2):
+        ativo = i % 2 == 1
+        metrics.ATIVO = ativo
+        tempos[ativo].append(await rodada(process_user_input, textos))
+    desligadas, ligadas = statistics.median(tempos[False]), statistics.median(tempos[True])
+    print(f"\npipeline ({len(textos)} mensagens, mediana de {rodadas} rodadas): "
+          f"desligadas {desligadas * 1e6:.1f} µs/msg | ligadas {ligadas * 1e6:.1f} µs/msg | "
+          f"custo {(ligadas - desligadas) * 1e6:+.1f} µs/msg ({(ligadas / desligadas - 1) * 100:+.1f}%)")
+
+    metrics.ATIVO = True
+    n = 200
+    inicio = time.perf_counter()
+    for _ in range(n):
+        texto = metrics.expor()
+    print(f"/metrics: {len(texto.splitlines())} linhas, {len(texto) / 1024:.1f} KiB, "
+          f"{(time.perf_counter() - inicio) / n * 1e3:.2f} ms por coleta")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rodadas", type=int, default=7)
+    args = parser.parse_args()
+    micro()
+    asyncio.run(pipeline(args.rodadas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_rota_engine.py
+"""
+Compara o RoutingEngine (rede expandida por linha em CSR + A* com limite de
+saltos pré-calculado) com a implementação antiga em networkx (A* com
+nx.shortest_path na heurística e peso via lambda) em todos os pares de
+estações, modo "rapido".
+
+Requer networkx, que não é mais dependência do app (pip install networkx).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_rota_engine
+"""
+import itertools
+import time
+
+import networkx as nx
+
+from nlp_processor import load_linhas
+from services.rota_engine import RoutingEngine, TEMPO_BASE, normalize, penalidade_status
+
+
+def _grafo_legado(linhas: list[dict]) -> nx.Graph:
+    G = nx.Graph()
+    for linha in linhas:
+        estacoes = linha.get("estacoes", [])
+        for a, b in zip(estacoes[:-1], estacoes[1:]):
+            G.add_edge(a, b, tempo=TEMPO_BASE, linha=linha.get("nome", ""))
+    return G
+
+
+def _rota_legada(G: nx.Graph, status: dict, origem: str, destino: str):
+    def peso(u, v, d):
+        return d["tempo"] + penalidade_status(status.get(normalize(d["linha"]), ""))
+
+    heur = lambda u, v: TEMPO_BASE * (len(nx.shortest_path(G, u, v)) - 1)
+    try:
+        caminho = nx.astar_path(G, origem, destino, heuristic=heur, weight=peso)
+    except nx.NetworkXNoPath:
+        return None, None
+    custo = sum(peso(u, v, G[u][v]) for u, v in zip(caminho[:-1], caminho[1:]))
+    return caminho, custo
+
+
+def main():
+    linhas = load_linhas()["linhas"]
+    # Uma linha com falha para que os pesos não sejam todos iguais
+    status = {normalize("Linha 3-Vermelha"): "velocidade reduzida"}
+
+    G = _grafo_legado(linhas)
+    inicio = time.perf_counter()
+    engine = RoutingEngine(linhas, status, load_linhas().get("baldeacoes", []))
+    build_ms = (time.perf_counter() - inicio) * 1e3
+
+    pares = list(itertools.permutations(G.nodes, 2))
+
+    inicio = time.perf_counter()
+    legado = {par: _rota_legada(G, status, *par) for par in pares}
+    t_legado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    novo = {}
+    for o, d in pares:
+        rota = engine.buscar(engine.ids[o], engine.ids[d])
+        novo[(o, d)] = (rota.estacoes, rota.custo) if rota else (None, None)
+    t_novo = time.perf_counter() - inicio
+
+    mesmo_custo = sum(legado[p][1] == novo[p][1] for p in pares)
+    mais_barato = sum(legado[p][1] is None or (novo[p][1] or 0) < legado[p][1] for p in pares)
+    mesmo_caminho = sum(legado[p][0] == novo[p][0] for p in pares)
+
+    print(f"pares: {len(pares)} | build do engine: {build_ms:.1f} ms")
+    print(f"networkx: {t_legado:8.2f} s  ({t_legado / len(pares) * 1e3:.3f} ms/par)")
+    print(f"engine:   {t_novo:8.2f} s  ({t_novo / len(pares) * 1e3:.3f} ms/par)  "
+          f"→ {t_legado / t_novo:.0f}x")
+    print(f"custo idêntico: {mesmo_custo}/{len(pares)} | custo menor: {mais_barato} "
+          f"(baldeação Palmeiras-Barra Funda ↔ Barra Funda) | caminho idêntico: {mesmo_caminho}/{len(pares)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bench_rota_pareto.py
+"""
+Busca multicritério (buscar_pareto, uma passada) contra três buscas A*
+independentes (uma por modo) em todos os pares de estações. Também confere
+que a rota escolhida do conjunto de Pareto tem o mesmo custo que a busca do modo.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_rota_pareto
+"""
+import itertools
+import time
+
+from nlp_processor import load_linhas
+from services.rota_engine import MODOS, RoutingEngine, escolher_rota, normalize
+
+
+def main():
+    dados = load_linhas()
+    status = {normalize("Linha 3-Vermelha"): "velocidade reduzida"}
+    engine = RoutingEngine(dados["linhas"], status, dados.get("baldeacoes", []))
+    pares = list(itertools.permutations(range(len(engine.nomes)), 2))
+
+    inicio = time.perf_counter()
+    independentes = {par: [engine.buscar(*par, modo) for modo in MODOS] for par in pares}
+    t_tres = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pareto = {par: engine.buscar_pareto(*par) for par in pares}
+    t_pareto = time.perf_counter() - inicio
+
+    divergentes = 0
+    for par in pares:
+        for modo, rota in zip(MODOS, independentes[par]):
+            escolhida = escolher_rota(pareto[par], modo)
+            if (rota is None) != (escolhida is None) or (rota and rota.custo != escolhida.custo):
+                divergentes += 1
+    tamanhos = [len(r) for r in pareto.values()]
+
+    print(f"pares: {len(pares)}")
+    print(f"3 buscas A*:  {t_tres:6.2f} s  ({t_tres / len(pares) * 1e3:.3f} ms/par)")
+    print(f"pareto:       {t_pareto:6.2f} s  ({t_pareto / len(pares) * 1e3:.3f} ms/par)  "
+          f"→ {t_tres / t_pareto:.2f}x")
+    print(f"rotas no conjunto de Pareto: média {sum(tamanhos) / len(tamanhos):.2f}, máx {max(tamanhos)}")
+    print(f"custos divergentes entre pareto e busca por modo: {divergentes}")
+
+
+if __name__ == "__main__":
+    main()
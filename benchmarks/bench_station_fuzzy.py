@@ -0,0 +1,94 @@
+# benchmarks/bench_station_fuzzy.py
+"""
+Busca aproximada de estações (FuzzyStationIndex, nlp_processor.py) conforme a
+lista cresce: das ~150 estações atuais a 20k+ nomes (paradas de ônibus
+sintéticas, como em bench_station_matcher). Mede a construção do índice, o
+tempo por consulta de buscar() com erros de digitação (uma edição sorteada
+sobre nomes reais), contra a força bruta (distância de edição para todos os
+nomes), a taxa de acerto do primeiro candidato, e o tempo de find() sobre
+mensagens inteiras, o caminho do nlp_pipeline quando a busca exata falha.
+Trechos com menos de 6 letras só casam exatos (_tolerancia): um nome de 6
+letras com uma letra a menos conta como erro.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_station_fuzzy
+"""
+import random
+import string
+import time
+
+from benchmarks.bench_station_matcher import _nomes_sinteticos
+from nlp_processor import FuzzyStationIndex, _canonico, _tolerancia, distancia_edicao, load_linhas, normalize_text
+
+MENSAGENS = [
+    "quero ir do paraizo para barra fund",
+    "me leva pra republica partindo da vila madalna",
+    "Oi Ceci, como eu faço para ir do Tatupe até Pinheros passando pela Paulista?",
+]
+
+
+def _com_erro(nome: str, rnd: random.Random) -> str:
+    """Uma edição: troca, remoção, inserção ou inversão de letras vizinhas."""
+    i = rnd.randrange(1, len(nome) - 1)
+    op = rnd.choice(("troca", "remocao", "insercao", "inversao"))
+    if op == "troca":
+        return nome[:i] + rnd.choice(string.ascii_lowercase) + nome[i + 1:]
+    if op == "remocao":
+        return nome[:i] + nome[i + 1:]
+    if op == "insercao":
+        return nome[:i] + rnd.choice(string.ascii_lowercase) + nome[i:]
+    return nome[:i - 1] + nome[i] + nome[i - 1] + nome[i + 1:]
+
+
+def _forca_bruta(nomes: list[str], consulta: str) -> list[tuple[str, int]]:
+    consulta = _canonico(normalize_text(consulta))
+    k = _tolerancia(len(consulta))
+    achados = [(nome, d) for nome in nomes if (d := distancia_edicao(consulta, nome, k)) <= k]
+    return sorted(achados, key=lambda par: (par[1], par[0]))[:5]
+
+
+def main():
+    reais = [s for linha in load_linhas()["linhas"] for s in linha["estacoes"]]
+    rnd = random.Random(7)
+    alvos = [est for est in dict.fromkeys(reais) if len(_canonico(normalize_text(est))) >= 6]
+    consultas = [(est, _com_erro(normalize_text(est), rnd)) for est in rnd.choices(alvos, k=300)]
+
+    print(f"{'nomes':>7} | {'build (ms)':>10} | {'buscar (µs)':>11} {'p99':>6} | {'força bruta (µs)':>16} | "
+          f"{'top-1':>6} | {'find (µs/msg)':>13}")
+    for extra in (0, 1_000, 5_000, 20_000, 50_000):
+        estacoes = reais + _nomes_sinteticos(extra)
+
+        inicio = time.perf_counter()
+        indice = FuzzyStationIndex(estacoes)
+        build_ms = (time.perf_counter() - inicio) * 1e3
+
+        tempos, acertos = [], 0
+        for esperado, consulta in consultas:
+            inicio = time.perf_counter()
+            resultado = indice.buscar(consulta)
+            tempos.append(time.perf_counter() - inicio)
+            acertos += bool(resultado) and resultado[0][0] == esperado
+        tempos.sort()
+        media = sum(tempos) / len(tempos) * 1e6
+        p99 = tempos[int(len(tempos) * 0.99)] * 1e6
+
+        nomes = [_canonico(normalize_text(e)) for e in estacoes]
+        amostra = consultas[:20 if extra else 100]
+        inicio = time.perf_counter()
+        for _, consulta in amostra:
+            _forca_bruta(nomes, consulta)
+        bruta = (time.perf_counter() - inicio) / len(amostra) * 1e6
+
+        repeticoes = 200
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for msg in MENSAGENS:
+                indice.find(msg)
+        find_us = (time.perf_counter() - inicio) / (repeticoes * len(MENSAGENS)) * 1e6
+
+        print(f"{len(indice):>7} | {build_ms:>10.1f} | {media:>11.1f} {p99:>6.0f} | {bruta:>16.0f} | "
+              f"{acertos / len(consultas):>6.1%} | {find_us:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_station_matcher.py
+"""
+Micro-benchmark do STATION_MATCHER: custo por mensagem conforme a lista de
+estações cresce (das ~150 atuais até 20k+ nomes, como paradas de ônibus),
+comparado ao método antigo (um re.finditer por estação).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_station_matcher
+"""
+import random
+import re
+import string
+import time
+
+from nlp_processor import StationMatcher, load_linhas, normalize_text
+
+MENSAGENS = [
+    "Como chegar de Santa Cruz até Campo Limpo Paulista?",
+    "quero ir da Sé para a Luz agora de manhã, tem algum problema na linha?",
+    "Oi Ceci, como eu faço para ir do Tatuapé até Pinheiros passando pela Paulista?",
+]
+
+
+def _nomes_sinteticos(qtd: int, semente: int = 42) -> list[str]:
+    rnd = random.Random(semente)
+    prefixos = ["Rua", "Av.", "Praça", "Terminal", "Parada", "Largo", "Vila", "Jardim"]
+    nomes = set()
+    while len(nomes) < qtd:
+        palavra = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(5, 10))).capitalize()
+        nomes.add(f"{rnd.choice(prefixos)} {palavra} {rnd.randint(1, 999)}")
+    return list(nomes)
+
+
+def _legado(estacoes: list[str], texto: str) -> list[tuple[int, str]]:
+    norm_input = normalize_text(texto)
+    encontrados = []
+    for station in estacoes:
+        for match in re.finditer(re.escape(normalize_text(station)), norm_input):
+            encontrados.append((match.start(), station))
+    return sorted(encontrados)
+
+
+def _cronometrar(fn, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for msg in MENSAGENS:
+            fn(msg)
+    return (time.perf_counter() - inicio) / (repeticoes * len(MENSAGENS)) * 1e6
+
+
+def main():
+    reais = [s for linha in load_linhas()["linhas"] for s in linha["estacoes"]]
+    print(f"{'estações':>9} | {'build (ms)':>10} | {'matcher (µs/msg)':>16} | {'legado (µs/msg)':>15}")
+    for extra in (0, 1_000, 5_000, 20_000, 50_000):
+        estacoes = reais + _nomes_sinteticos(extra)
+
+        inicio = time.perf_counter()
+        matcher = StationMatcher(estacoes)
+        build_ms = (time.perf_counter() - inicio) * 1e3
+
+        us_matcher = _cronometrar(matcher.find, 2_000)
+        us_legado = _cronometrar(lambda m: _legado(estacoes, m), 3 if extra else 50)
+        print(f"{len(matcher):>9} | {build_ms:>10.1f} | {us_matcher:>16.1f} | {us_legado:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# benchmarks/bench_workers.py
+"""
+Memória por worker conforme o número de workers cresce: `uvicorn app:app
+--workers N` (cada worker importa e carrega tudo) contra o prefork
+(CECI_WORKERS=N python app.py, prefork.py: carrega uma vez e faz fork). Para
+cada N, espera todos os workers responderem 200 no /readyz (o pid vem na
+resposta), mede, manda --mensagens perguntas do corpus do loadgen
+(benchmarks/dados/carga.jsonl) por worker pelo /ws/ceci e mede de novo, já
+com as páginas que o uso separa (contagens de referência, caches, arenas).
+
+Por processo, de /proc/<pid>/smaps_rollup: USS (páginas só dele,
+Private_Clean + Private_Dirty), PSS (as compartilhadas divididas entre quem
+as mapeia) e RSS. "total" é o PSS somado da árvore inteira (mestre incluído),
+a memória que o grupo realmente ocupa. A LLM é o servidor falso
+(benchmarks/fake_llm.py). Só Linux; precisa do modelo e do índice do FAQ.
+Os números dependem do encoder (CECI_FAQ_ENCODER): meça com o backend que
+vai para produção.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--mensagens 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORTA_LLM = 8020
+PORTA_APP = 8019
+CORPUS = os.path.join(os.path.dirname(__file__), "dados", "carga.jsonl")
+
+
+def memoria(pid: int) -> dict[str, float]:
+    """MiB de USS, PSS e RSS do processo."""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return {"uss": campos["Private_Clean"] + campos["Private_Dirty"], "pss": campos["Pss"], "rss": campos["Rss"]}
+
+
+def arvore(raiz: int) -> list[int]:
+    """A raiz e todos os descendentes."""
+    filhos: dict[int, list[int]] = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        filhos.setdefault(ppid, []).append(int(nome))
+    pids, pendentes = [], [raiz]
+    while pendentes:
+        pid = pendentes.pop()
+        pids.append(pid)
+        pendentes += filhos.get(pid, [])
+    return pids
+
+
+def medir(raiz: int, workers: set[int]) -> dict[str, float]:
+    por_worker, total = [], 0.0
+    for pid in arvore(raiz):
+        try:
+            m = memoria(pid)
+        except OSError:
+            continue
+        total += m["pss"]
+        if pid in workers:
+            por_worker.append(m)
+    return {
+        "uss": statistics.mean(m["uss"] for m in por_worker),
+        "pss": statistics.mean(m["pss"] for m in por_worker),
+        "rss": statistics.mean(m["rss"] for m in por_worker),
+        "total": total,
+    }
+
+
+def esperar_workers(n: int, proc: subprocess.Popen, segundos: float = 300) -> set[int]:
+    prontos: set[int] = set()
+    limite = time.monotonic() + segundos
+    while len(prontos) < n:
+        if proc.poll() is not None:
+            raise RuntimeError("o app terminou")
+        if time.monotonic() > limite:
+            raise RuntimeError(f"só {len(prontos)} de {n} workers ficaram prontos")
+        try:
+            # Conexão nova a cada vez, para o kernel entregar a workers diferentes
+            r = httpx.get(f"http://127.0.0.1:{PORTA_APP}/readyz", timeout=2)
+            if r.status_code == 200:
+                prontos.add(r.json()["pid"])
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return prontos
+
+
+async def trafego(textos: list[str], conexoes: int):
+    import websockets
+
+    async def cliente(inicio: int):
+        async with websockets.connect(f"ws://127.0.0.1:{PORTA_APP}/ws/ceci") as ws:
+            for texto in textos[inicio::conexoes]:
+                await ws.send(texto)
+                while await ws.recv() != "[DONE]":
+                    pass
+
+    await asyncio.gather(*(cliente(i) for i in range(conexoes)))
+
+
+def rodar(modo: str, n: int, textos: list[str], env: dict) -> tuple[dict, dict]:
+    if modo == "prefork":
+        cmd = [sys.executable, "app.py"]
+        env = dict(env, PORT=str(PORTA_APP), CECI_WORKERS=str(n))
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app:app", "--port", str(PORTA_APP), "--workers", str(n),
+               "--log-level", "warning"]
+    app = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        workers = esperar_workers(n, app)
+        time.sleep(1)
+        antes = medir(app.pid, workers)
+        asyncio.run(trafego(textos, 2 * n))
+        time.sleep(1)
+        depois = medir(app.pid, workers)
+    finally:
+        app.terminate()
+        app.wait()
+    return antes, depois
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--mensagens", type=int, default=100, help="perguntas por worker")
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(linha)["texto"] for linha in f if linha.strip()]
+
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--porta", str(PORTA_LLM),
+                            "--ttft", "0.05", "--tokens-por-s", "500", "--tokens", "20"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(os.environ, CECI_LLM_BASE_URL=f"http://127.0.0.1:{PORTA_LLM}/v1", CECI_LLM_API_KEY="fake")
+    try:
+        print(f"{'modo':>8} {'N':>2} | {'USS/worker':>10} {'PSS/worker':>10} {'RSS/worker':>10} "
+              f"{'total':>7} | depois de {args.mensagens} msgs/worker: {'USS':>6} {'PSS':>6} {'total':>7}  (MiB)")
+        for n in (int(x) for x in args.workers.split(",")):
+            textos = (corpus * (args.mensagens * n // len(corpus) + 1))[:args.mensagens * n]
+            # Com CECI_WORKERS=1 o app.py roda o uvicorn direto, sem mestre
+            for modo in ("uvicorn", "prefork") if n > 1 else ("uvicorn",):
+                antes, depois = rodar(modo, n, textos, env)
+                print(f"{modo:>8} {n:>2} | {antes['uss']:10.1f} {antes['pss']:10.1f} {antes['rss']:10.1f} "
+                      f"{antes['total']:7.1f} | {' ' * 27}{depois['uss']:6.1f} {depois['pss']:6.1f} "
+                      f"{depois['total']:7.1f}")
+    finally:
+        llm.terminate()
+        llm.wait()
+
+
+if __name__ == "__main__":
+    main()
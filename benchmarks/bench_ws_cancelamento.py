@@ -0,0 +1,135 @@
+# benchmarks/bench_ws_cancelamento.py
+"""
+Usuário que corrige a pergunta no meio da resposta: cada uma das --conexoes
+conexões envia uma pergunta A e, --atraso-ms depois do primeiro pedaço da
+resposta, uma pergunta B. Compara o formato texto esperando a vez
+(CECI_WS_SUBSTITUIR=0, o padrão), o texto com substituição (=1), o
+json com {"substituir": true} e o json com A e B em paralelo. Mostra o tempo
+até o primeiro pedaço de B e quantos tokens a LLM gerou (e quantos streams
+foram interrompidos) segundo o servidor falso (benchmarks/fake_llm.py).
+
+Sobe o app de verdade (uvicorn app:app) apontado para o servidor falso, sem
+llm_cache e sem respostas diretas do FAQ; precisa do modelo e do índice do
+FAQ como o app normal.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_ws_cancelamento [--conexoes 20] [--atraso-ms 300]
+                                               [--tokens 200] [--tokens-por-s 40]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORTA_LLM = 8013
+PORTA_APP = 8014
+
+
+def _esperar(url: str, proc: subprocess.Popen, segundos: float = 120):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url}: o processo terminou")
+        try:
+            httpx.get(url, timeout=0.5).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu")
+
+
+async def cliente(n: int, formato: str, atraso: float, paralelo: bool) -> float:
+    """Segundos entre o envio de B e o primeiro pedaço da resposta de B."""
+    import websockets
+
+    pergunta_a = f"me conta uma curiosidade sobre os trens da cidade número {n}"
+    pergunta_b = f"me conta uma curiosidade sobre os ônibus da cidade número {n}"
+    async with websockets.connect(f"ws://127.0.0.1:{PORTA_APP}/ws/ceci?formato={formato}") as ws:
+        if formato == "texto":
+            await ws.send(pergunta_a)
+            await ws.recv()
+            await asyncio.sleep(atraso)
+            envio_b = time.perf_counter()
+            await ws.send(pergunta_b)
+            while await ws.recv() != "[DONE]":
+                pass
+            primeiro = await ws.recv()
+            ttfb = time.perf_counter() - envio_b
+            while primeiro != "[DONE]":
+                primeiro = await ws.recv()
+            return ttfb
+
+        await ws.send(json.dumps({"id": "a", "texto": pergunta_a}))
+        while json.loads(await ws.recv())["tipo"] != "delta":
+            pass
+        await asyncio.sleep(atraso)
+        envio_b = time.perf_counter()
+        await ws.send(json.dumps({"id": "b", "texto": pergunta_b, "substituir": not paralelo}))
+        ttfb, abertas = None, {"a", "b"}
+        while abertas:
+            q = json.loads(await ws.recv())
+            if q["id"] == "b" and q["tipo"] == "delta" and ttfb is None:
+                ttfb = time.perf_counter() - envio_b
+            if q["tipo"] in ("fim", "erro", "cancelado"):
+                abertas.discard(q["id"])
+        return ttfb
+
+
+def rodar(args, nome: str, formato: str, substituir: bool, paralelo: bool = False):
+    env = dict(os.environ, CECI_LLM_BASE_URL=f"http://127.0.0.1:{PORTA_LLM}/v1", CECI_LLM_API_KEY="fake",
+               CECI_LLM_CACHE="0", CECI_FAQ_DIRETO="0", CECI_WS_SUBSTITUIR="1" if substituir else "0",
+               # Sem fila no ClienteLLM: a comparação é só do protocolo
+               CECI_LLM_CONCORRENCIA=str(2 * args.conexoes))
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--porta", str(PORTA_LLM),
+                            "--ttft", str(args.ttft), "--tokens", str(args.tokens),
+                            "--tokens-por-s", str(args.tokens_por_s)])
+    app = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(PORTA_APP),
+                            "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL)
+    try:
+        _esperar(f"http://127.0.0.1:{PORTA_LLM}/stats", llm)
+        _esperar(f"http://127.0.0.1:{PORTA_APP}/readyz", app)
+
+        async def todos():
+            return await asyncio.gather(*(cliente(n, formato, args.atraso_ms / 1000, paralelo)
+                                          for n in range(args.conexoes)))
+
+        inicio = time.perf_counter()
+        ttfbs = sorted(asyncio.run(todos()))
+        duracao = time.perf_counter() - inicio
+        time.sleep(0.5)
+        estado = httpx.get(f"http://127.0.0.1:{PORTA_LLM}/stats").json()
+        ws = httpx.get(f"http://127.0.0.1:{PORTA_APP}/status").json()["ws"]
+    finally:
+        for proc in (app, llm):
+            proc.terminate()
+            proc.wait()
+
+    print(f"{nome:>22}: primeiro pedaço de B p50 {statistics.median(ttfbs) * 1e3:6.0f} ms "
+          f"máx {ttfbs[-1] * 1e3:6.0f} ms | {duracao:5.1f} s no total | LLM: {estado['tokens']} tokens, "
+          f"{estado['concluidos']} completos, {estado['interrompidos']} interrompidos | "
+          f"canceladas no app {ws['canceladas']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conexoes", type=int, default=20)
+    parser.add_argument("--atraso-ms", type=float, default=300)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--tokens-por-s", type=float, default=40)
+    args = parser.parse_args()
+
+    rodar(args, "texto, esperando a vez", "texto", substituir=False)
+    rodar(args, "texto, substituindo", "texto", substituir=True)
+    rodar(args, "json, substituir", "json", substituir=True)
+    rodar(args, "json, em paralelo", "json", substituir=True, paralelo=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/bench_ws_saida.py
+"""
+Quadros por segundo e CPU por stream no WebSocket, com e sem o agrupamento de
+pedaços (protocolo.agrupar) e nos formatos texto e json. O servidor (outro
+processo, uvicorn) usa protocolo.atender com um pipeline falso que gera
+--tokens tokens curtos, com --intervalo-ms entre eles (0 = resposta em cache
+ou modelo rápido); os clientes abrem --conexoes WebSockets e mandam
+--mensagens perguntas em sequência cada. A CPU é a do processo servidor
+(/proc/<pid>/stat).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_ws_saida [--conexoes 20] [--mensagens 10] [--tokens 120]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+PORTA = 8012
+TOKENS = "A estação mais próxima fica a duas quadras; siga pela linha azul até a Sé e faça a baldeação ".split(" ")
+
+
+def criar_app(tokens: int, intervalo_ms: float):
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+    import protocolo
+
+    async def processar(texto: str, ctx):
+        ctx.intent, ctx.lang = "fallback", "pt"
+        for i in range(tokens):
+            if intervalo_ms:
+                await asyncio.sleep(intervalo_ms / 1000)
+            yield TOKENS[i % len(TOKENS)] + " "
+
+    app = FastAPI()
+
+    @app.websocket("/ws/ceci")
+    async def ws(websocket: WebSocket, formato: str = "texto"):
+        await websocket.accept()
+        try:
+            await protocolo.atender(websocket, processar, formato)
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def _cpu(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        campos = f.read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def cliente(formato: str, mensagens: int) -> tuple[int, list[float], int]:
+    import websockets
+
+    quadros, ttfbs, caracteres = 0, [], 0
+    async with websockets.connect(f"ws://127.0.0.1:{PORTA}/ws/ceci?formato={formato}", max_size=None) as ws:
+        for i in range(mensagens):
+            inicio = time.perf_counter()
+            await ws.send("como chego na Sé?")
+            primeiro = True
+            while True:
+                msg = await ws.recv()
+                quadros += 1
+                if formato == "texto":
+                    if msg == "[DONE]":
+                        break
+                    caracteres += len(msg)
+                else:
+                    q = json.loads(msg)
+                    if q["tipo"] in ("fim", "erro"):
+                        break
+                    if q["tipo"] != "delta":
+                        continue
+                    caracteres += len(q["texto"])
+                if primeiro:
+                    ttfbs.append(time.perf_counter() - inicio)
+                    primeiro = False
+    return quadros, ttfbs, caracteres
+
+
+def rodar(args, formato: str, agrupar_bytes: int, agrupar_ms: float, intervalo_ms: float):
+    env = dict(os.environ, CECI_WS_AGRUPAR_BYTES=str(agrupar_bytes), CECI_WS_AGRUPAR_MS=str(agrupar_ms))
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_ws_saida", "--servidor",
+                             "--tokens", str(args.tokens), "--intervalo-ms", str(intervalo_ms)], env=env)
+    try:
+        time.sleep(0.5)
+        for _ in range(100):
+            try:
+                asyncio.run(cliente(formato, 1))
+                break
+            except OSError:
+                time.sleep(0.1)
+        cpu0 = _cpu(proc.pid)
+        inicio = time.perf_counter()
+
+        async def todos():
+            return await asyncio.gather(*(cliente(formato, args.mensagens) for _ in range(args.conexoes)))
+
+        resultados = asyncio.run(todos())
+        duracao = time.perf_counter() - inicio
+        cpu = _cpu(proc.pid) - cpu0
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    streams = args.conexoes * args.mensagens
+    quadros = sum(r[0] for r in resultados)
+    ttfbs = sorted(t for r in resultados for t in r[1])
+    esperado = sum(len(TOKENS[i % len(TOKENS)]) + 1 for i in range(args.tokens))
+    integros = all(r[2] == esperado * args.mensagens for r in resultados)
+    agrupamento = f"{agrupar_bytes} B / {agrupar_ms:g} ms" if agrupar_bytes or agrupar_ms else "desligado"
+    print(f"{formato:>5} | agrupamento {agrupamento:>13} | intervalo {intervalo_ms:>4g} ms | "
+          f"{quadros / streams:6.1f} quadros/stream | {quadros / duracao:8.0f} quadros/s | "
+          f"CPU {cpu / streams * 1e3:6.2f} ms/stream | primeiro byte p50 {ttfbs[len(ttfbs) // 2] * 1e3:5.1f} ms | "
+          f"texto íntegro {'sim' if integros else 'NÃO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servidor", action="store_true")
+    parser.add_argument("--conexoes", type=int, default=20)
+    parser.add_argument("--mensagens", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--intervalo-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.servidor:
+        import uvicorn
+        uvicorn.run(criar_app(args.tokens, args.intervalo_ms), host="127.0.0.1", port=PORTA, log_level="warning")
+        return
+
+    for intervalo in (0, 10):
+        rodar(args, "texto", 0, 0, intervalo)
+        rodar(args, "texto", 64, 30, intervalo)
+        rodar(args, "json", 0, 0, intervalo)
+        rodar(args, "json", 64, 30, intervalo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/fake_llm.py
+"""
+Servidor local compatível com a API de chat da OpenAI, para testes e carga sem
+rede nem custo: responde POST /v1/chat/completions (com ou sem stream) com
+tokens fixos, na velocidade configurada, e pode injetar erros 429/500 antes
+do primeiro token. Com --capacidade responde 429 quando já há esse número de
+streams abertos (como o limite de uma conta na API); com --travar, uma fração
+das requisições demora --ttft-travado segundos até o primeiro token.
+GET /v1/models serve o aquecimento do cliente e GET /stats mostra requisições,
+erros, o pico de streams simultâneos, os tokens enviados e os streams
+interrompidos pelo cliente.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.fake_llm [--porta 8001] [--ttft 0.2] [--tokens-por-s 50] [--tokens 60]
+                                  [--erro-429 0.1] [--erro-500 0.05] [--capacidade 32]
+                                  [--travar 0.1] [--ttft-travado 30]
+    CECI_LLM_BASE_URL=http://127.0.0.1:8001/v1 CECI_LLM_API_KEY=fake uvicorn app:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKENS = (
+    "Claro! A Ceci pode ajudar com isso. No metrô de São Paulo você encontra "
+    "informações nas estações, no app Metrô SP e com os funcionários. "
+).split(" ")
+
+
+def criar_app(ttft: float = 0.2, tokens_por_s: float = 50, tokens: int = 60,
+              erro_429: float = 0.0, erro_500: float = 0.0, capacidade: int = 0,
+              travar: float = 0.0, ttft_travado: float = 30.0, semente: int | None = None) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(semente)
+    estado = {"requisicoes": 0, "erros_429": 0, "erros_500": 0, "travados": 0, "streams": 0,
+              "pico_streams": 0, "concluidos": 0, "interrompidos": 0, "tokens": 0}
+
+    def _chunk(conteudo: str | None, fim: bool = False) -> str:
+        delta = {} if conteudo is None else {"content": conteudo}
+        corpo = {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": "fake", "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if fim else None}],
+        }
+        return f"data: {json.dumps(corpo, ensure_ascii=False)}\n\n"
+
+    @app.get("/v1/models")
+    async def modelos():
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "ceci"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return estado
+
+    @app.post("/v1/chat/completions")
+    async def completar(request: Request):
+        corpo = await request.json()
+        estado["requisicoes"] += 1
+        sorteio = rng.random()
+        if sorteio < erro_429 or (capacidade and estado["streams"] >= capacidade):
+            estado["erros_429"] += 1
+            return JSONResponse({"error": {"message": "rate limit", "type": "rate_limit_error"}}, status_code=429)
+        if sorteio < erro_429 + erro_500:
+            estado["erros_500"] += 1
+            return JSONResponse({"error": {"message": "falha simulada", "type": "server_error"}}, status_code=500)
+
+        espera = ttft
+        if rng.random() < travar:
+            estado["travados"] += 1
+            espera = ttft_travado
+        n = min(tokens, corpo.get("max_tokens") or tokens)
+        texto = [TOKENS[i % len(TOKENS)] + " " for i in range(n)]
+        if not corpo.get("stream"):
+            await asyncio.sleep(espera + n / tokens_por_s)
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": "fake",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(texto).strip()},
+                             "finish_reason": "stop"}],
+            }
+
+        async def gerar():
+            # Conta o stream só quando o gerador começa: se o cliente fechar antes
+            # disso, o corpo nunca roda e o finally abaixo não teria o que descontar
+            estado["streams"] += 1
+            estado["pico_streams"] = max(estado["pico_streams"], estado["streams"])
+            completo = False
+            try:
+                await asyncio.sleep(espera)
+                yield _chunk(None)
+                for token in texto:
+                    yield _chunk(token)
+                    estado["tokens"] += 1
+                    await asyncio.sleep(1 / tokens_por_s)
+                yield _chunk(None, fim=True)
+                yield "data: [DONE]\n\n"
+                completo = True
+                estado["concluidos"] += 1
+            finally:
+                # Cliente que fecha a conexão no meio: cancelamento ou GeneratorExit
+                if not completo:
+                    estado["interrompidos"] += 1
+                estado["streams"] -= 1
+
+        return StreamingResponse(gerar(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8001)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-por-s", type=float, default=50)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--erro-429", type=float, default=0.0)
+    parser.add_argument("--erro-500", type=float, default=0.0)
+    parser.add_argument("--capacidade", type=int, default=0)
+    parser.add_argument("--travar", type=float, default=0.0)
+    parser.add_argument("--ttft-travado", type=float, default=30.0)
+    args = parser.parse_args()
+    app = criar_app(args.ttft, args.tokens_por_s, args.tokens, args.erro_429, args.erro_500,
+                    args.capacidade, args.travar, args.ttft_travado)
+    uvicorn.run(app, host="127.0.0.1", port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
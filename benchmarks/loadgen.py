@@ -0,0 +1,288 @@
+# benchmarks/loadgen.py
+"""
+Gerador de carga do /ws/ceci: --clientes conexões simultâneas repetem
+perguntas de um corpus JSONL ({"intent": ..., "texto": ...}, padrão
+benchmarks/dados/carga.jsonl) sorteadas pela mistura --mix, com --pensar
+segundos entre o fim de uma resposta e a próxima pergunta. Mede a vazão, o
+tempo até o primeiro pedaço e até o fim da resposta ("[DONE]" ou o quadro
+"fim"), com p50/p95/p99 por intent, e no fim de cada patamar mostra os
+contadores do /status (fila da LLM, estágios, llm_cache) e a CPU do app.
+
+--clientes aceita uma rampa ("10,50,100"): um patamar de --duracao segundos
+para cada valor, para achar onde a latência dispara. Com --subir, o script
+sobe o servidor LLM falso (benchmarks/fake_llm.py, com --ttft e
+--tokens-por-s) e o app (uvicorn app:app) apontado para ele; sem --subir,
+usa o app que estiver em --url (a CPU só aparece com --subir).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.loadgen --subir [--clientes 10,50,100] [--duracao 30] [--ttft 0.4]
+                                 [--tokens-por-s 60] [--sem-cache]
+    python -m benchmarks.loadgen --url ws://127.0.0.1:5000/ws/ceci --clientes 50 [--formato texto]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+CORPUS = os.path.join(os.path.dirname(__file__), "dados", "carga.jsonl")
+MIX = "smalltalk=15,rota=25,faq=30,relatorio=5,fallback=25"
+PORTA_LLM = 8015
+PORTA_APP = 8016
+
+
+def carregar_corpus(caminho: str) -> dict[str, list[str]]:
+    corpus = defaultdict(list)
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                item = json.loads(linha)
+                corpus[item["intent"]].append(item["texto"])
+    return dict(corpus)
+
+
+def ler_mix(texto: str, corpus: dict) -> tuple[list[str], list[float]]:
+    intents, pesos = [], []
+    for parte in texto.split(","):
+        intent, _, peso = parte.partition("=")
+        if intent.strip() in corpus and float(peso or 1) > 0:
+            intents.append(intent.strip())
+            pesos.append(float(peso or 1))
+    if not intents:
+        raise SystemExit(f"nenhum intent de --mix está no corpus ({', '.join(corpus)})")
+    return intents, pesos
+
+
+def _pct(valores: list[float], p: float) -> float:
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def _cpu(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        campos = f.read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Resultados:
+    def __init__(self):
+        self.primeiro = defaultdict(list)   # intent -> s até o primeiro pedaço
+        self.fim = defaultdict(list)        # intent -> s até "[DONE]"/"fim"
+        self.erros = defaultdict(int)       # intent -> respostas com erro
+        self.falhas_conexao = 0
+
+
+async def cliente(args, url: str, corpus: dict, intents: list[str], pesos: list[float],
+                  prazo: float, res: Resultados, rng: random.Random):
+    import websockets
+
+    async def conectar():
+        try:
+            return await websockets.connect(url, open_timeout=30, max_size=None)
+        except Exception:
+            res.falhas_conexao += 1
+            return None
+
+    ws = await conectar()
+    if ws is None:
+        return
+    id_msg = 0
+    # Começos espalhados, para os clientes não andarem em fila
+    await asyncio.sleep(min(rng.uniform(0, args.pensar), max(prazo - time.monotonic(), 0)))
+    try:
+        while time.monotonic() < prazo:
+            if ws is None:
+                ws = await conectar()
+                if ws is None:
+                    await asyncio.sleep(min(1.0, max(prazo - time.monotonic(), 0)))
+                    continue
+            intent = rng.choices(intents, pesos)[0]
+            texto = rng.choice(corpus[intent])
+            id_msg += 1
+            inicio = time.perf_counter()
+            primeiro = None
+            erro = False
+            try:
+                await ws.send(texto if args.formato == "texto" else json.dumps({"id": id_msg, "texto": texto}))
+                while True:
+                    msg = await asyncio.wait_for(ws.recv(), args.timeout)
+                    if args.formato == "texto":
+                        if msg == "[DONE]":
+                            break
+                    else:
+                        tipo = json.loads(msg)["tipo"]
+                        if tipo in ("fim", "erro", "cancelado"):
+                            erro = tipo != "fim"
+                            break
+                        if tipo != "delta":
+                            continue
+                    if primeiro is None:
+                        primeiro = time.perf_counter() - inicio
+            except Exception:
+                # Conexão caída ou resposta pela metade (timeout): conta e segue numa conexão
+                # nova, para o resto da resposta antiga não se misturar com a próxima
+                res.erros[intent] += 1
+                await ws.close()
+                ws = None
+                continue
+            if erro:
+                res.erros[intent] += 1
+            else:
+                res.fim[intent].append(time.perf_counter() - inicio)
+                if primeiro is not None:
+                    res.primeiro[intent].append(primeiro)
+            if args.pensar:
+                await asyncio.sleep(min(rng.expovariate(1 / args.pensar), max(prazo - time.monotonic(), 0)))
+    finally:
+        if ws is not None:
+            await ws.close()
+
+
+def _status(url: str) -> dict | None:
+    partes = urlsplit(url)
+    esquema = "https" if partes.scheme == "wss" else "http"
+    try:
+        return httpx.get(f"{esquema}://{partes.netloc}/status", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def patamar(args, url: str, corpus: dict, intents: list[str], pesos: list[float], clientes: int,
+            pid_app: int | None):
+    res = Resultados()
+    antes = _status(url)
+    cpu0 = _cpu(pid_app) if pid_app else 0.0
+
+    async def todos():
+        prazo = time.monotonic() + args.duracao
+        await asyncio.gather(*(cliente(args, url, corpus, intents, pesos, prazo, res,
+                                       random.Random(args.semente * 100003 + i)) for i in range(clientes)))
+
+    inicio = time.perf_counter()
+    asyncio.run(todos())
+    duracao = time.perf_counter() - inicio
+    cpu = (_cpu(pid_app) - cpu0) / duracao * 100 if pid_app else None
+    depois = _status(url)
+
+    total = sum(len(v) for v in res.fim.values())
+    erros = sum(res.erros.values())
+    linha = (f"\n{clientes} clientes: {total} respostas em {duracao:.1f} s = {total / duracao:.1f}/s | "
+             f"erros {erros} | falhas de conexão {res.falhas_conexao}")
+    if cpu is not None:
+        linha += f" | CPU do app {cpu:.0f}%"
+    print(linha)
+    print(f"  {'intent':<10} {'n':>6} {'erros':>6} | {'1º pedaço p50/p95/p99 (ms)':>27} | {'fim p50/p95/p99 (ms)':>24}")
+    todos_primeiro, todos_fim = [], []
+    for intent in intents:
+        p, f = res.primeiro[intent], res.fim[intent]
+        todos_primeiro += p
+        todos_fim += f
+        print(f"  {intent:<10} {len(f):>6} {res.erros[intent]:>6} | "
+              f"{_pct(p, 50) * 1e3:>7.0f} {_pct(p, 95) * 1e3:>8.0f} {_pct(p, 99) * 1e3:>8.0f}   | "
+              f"{_pct(f, 50) * 1e3:>6.0f} {_pct(f, 95) * 1e3:>7.0f} {_pct(f, 99) * 1e3:>7.0f}")
+    print(f"  {'total':<10} {len(todos_fim):>6} {erros:>6} | "
+          f"{_pct(todos_primeiro, 50) * 1e3:>7.0f} {_pct(todos_primeiro, 95) * 1e3:>8.0f} "
+          f"{_pct(todos_primeiro, 99) * 1e3:>8.0f}   | {_pct(todos_fim, 50) * 1e3:>6.0f} "
+          f"{_pct(todos_fim, 95) * 1e3:>7.0f} {_pct(todos_fim, 99) * 1e3:>7.0f}")
+
+    if antes and depois:
+        # Diferença dos contadores no patamar: onde a fila ou as recusas aparecem
+        llm_a, llm_d = antes.get("llm", {}), depois.get("llm", {})
+        print("  llm: " + ", ".join(f"{k} +{llm_d[k] - llm_a.get(k, 0)}" for k in
+                                    ("requisicoes", "retentativas", "timeouts", "recusadas") if k in llm_d))
+        recusas = {nome: e["recusadas"] - antes.get("estagios", {}).get(nome, {}).get("recusadas", 0)
+                   for nome, e in depois.get("estagios", {}).items()}
+        print("  estágios, recusadas: " + (", ".join(f"{k} +{v}" for k, v in recusas.items()) or "nenhum"))
+        cache_a = antes.get("llm_cache", {}).get("intencoes", {})
+        cache_d = depois.get("llm_cache", {}).get("intencoes", {})
+        if cache_d:
+            def _acertos(c: dict) -> int:
+                return c.get("acertos", 0) + c.get("acertos_semanticos", 0)
+            acertos = sum(_acertos(c) - _acertos(cache_a.get(i, {})) for i, c in cache_d.items())
+            faltas = sum(c.get("faltas", 0) - cache_a.get(i, {}).get("faltas", 0) for i, c in cache_d.items())
+            print(f"  llm_cache: acertos +{acertos}, faltas +{faltas}")
+
+
+def _esperar(url: str, proc: subprocess.Popen, segundos: float = 180):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url}: o processo terminou")
+        try:
+            httpx.get(url, timeout=0.5).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu")
+
+
+def subir(args) -> list[subprocess.Popen]:
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--porta", str(PORTA_LLM),
+                            "--ttft", str(args.ttft), "--tokens-por-s", str(args.tokens_por_s),
+                            "--tokens", str(args.tokens)])
+    env = dict(os.environ, CECI_LLM_BASE_URL=f"http://127.0.0.1:{PORTA_LLM}/v1", CECI_LLM_API_KEY="fake")
+    if args.sem_cache:
+        env["CECI_LLM_CACHE"] = "0"
+    app = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(PORTA_APP),
+                            "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL)
+    try:
+        _esperar(f"http://127.0.0.1:{PORTA_LLM}/stats", llm)
+        _esperar(f"http://127.0.0.1:{PORTA_APP}/readyz", app)
+    except Exception:
+        for proc in (app, llm):
+            proc.kill()
+        raise
+    return [app, llm]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://127.0.0.1:5000/ws/ceci")
+    parser.add_argument("--subir", action="store_true", help="sobe o fake_llm e o app locais")
+    parser.add_argument("--clientes", default="10", help="um número ou uma rampa: 10,50,100")
+    parser.add_argument("--duracao", type=float, default=30, help="segundos por patamar")
+    parser.add_argument("--pensar", type=float, default=1.0, help="pausa média entre perguntas (s)")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--mix", default=MIX)
+    parser.add_argument("--formato", choices=("json", "texto"), default="json")
+    parser.add_argument("--timeout", type=float, default=60, help="espera máxima por quadro (s)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--ttft", type=float, default=0.4)
+    parser.add_argument("--tokens-por-s", type=float, default=60)
+    parser.add_argument("--tokens", type=int, default=80)
+    parser.add_argument("--sem-cache", action="store_true", help="desliga o llm_cache do app (--subir)")
+    args = parser.parse_args()
+
+    corpus = carregar_corpus(args.corpus)
+    intents, pesos = ler_mix(args.mix, corpus)
+    processos = []
+    url = args.url
+    if args.subir:
+        processos = subir(args)
+        url = f"ws://127.0.0.1:{PORTA_APP}/ws/ceci"
+    if args.formato == "json":
+        partes = urlsplit(url)
+        consulta = [(k, v) for k, v in parse_qsl(partes.query) if k != "formato"] + [("formato", "json")]
+        url = urlunsplit(partes._replace(query=urlencode(consulta)))
+    try:
+        print(f"{url} | mix {', '.join(f'{i}={p:g}' for i, p in zip(intents, pesos))} | "
+              f"pausa média {args.pensar:g} s | {args.duracao:g} s por patamar")
+        for clientes in (int(c) for c in args.clientes.split(",")):
+            patamar(args, url, corpus, intents, pesos, clientes, processos[0].pid if processos else None)
+    finally:
+        for proc in processos:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
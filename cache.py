@@ -0,0 +1,100 @@
+# cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+class LRUCache:
+    """
+    Cache LRU limitado por número de entradas, com TTL opcional (em segundos)
+    e contadores de acertos, faltas, despejos, expirações e invalidações.
+    Seguro para uso entre threads do mesmo processo.
+    """
+
+    def __init__(self, max_entradas: int = 1024, ttl: float | None = None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._dados: OrderedDict = OrderedDict()  # chave → (expira_em, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    def get(self, chave, default=None, validar=None):
+        """
+        Retorna o valor em cache ou 'default'. Se 'validar' for informado e
+        devolver False para o valor, a entrada é descartada e conta como falta.
+        """
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                self.misses += 1
+                return default
+            expira_em, valor = item
+            if expira_em is not None and expira_em < time.monotonic():
+                del self._dados[chave]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            if validar is not None and not validar(valor):
+                del self._dados[chave]
+                self.invalidations += 1
+                self.misses += 1
+                return default
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def peek(self, chave, default=None):
+        """
+        Como get, mas sem mexer nos contadores nem na ordem LRU: para reler uma
+        entrada que o mesmo pedido já buscou (e contou) antes.
+        """
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+        if item is _AUSENTE:
+            return default
+        expira_em, valor = item
+        if expira_em is not None and expira_em < time.monotonic():
+            return default
+        return valor
+
+    def set(self, chave, valor):
+        if self.max_entradas <= 0:
+            return
+        expira_em = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._dados[chave] = (expira_em, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, chave, default=None):
+        with self._lock:
+            item = self._dados.pop(chave, _AUSENTE)
+        return default if item is _AUSENTE else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._dados),
+            "max_size": self.max_entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,23 @@
+# contexto.py
+
+from dataclasses import dataclass
+
+from nlp_processor import normalize_text
+
+
+@dataclass
+class RequestContext:
+    """
+    Uma mensagem do usuário, analisada uma única vez no início do pipeline.
+    Os serviços e o build_prompt recebem estes campos em vez de refazer a
+    normalização ou a detecção de idioma.
+    """
+    texto: str                  # mensagem original, sem espaços nas pontas
+    texto_norm: str             # sem acentos e em minúsculas (nlp_processor.normalize_text)
+    lang: str = "pt"            # "pt", "en" ou "es" (idioma.detectar)
+    intent: str = "fallback"    # intent.INTENT_ENGINE
+
+    @classmethod
+    def criar(cls, user_input: str) -> "RequestContext":
+        texto = user_input.strip()
+        return cls(texto=texto, texto_norm=normalize_text(texto))
@@ -0,0 +1,188 @@
+# executor.py
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+# Configuração padrão por estágio: (modo, workers, fila máxima)
+# modo: "thread" (padrão), "process" (cada worker importa o módulo do serviço) ou "inline"
+STAGE_DEFAULTS = {
+    "faq":        ("thread", 2, 32),
+    "rota":       ("thread", 2, 64),
+    # langdetect inicializa seus perfis de forma preguiçosa e sem lock: 1 worker
+    "langdetect": ("thread", 1, 128),
+}
+
+# Estágios cujo serviço tem estado que muda com o app rodando: num processo
+# filho ficaria a cópia da importação. "process" só vale para funções puras
+# como a do langdetect
+SEM_PROCESSO = {
+    "rota": "o status das linhas (StatusPoller) e o ROUTE_CACHE ficam no processo do app",
+    "faq": "o QUERY_CACHE, lido por busca_rapida e embedding_consulta, fica no processo do app",
+}
+
+class StageOverloaded(Exception):
+    """Fila do estágio cheia: a requisição deve ser recusada em vez de enfileirada."""
+
+
+class Stage:
+    """
+    Pool limitado para um estágio do pipeline. Até 'workers' tarefas rodam ao mesmo
+    tempo e até 'max_fila' esperam; acima disso, run() levanta StageOverloaded.
+    """
+
+    def __init__(self, nome: str, modo: str = "thread", workers: int = 1, max_fila: int = 32):
+        self.nome = nome
+        self.modo = modo
+        self.workers = workers
+        self.max_fila = max_fila
+        self.pendentes = 0
+        self.recusadas = 0
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, nome: str) -> "Stage":
+        modo, workers, max_fila = STAGE_DEFAULTS.get(nome, ("thread", 1, 32))
+        prefixo = f"CECI_{nome.upper()}"
+        modo = os.getenv(f"{prefixo}_MODE", modo)
+        if modo == "process" and nome in SEM_PROCESSO:
+            raise ValueError(f"{prefixo}_MODE=process não é suportado: {SEM_PROCESSO[nome]} (use thread)")
+        return cls(
+            nome,
+            modo=modo,
+            workers=int(os.getenv(f"{prefixo}_WORKERS", workers)),
+            max_fila=int(os.getenv(f"{prefixo}_QUEUE", max_fila)),
+        )
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.modo == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"ceci-{self.nome}")
+        return self._pool
+
+    async def run(self, fn, *args, **kwargs):
+        if self.modo == "inline":
+            return fn(*args, **kwargs)
+        if self.pendentes >= self.workers + self.max_fila:
+            self.recusadas += 1
+            raise StageOverloaded(self.nome)
+        # O contador acompanha o job no pool, não quem espera por ele: um chamador
+        # cancelado não interrompe o job que já começou a rodar
+        # (cancelar o wrap_future só cancela o job se ele ainda estiver na fila)
+        with self._lock:
+            self.pendentes += 1
+        try:
+            job = self._executor().submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._concluido(None)
+            raise
+        job.add_done_callback(self._concluido)
+        return await asyncio.wrap_future(job)
+
+    def _concluido(self, _job):
+        # Roda na thread do worker (ou na de gerenciamento do pool de processos)
+        with self._lock:
+            self.pendentes -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "modo": self.modo,
+            "workers": self.workers,
+            "max_fila": self.max_fila,
+            "pendentes": self.pendentes,
+            "recusadas": self.recusadas,
+        }
+
+
+STAGES: dict[str, Stage] = {}
+
+def get_stage(nome: str) -> Stage:
+    stage = STAGES.get(nome)
+    if stage is None:
+        stage = STAGES[nome] = Stage.from_env(nome)
+    return stage
+
+async def run_stage(nome: str, fn, *args, **kwargs):
+    """
+    Executa fn(*args, **kwargs) fora do event loop, no pool do estágio 'nome'.
+    """
+    return await get_stage(nome).run(fn, *args, **kwargs)
+
+class Batcher:
+    """
+    Micro-batching sobre um estágio: chamadas concorrentes a buscar() que chegam
+    dentro de 'janela_ms' (ou até juntar 'max_lote') viram uma única chamada
+    fn(lista_de_itens) no estágio 'estagio'. fn deve devolver um resultado por item,
+    na mesma ordem; cada chamador recebe apenas o seu.
+    """
+
+    def __init__(self, estagio: str, fn, janela_ms: float = 3, max_lote: int = 32):
+        self.estagio = estagio
+        self.fn = fn
+        self.janela = janela_ms / 1000
+        self.max_lote = max(max_lote, 1)
+        self._pendentes: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # O loop só guarda referências fracas às tarefas: sem isto, um lote em voo
+        # pode ser coletado e os futures dos chamadores nunca resolvem
+        self._tarefas: set[asyncio.Task] = set()
+        self.lotes = 0
+        self.itens = 0
+
+    async def buscar(self, item):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pendentes.append((item, fut))
+        if len(self._pendentes) >= self.max_lote or self.janela <= 0:
+            self._disparar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.janela, self._disparar)
+        return await fut
+
+    def _disparar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        lote, self._pendentes = self._pendentes, []
+        if lote:
+            self.lotes += 1
+            self.itens += len(lote)
+            tarefa = asyncio.ensure_future(self._resolver(lote))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _resolver(self, lote: list[tuple[object, asyncio.Future]]):
+        try:
+            resultados = await run_stage(self.estagio, self.fn, [item for item, _ in lote])
+        except Exception as e:
+            for _, fut in lote:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), resultado in zip(lote, resultados):
+            if not fut.done():
+                fut.set_result(resultado)
+
+    def stats(self) -> dict:
+        return {
+            "janela_ms": self.janela * 1000,
+            "max_lote": self.max_lote,
+            "lotes": self.lotes,
+            "itens": self.itens,
+            "tamanho_medio": self.itens / self.lotes if self.lotes else 0.0,
+        }
+
+
+def shutdown_stages():
+    for stage in STAGES.values():
+        stage.shutdown()
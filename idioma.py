@@ -0,0 +1,115 @@
+# idioma.py
+
+import json
+import math
+import os
+import re
+
+import langdetect
+
+from nlp_processor import STATION_MATCHER, normalize_text
+
+# Idiomas atendidos pela Ceci; qualquer outra coisa cai no padrão
+IDIOMAS = ("pt", "en", "es")
+IDIOMA_PADRAO = "pt"
+
+# Detector do pipeline: "ngram" (perfil compacto pt/en/es, determinístico) ou "langdetect"
+DETECTOR = os.getenv("CECI_LANG_DETECTOR", "ngram")
+
+_PALAVRA = re.compile(r"[^\W\d_]+")
+
+_LETRAS_PT = set("ãõçâêô")
+_LETRAS_ES = set("ñ")
+
+# Palavras de nomes de estação ("Consolação", "Amaro", "Barra") não dizem nada sobre o idioma
+_NOMES_ESTACOES = {
+    w for est in STATION_MATCHER.estacoes for w in _PALAVRA.findall(normalize_text(est)) if len(w) >= 3
+}
+
+
+def _carregar_perfis() -> tuple[dict[str, tuple[float, ...]], list[tuple[float, ...]]]:
+    """
+    Lê os perfis de n-gramas (1 a 3 caracteres) que o langdetect já distribui,
+    apenas para pt/en/es, e os converte em log-probabilidades por idioma:
+    { ngrama: (logp_pt, logp_en, logp_es) } e, por ordem n, o log-prob de um
+    n-grama ausente (suavização).
+    """
+    pasta = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+    perfis = []
+    for lang in IDIOMAS:
+        with open(os.path.join(pasta, lang), "r", encoding="utf-8") as f:
+            perfis.append(json.load(f))
+
+    ausente = [tuple(math.log(0.5 / p["n_words"][n]) for p in perfis) for n in range(3)]
+    tabela: dict[str, tuple[float, ...]] = {}
+    for gram in set().union(*(p["freq"] for p in perfis)):
+        if gram != gram.lower() or gram.strip() == "":
+            continue
+        n = len(gram) - 1
+        tabela[gram] = tuple(
+            math.log(p["freq"][gram] / p["n_words"][n]) if gram in p["freq"] else ausente[n][i]
+            for i, p in enumerate(perfis)
+        )
+    return tabela, ausente
+
+_TABELA, _AUSENTE = _carregar_perfis()
+
+
+def detectar_idioma(texto: str) -> str:
+    """
+    Naive Bayes sobre os n-gramas de caracteres (1 a 3, com espaço marcando o
+    limite de palavra, como no langdetect), restrito a pt/en/es.
+    Determinístico; textos sem letras retornam IDIOMA_PADRAO.
+    """
+    # Pontuação invertida só existe em espanhol
+    if "¿" in texto or "¡" in texto:
+        return "es"
+
+    palavras = _PALAVRA.findall(texto)
+    # Nomes próprios no meio da frase e nomes de estação puxam tudo para o português
+    comuns = [
+        p for i, p in enumerate(palavras)
+        if (i == 0 or not p[0].isupper()) and normalize_text(p) not in _NOMES_ESTACOES
+    ]
+    # Letras exclusivas de um dos três idiomas (fora dos nomes de estação) decidem sozinhas
+    letras = set("".join(comuns).lower())
+    if letras & _LETRAS_PT:
+        return "pt"
+    if letras & _LETRAS_ES:
+        return "es"
+
+    scores = [0.0] * len(IDIOMAS)
+    vistos = 0
+    for palavra in comuns or palavras:
+        w = f" {palavra.lower()} "
+        for n in (1, 2, 3):
+            for i in range(len(w) - n + 1):
+                gram = w[i:i + n]
+                if gram == " ":
+                    continue
+                lp = _TABELA.get(gram) or _AUSENTE[n - 1]
+                for k in range(len(IDIOMAS)):
+                    scores[k] += lp[k]
+                vistos += 1
+    if not vistos:
+        return IDIOMA_PADRAO
+    return IDIOMAS[max(range(len(IDIOMAS)), key=scores.__getitem__)]
+
+
+def detectar_idioma_langdetect(texto: str) -> str:
+    """
+    Detector anterior (langdetect), com semente fixa para ser determinístico e
+    restrito aos idiomas atendidos.
+    """
+    langdetect.DetectorFactory.seed = 0
+    try:
+        lang = langdetect.detect(texto)
+    except langdetect.LangDetectException:
+        return IDIOMA_PADRAO
+    return lang if lang in IDIOMAS else IDIOMA_PADRAO
+
+
+def detectar(texto: str) -> str:
+    if DETECTOR == "langdetect":
+        return detectar_idioma_langdetect(texto)
+    return detectar_idioma(texto)
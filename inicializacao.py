@@ -0,0 +1,152 @@
+# inicializacao.py
+"""
+Subida do app em segundo plano. O app.py importa só o que é leve (FastAPI,
+protocolo, métricas), então a porta abre na hora; o lifespan chama iniciar(),
+que importa os subsistemas pesados em ordem, numa thread (o import é que faz
+o trabalho: motor de rotas, encoder e índice do FAQ, SDK da OpenAI) e depois
+os aquece (CECI_AQUECER=1): uma busca de rota e uma codificação de ensaio nos
+próprios workers do executor e as conexões com a LLM abertas, para o primeiro
+usuário não pagar a primeira chamada de cada coisa.
+
+O /readyz só responde 200 quando tudo está pronto; o /healthz fica 200
+enquanto nada falhou. Até lá o código do app não deve importar esses módulos
+no event loop (o import esperaria a thread): use carregado(nome).
+"""
+import asyncio
+import os
+import sys
+import time
+import traceback
+
+from executor import run_stage
+
+AQUECER = os.getenv("CECI_AQUECER", "1") == "1"
+# Quanto um WebSocket aberto antes da hora espera o pipeline ficar pronto (s)
+ESPERA_PRONTO = float(os.getenv("CECI_ESPERA_PRONTO", 60))
+# Teto do aquecimento das conexões com a LLM (s): API lenta não segura o /readyz
+AQUECER_LLM_MAX = float(os.getenv("CECI_AQUECER_LLM_MAX", 5))
+
+
+async def _aquecer_rota():
+    from services import rota_service
+    await run_stage("rota", rota_service.aquecer)
+
+
+async def _aquecer_faq():
+    from services import faq_service
+    await run_stage("faq", faq_service.aquecer)
+
+
+async def _aquecer_llm():
+    import llm
+    try:
+        async with asyncio.timeout(AQUECER_LLM_MAX):
+            await llm.CLIENTE.aquecer()
+    except TimeoutError:
+        pass
+
+
+class Subsistema:
+    def __init__(self, nome: str, modulos: tuple[str, ...], aquecer=None):
+        self.nome = nome
+        self.modulos = modulos
+        self.aquecer = aquecer
+        self.estado = "pendente"    # pendente, carregando, aquecendo, pronto, erro
+        self.carga_s: float | None = None
+        self.aquecimento_s: float | None = None
+        self.erro: str | None = None
+
+    def _importar(self):
+        for modulo in self.modulos:
+            __import__(modulo)
+
+    async def iniciar(self, depois=None):
+        try:
+            self.estado = "carregando"
+            inicio = time.perf_counter()
+            await asyncio.to_thread(self._importar)
+            self.carga_s = time.perf_counter() - inicio
+            if depois is not None:
+                depois()
+            if AQUECER and self.aquecer is not None:
+                self.estado = "aquecendo"
+                inicio = time.perf_counter()
+                await self.aquecer()
+                self.aquecimento_s = time.perf_counter() - inicio
+            self.estado = "pronto"
+        except Exception as e:
+            self.estado = "erro"
+            self.erro = f"{type(e).__name__}: {e}"
+            raise
+
+    def info(self) -> dict:
+        return {"estado": self.estado, "carga_s": self.carga_s, "aquecimento_s": self.aquecimento_s,
+                "erro": self.erro}
+
+
+# Em ordem: o pipeline importa os serviços, então vem por último
+SUBSISTEMAS = {s.nome: s for s in (
+    Subsistema("rota", ("services.rota_service",), _aquecer_rota),
+    Subsistema("faq", ("services.faq_service",), _aquecer_faq),
+    Subsistema("llm", ("llm", "llm_cache"), _aquecer_llm),
+    Subsistema("pipeline", ("pipeline",)),
+)}
+
+_PRONTO = asyncio.Event()
+
+
+async def iniciar(depois: dict | None = None):
+    """
+    Carrega e aquece os subsistemas em ordem; 'depois' mapeia nome → função
+    chamada no event loop logo após o import (ex.: ligar o StatusPoller).
+    Um erro para a subida e fica no /healthz.
+    """
+    depois = depois or {}
+    for sub in SUBSISTEMAS.values():
+        try:
+            await sub.iniciar(depois.get(sub.nome))
+        except Exception:
+            traceback.print_exc()
+            return
+    _PRONTO.set()
+
+
+def precarregar():
+    """
+    Import síncrono de todos os subsistemas, sem aquecer: o processo mestre do
+    prefork.py chama antes do fork. Nos workers, iniciar() acha os módulos prontos.
+    """
+    for sub in SUBSISTEMAS.values():
+        sub._importar()
+
+
+def pronto() -> bool:
+    return _PRONTO.is_set()
+
+
+def falhou() -> bool:
+    return any(sub.estado == "erro" for sub in SUBSISTEMAS.values())
+
+
+async def esperar(timeout: float = ESPERA_PRONTO) -> bool:
+    if _PRONTO.is_set():
+        return True
+    try:
+        async with asyncio.timeout(timeout):
+            await _PRONTO.wait()
+        return True
+    except TimeoutError:
+        return False
+
+
+def carregado(modulo: str):
+    """O módulo, se o subsistema dele já terminou o import; senão None (sem importar)."""
+    for sub in SUBSISTEMAS.values():
+        if modulo in sub.modulos:
+            return sys.modules.get(modulo) if sub.carga_s is not None else None
+    return sys.modules.get(modulo)
+
+
+def estado() -> dict:
+    # pid: com vários workers (prefork.py), qual deles respondeu
+    return {"pronto": pronto(), "pid": os.getpid(), "subsistemas": {nome: sub.info() for nome, sub in SUBSISTEMAS.items()}}
@@ -1,107 +1,212 @@
 # intent.py
 
 import re
+from typing import NamedTuple
+
+# → Smalltalk respondido direto pelo pipeline (sem LLM), no idioma do padrão.
+#   Ordem de precedência: todo o português, depois inglês, depois espanhol
+SMALLTALK_PIPELINE = {
+    "pt": {
+        "greeting": r"\b(oi|ol[aá]|opa|eai|fala|bom dia|boa tarde|boa noite)\b",
+        "thanks": r"\b(obrigad[oa]|valeu|brigad[oa])\b",
+        "bye": r"\b(tchau|até mais|até logo)\b",
+    },
+    "en": {
+        "greeting": r"\b(hello|hi|hey)\b",
+        "thanks": r"\b(thank you|thanks)\b",
+        "bye": r"\b(bye|goodbye)\b",
+    },
+    "es": {
+        "greeting": r"\b(hola)\b",
+        "thanks": r"\b(gracias)\b",
+        "bye": r"\b(adiós|adios)\b",
+    },
+}
 
 # → Padrões de smalltalk (saudação, agradecimento, despedida) em PT, EN e ES
 SMALLTALK_PATTERNS = {
-    "greeting": [
-        # Português
-        r"\b(oi|ol[áa]|opa|eai|fala|bom dia|boa tarde|boa noite|saudações)\b",
-        # Inglês
-        r"\b(hello|hi|hey|good morning|good afternoon|good evening)\b",
-        # Espanhol
-        r"\b(hola|buenos días|buenas tardes|buenas noches)\b"
-    ],
-    "thanks": [
-        # Português
-        r"\b(obrigad[oa]|valeu|brigad[oa]|agradecido|obrigadíssimo)\b",
-        # Inglês
-        r"\b(thank you|thanks|appreciate|much obliged)\b",
-        # Espanhol
-        r"\b(gracias|muchas gracias|te lo agradezco)\b"
-    ],
-    "bye": [
-        # Português
-        r"\b(tchau|até mais|até logo|falou|falou e até)\b",
-        # Inglês
-        r"\b(bye|goodbye|see you|see ya)\b",
-        # Espanhol
-        r"\b(adiós|adios|hasta luego|nos vemos)\b"
-    ]
+    "greeting": {
+        "pt": r"\b(oi|ol[áa]|opa|eai|fala|bom dia|boa tarde|boa noite|saudações)\b",
+        "en": r"\b(hello|hi|hey|good morning|good afternoon|good evening)\b",
+        "es": r"\b(hola|buenos días|buenas tardes|buenas noches)\b",
+    },
+    "thanks": {
+        "pt": r"\b(obrigad[oa]|valeu|brigad[oa]|agradecido|obrigadíssimo)\b",
+        "en": r"\b(thank you|thanks|appreciate|much obliged)\b",
+        "es": r"\b(gracias|muchas gracias|te lo agradezco)\b",
+    },
+    "bye": {
+        "pt": r"\b(tchau|até mais|até logo|falou|falou e até)\b",
+        "en": r"\b(bye|goodbye|see you|see ya)\b",
+        "es": r"\b(adiós|adios|hasta luego|nos vemos)\b",
+    }
 }
 
 # → Padrões de intenções funcionais (rota, faq_passageiro, relatorio)
 FUNCTIONAL_PATTERNS = {
-    "rota": [
-        # Português
-        r"\bcomo chegar\b",
-        r"\bcaminho\b",
-        r"\bir até\b",
-        r"\bdireção\b",
-        r"\bchegar em\b",
-        r"\bcomo vou\b",
-        r"\bcomo eu vou\b",
-        r"\bcomo eu faço\b",
-        r"\bcomo eu chego\b",
-        r"\bquero ir\b",
-        # Inglês
-        r"\broute\b",
-        r"\bdirections\b",
-        r"\bget to\b",
-        r"\bhow to go\b",
-        r"\bway to\b",
-        # Espanhol
-        r"\bruta\b",
-        r"\bllegar a\b",
-        r"\bcómo llegar\b",
-        r"\bcómo voy\b"
-    ],
-    "faq_passageiro": [
-        # Português
-        r"\bfaq\b",
-        r"\binformação\b",
-        r"\bduvid[ao]\b",
-        r"\bpergunta\b",
-        r"\bpreciso saber\b",
-        r"\bcomo faço\b",
-        r"\bcomo funciona\b",
-        r"\bonde posso\b",
-        # Inglês
-        r"\b(question|questions)\b",
-        r"\binfo\b",
-        r"\bhow do i\b",
-        r"\bwhere can i\b",
-        r"\bcan i\b",
-        r"\bcan we\b",
-        r"\bhelp me\b",
-        # Espanhol
-        r"\bduda\b",
-        r"\bpregunta\b",
-        r"\bcómo puedo\b",
-        r"\bdónde puedo\b"
-    ],
-    "relatorio": [
-        # Português
-        r"\brelatório\b",
-        r"\bdados\b",
-        r"\bestatística\b",
-        r"\bmétricas\b",
-        r"\binforme\b",
-        # Inglês
-        r"\breport\b",
-        r"\bstatistics\b",
-        r"\bdata\b",
-        r"\bmetrics\b",
-        r"\bgenerate report\b",
-        # Espanhol
-        r"\binforme\b",
-        r"\bestadísticas\b",
-        r"\bdatos\b",
-        r"\bmetrics\b"
-    ]
+    "rota": {
+        "pt": [
+            r"\bcomo chegar\b",
+            r"\bcaminho\b",
+            r"\bir até\b",
+            r"\bdireção\b",
+            r"\bchegar em\b",
+            r"\bcomo vou\b",
+            r"\bcomo eu vou\b",
+            r"\bcomo eu faço\b",
+            r"\bcomo eu chego\b",
+            r"\bquero ir\b",
+        ],
+        "en": [
+            r"\broute\b",
+            r"\bdirections\b",
+            r"\bget to\b",
+            r"\bhow to go\b",
+            r"\bway to\b",
+        ],
+        "es": [
+            r"\bruta\b",
+            r"\bllegar a\b",
+            r"\bcómo llegar\b",
+            r"\bcómo voy\b",
+        ],
+    },
+    "faq_passageiro": {
+        "pt": [
+            r"\bfaq\b",
+            r"\binformação\b",
+            r"\bduvid[ao]\b",
+            r"\bpergunta\b",
+            r"\bpreciso saber\b",
+            r"\bcomo faço\b",
+            r"\bcomo funciona\b",
+            r"\bonde posso\b",
+        ],
+        "en": [
+            r"\b(question|questions)\b",
+            r"\binfo\b",
+            r"\bhow do i\b",
+            r"\bwhere can i\b",
+            r"\bcan i\b",
+            r"\bcan we\b",
+            r"\bhelp me\b",
+        ],
+        "es": [
+            r"\bduda\b",
+            r"\bpregunta\b",
+            r"\bcómo puedo\b",
+            r"\bdónde puedo\b",
+        ],
+    },
+    "relatorio": {
+        "pt": [
+            r"\brelatório\b",
+            r"\bdados\b",
+            r"\bestatística\b",
+            r"\bmétricas\b",
+            r"\binforme\b",
+        ],
+        "en": [
+            r"\breport\b",
+            r"\bstatistics\b",
+            r"\bdata\b",
+            r"\bmetrics\b",
+            r"\bgenerate report\b",
+        ],
+        "es": [
+            r"\binforme\b",
+            r"\bestadísticas\b",
+            r"\bdatos\b",
+            r"\bmetrics\b",
+        ],
+    }
 }
 
 
+
+class Intencao(NamedTuple):
+    intent: str         # "greeting", "thanks", "bye", "rota", "faq_passageiro", "relatorio" ou "fallback"
+    lang: str | None    # idioma do padrão que casou
+    local: bool         # smalltalk de SMALLTALK_PIPELINE, respondido sem LLM
+
+FALLBACK = Intencao("fallback", None, False)
+
+
+def regras(com_pipeline: bool = True) -> list[tuple[Intencao, str]]:
+    """
+    Todos os padrões em ordem de precedência: SMALLTALK_PIPELINE (se
+    com_pipeline), SMALLTALK_PATTERNS e FUNCTIONAL_PATTERNS. O primeiro da
+    lista que casar em qualquer ponto do texto vence.
+    """
+    lista = []
+    if com_pipeline:
+        for lang, padroes in SMALLTALK_PIPELINE.items():
+            for intent, pat in padroes.items():
+                lista.append((Intencao(intent, lang, True), pat))
+    for intent, padroes in SMALLTALK_PATTERNS.items():
+        for lang, pat in padroes.items():
+            lista.append((Intencao(intent, lang, False), pat))
+    for intent, por_idioma in FUNCTIONAL_PATTERNS.items():
+        for lang, padroes in por_idioma.items():
+            for pat in padroes:
+                lista.append((Intencao(intent, lang, False), pat))
+    return lista
+
+
+class IntentEngine:
+    """
+    Todas as regras compiladas juntas, cada uma num grupo nomeado (r0, r1, ...).
+
+    A primeira busca usa a alternação simples: se nada casa, é fallback; se
+    casa, o ramo que casa ali é a menor regra naquela posição. Daí em diante a
+    versão com lookaheads (que não consomem texto) vê, em cada fronteira de
+    palavra, a primeira regra que casa ali; a menor regra entre todas as
+    posições é exatamente a que a cascata de re.search escolheria.
+    """
+
+    def __init__(self, lista: list[tuple[Intencao, str]]):
+        # Todos os padrões começam com \b; a fronteira fica fora da alternação
+        # para as demais posições serem descartadas sem testar regra nenhuma
+        padroes = [pat.removeprefix(r"\b") for _, pat in lista]
+        self.intencoes = [intencao for intencao, _ in lista]
+        # Sem grupos nomeados a busca fica bem mais rápida, então ela só diz onde
+        # está o primeiro casamento; a versão nomeada identifica a regra ali
+        self.busca = re.compile(r"\b(?:" + "|".join(padroes) + ")", re.IGNORECASE)
+        self.regra = re.compile(
+            r"\b(?:" + "|".join(f"(?P<r{i}>{pat})" for i, pat in enumerate(padroes)) + ")",
+            re.IGNORECASE,
+        )
+        self.varredura = re.compile(
+            r"\b(?:" + "|".join(f"(?=(?P<r{i}>{pat}))" for i, pat in enumerate(padroes)) + ")",
+            re.IGNORECASE,
+        )
+
+    def __len__(self) -> int:
+        return len(self.intencoes)
+
+    def detectar(self, texto: str) -> Intencao:
+        texto = texto.lower()
+        m = self.busca.search(texto)
+        if m is None:
+            return FALLBACK
+        inicio = m.start()
+        melhor = int(self.regra.match(texto, inicio).lastgroup[1:])
+        if melhor:
+            for m in self.varredura.finditer(texto, inicio + 1):
+                i = int(m.lastgroup[1:])
+                if i < melhor:
+                    melhor = i
+                    if i == 0:
+                        break
+        return self.intencoes[melhor]
+
+
+# Compiladas uma vez na importação: a do pipeline (smalltalk local + intenções)
+# e a de detect_intent, que mantém o contrato antigo (sem SMALLTALK_PIPELINE)
+INTENT_ENGINE = IntentEngine(regras())
+_ENGINE_INTENCOES = IntentEngine(regras(com_pipeline=False))
+
+
 def detect_intent(user_input: str) -> str:
     """
     Retorna uma das seguintes strings:
@@ -109,20 +214,4 @@ def detect_intent(user_input: str) -> str:
     - "rota", "faq_passageiro", "relatorio"
     - "fallback" (quando não encontrar nenhum padrão)
     """
-
-    text = user_input.lower()
-
-    # 1) Verifica SMALLTALK (saudações, agradecimentos, despedidas)
-    for intent, patterns in SMALLTALK_PATTERNS.items():
-        for pat in patterns:
-            if re.search(pat, text, re.IGNORECASE):
-                return intent  # "greeting", "thanks" ou "bye"
-
-    # 2) Verifica INTENÇÕES FUNCIONAIS (rota, faq_passageiro, relatorio)
-    for intent, patterns in FUNCTIONAL_PATTERNS.items():
-        for pat in patterns:
-            if re.search(pat, text, re.IGNORECASE):
-                return intent
-
-    # 3) Se nada bateu, retorna “fallback”
-    return "fallback"
+    return _ENGINE_INTENCOES.detectar(user_input).intent
@@ -1,34 +1,279 @@
 # llm.py
 
+import asyncio
 import dotenv
 import os
+import random
+import time
+
+import httpx
+import openai
 from openai import AsyncOpenAI
 
+import metrics
+from executor import StageOverloaded
+
 dotenv.load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-async def stream_response(prompt: str, user_lang: str):
-    system_msg = (
+# Backend: qualquer URL compatível com a API da OpenAI (ex.: benchmarks/fake_llm.py)
+LLM_BASE_URL = os.getenv("CECI_LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+LLM_API_KEY = os.getenv("CECI_LLM_API_KEY") or OPENAI_API_KEY
+
+# Concorrência: até LLM_CONCORRENCIA streams abertos; até LLM_FILA esperam por no
+# máximo LLM_ESPERA_MAX segundos, acima disso a requisição é recusada (StageOverloaded)
+LLM_CONCORRENCIA = int(os.getenv("CECI_LLM_CONCORRENCIA", 16))
+LLM_FILA = int(os.getenv("CECI_LLM_FILA", 64))
+LLM_ESPERA_MAX = float(os.getenv("CECI_LLM_ESPERA_MAX", 10))
+
+# Prazos (s): até o primeiro token (inclui conexão) e do stream inteiro
+LLM_TIMEOUT_PRIMEIRO = float(os.getenv("CECI_LLM_TIMEOUT_PRIMEIRO", 10))
+LLM_TIMEOUT_TOTAL = float(os.getenv("CECI_LLM_TIMEOUT_TOTAL", 60))
+
+# Novas tentativas (429, 5xx, conexão, prazo do primeiro token), só antes do
+# primeiro token: backoff exponencial com jitter total
+LLM_TENTATIVAS = int(os.getenv("CECI_LLM_TENTATIVAS", 3))
+LLM_BACKOFF = float(os.getenv("CECI_LLM_BACKOFF", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("CECI_LLM_BACKOFF_MAX", 4))
+
+# Pool HTTP keep-alive e conexões abertas no aquecimento
+LLM_KEEPALIVE = float(os.getenv("CECI_LLM_KEEPALIVE", 60))
+LLM_AQUECER = int(os.getenv("CECI_LLM_AQUECER", 2))
+
+# Parâmetros da geração (também entram na chave do llm_cache)
+MODELO = os.getenv("CECI_LLM_MODEL", "gpt-4o-mini")
+TEMPERATURA = 0.5
+MAX_TOKENS = 500
+
+_RETENTAVEIS = (
+    asyncio.TimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+class LLMIndisponivel(Exception):
+    """O backend falhou (ou estourou o prazo) e não há mais tentativas."""
+
+
+class OpenAIBackend:
+    """
+    Backend compatível com a API da OpenAI, com pool HTTP próprio (keep-alive,
+    limitado à concorrência do cliente). As novas tentativas ficam com o
+    ClienteLLM, então o SDK não refaz nada sozinho.
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: str | None = LLM_API_KEY,
+                 conexoes: int = LLM_CONCORRENCIA, keepalive: float = LLM_KEEPALIVE,
+                 timeout: float = LLM_TIMEOUT_PRIMEIRO):
+        self.base_url = base_url.rstrip("/")
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=conexoes,
+                max_keepalive_connections=conexoes,
+                keepalive_expiry=keepalive,
+            ),
+        )
+        self.openai = AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=self._http, max_retries=0)
+
+    async def stream(self, messages: list[dict], **params):
+        resposta = await self.openai.chat.completions.create(messages=messages, stream=True, **params)
+        try:
+            async for chunk in resposta:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Fecha a resposta HTTP também quando o consumidor desiste no meio
+            await resposta.close()
+
+    async def aquecer(self, conexoes: int = LLM_AQUECER) -> int:
+        """
+        Abre 'conexoes' conexões em paralelo (GET /models) para o primeiro
+        usuário não pagar DNS, TCP e TLS. Retorna quantas responderam.
+        """
+        async def uma() -> bool:
+            try:
+                await self._http.get(f"{self.base_url}/models", headers={"Authorization": f"Bearer {self.openai.api_key}"})
+                return True
+            except httpx.HTTPError:
+                return False
+
+        return sum(await asyncio.gather(*(uma() for _ in range(conexoes))))
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class ClienteLLM:
+    """
+    Streams de chat sobre um backend com limite de concorrência (semáforo e
+    fila de espera limitada), prazo até o primeiro token e total, e novas
+    tentativas com jitter enquanto nada foi enviado ao usuário.
+    """
+
+    def __init__(self, backend, concorrencia: int = LLM_CONCORRENCIA, max_fila: int = LLM_FILA,
+                 espera_max: float = LLM_ESPERA_MAX, timeout_primeiro: float = LLM_TIMEOUT_PRIMEIRO,
+                 timeout_total: float = LLM_TIMEOUT_TOTAL, tentativas: int = LLM_TENTATIVAS,
+                 backoff: float = LLM_BACKOFF, backoff_max: float = LLM_BACKOFF_MAX):
+        self.backend = backend
+        self.concorrencia = concorrencia
+        self.max_fila = max_fila
+        self.espera_max = espera_max
+        self.timeout_primeiro = timeout_primeiro
+        self.timeout_total = timeout_total
+        self.tentativas = max(tentativas, 1)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self.em_uso = 0
+        self.esperando = 0
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.timeouts = 0
+        self.falhas = 0
+        self.recusadas = 0
+
+    async def _entrar(self):
+        if self.esperando >= self.max_fila:
+            self.recusadas += 1
+            metrics.LLM_STREAMS.inc("recusado")
+            raise StageOverloaded("llm")
+        self.esperando += 1
+        try:
+            with metrics.estagio("llm_fila"):
+                async with asyncio.timeout(self.espera_max):
+                    await self._semaforo.acquire()
+        except TimeoutError:
+            self.recusadas += 1
+            metrics.LLM_STREAMS.inc("recusado")
+            raise StageOverloaded("llm") from None
+        finally:
+            self.esperando -= 1
+        self.em_uso += 1
+
+    def _sair(self):
+        self.em_uso -= 1
+        self._semaforo.release()
+
+    def _espera(self, tentativa: int, erro: Exception) -> float:
+        espera = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (tentativa - 1)))
+        resposta = getattr(erro, "response", None)
+        if resposta is not None:
+            try:
+                espera = max(espera, float(resposta.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return espera
+
+    async def stream(self, messages: list[dict], **params):
+        """
+        Gera os pedaços de texto da resposta. Levanta StageOverloaded se a fila
+        estiver cheia e LLMIndisponivel se o backend falhar em todas as
+        tentativas ou estourar um prazo. Os prazos usam asyncio.timeout, não
+        wait_for: no 3.11 o wait_for pode engolir o cancelamento de quem
+        desiste do stream (protocolo.Sessao) se um pedaço chega no mesmo instante.
+        """
+        await self._entrar()
+        inicio = time.perf_counter()
+        resultado = "erro"
+        try:
+            loop = asyncio.get_running_loop()
+            prazo = loop.time() + self.timeout_total
+            for tentativa in range(1, self.tentativas + 1):
+                self.requisicoes += 1
+                gen = self.backend.stream(messages, **params)
+                try:
+                    async with asyncio.timeout_at(min(loop.time() + self.timeout_primeiro, prazo)):
+                        primeiro = await anext(gen)
+                except StopAsyncIteration:
+                    resultado = "ok"
+                    return
+                except (*_RETENTAVEIS, openai.APIError) as e:
+                    await gen.aclose()
+                    self.falhas += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                    espera = self._espera(tentativa, e)
+                    if (not isinstance(e, _RETENTAVEIS) or tentativa == self.tentativas
+                            or loop.time() + espera >= prazo):
+                        raise LLMIndisponivel(f"{type(e).__name__}: {e}") from e
+                    self.retentativas += 1
+                    await asyncio.sleep(espera)
+                    continue
+                except BaseException:
+                    await gen.aclose()
+                    raise
+
+                metrics.LLM_PRIMEIRO_TOKEN.observar(time.perf_counter() - inicio)
+                try:
+                    yield primeiro
+                    while True:
+                        try:
+                            async with asyncio.timeout_at(prazo):
+                                pedaco = await anext(gen)
+                        except StopAsyncIteration:
+                            resultado = "ok"
+                            metrics.LLM_STREAM.observar(time.perf_counter() - inicio)
+                            return
+                        except (asyncio.TimeoutError, openai.APIError) as e:
+                            self.falhas += 1
+                            if isinstance(e, asyncio.TimeoutError):
+                                self.timeouts += 1
+                            raise LLMIndisponivel(f"{type(e).__name__}: {e}") from e
+                        yield pedaco
+                finally:
+                    await gen.aclose()
+        except (GeneratorExit, asyncio.CancelledError):
+            resultado = "cancelado"
+            raise
+        finally:
+            self._sair()
+            metrics.LLM_STREAMS.inc(resultado)
+
+    async def aquecer(self) -> int:
+        return await self.backend.aquecer()
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.backend.base_url,
+            "concorrencia": self.concorrencia,
+            "max_fila": self.max_fila,
+            "em_uso": self.em_uso,
+            "esperando": self.esperando,
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "timeouts": self.timeouts,
+            "falhas": self.falhas,
+            "recusadas": self.recusadas,
+        }
+
+
+CLIENTE = ClienteLLM(OpenAIBackend())
+
+
+def mensagem_sistema(user_lang: str) -> str:
+    return (
         "You are Ceci, a friendly virtual assistant for São Paulo public transport."
         if user_lang.startswith("en") else
         "Eres Ceci, asistente virtual de transporte público de São Paulo."
         if user_lang.startswith("es") else
         "Você é a Ceci, assistente virtual de transporte público de São Paulo."
     )
-    stream = await openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_msg},
+
+
+async def stream_response(prompt: str, user_lang: str):
+    async for content in CLIENTE.stream(
+        [
+            {"role": "system", "content": mensagem_sistema(user_lang)},
             {"role": "user", "content": prompt},
         ],
-        stream=True,
-        temperature=0.5,
-        max_tokens=500,
-    )
-    async for chunk in stream:
-        content = chunk.choices[0].delta.content
-        if content:
-            yield content
-
-            
\ No newline at end of file
+        model=MODELO,
+        temperature=TEMPERATURA,
+        max_tokens=MAX_TOKENS,
+    ):
+        yield content
@@ -0,0 +1,198 @@
+# llm_cache.py
+"""
+Cache de respostas à frente de llm.stream_response.
+
+Camada exata: hash do prompt junto com modelo, temperatura, max_tokens e
+mensagem de sistema. O prompt do FAQ só depende da resposta encontrada e do
+idioma, então perguntas diferentes que caem na mesma resposta compartilham a
+entrada. Camada semântica (opcional): embedding da pergunta do usuário, por
+intenção e idioma; uma pergunta quase igual a outra já respondida reaproveita
+a resposta dela.
+
+Um acerto é reenviado em pedaços, como o stream da API, e o protocolo do
+WebSocket não muda.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+import llm
+from cache import LRUCache
+
+CACHE_ATIVO = os.getenv("CECI_LLM_CACHE", "1") == "1"
+# Entradas por intenção; respostas acima de CACHE_MAX_CHARS não são guardadas,
+# o que limita a memória a intenções × entradas × caracteres
+CACHE_MAX_ENTRADAS = int(os.getenv("CECI_LLM_CACHE_SIZE", 1024))
+CACHE_MAX_CHARS = int(os.getenv("CECI_LLM_CACHE_MAX_CHARS", 4000))
+
+
+def _politica(nome: str, ativo: str, ttl: float) -> dict:
+    return {
+        "ativo": os.getenv(f"CECI_LLM_CACHE_{nome}", ativo) == "1",
+        "ttl": float(os.getenv(f"CECI_LLM_CACHE_TTL_{nome}", ttl)),
+    }
+
+# Liga/desliga e TTL (s) por intenção. O prompt do relatório leva data e hora,
+# então ele só se repete dentro do mesmo minuto
+POLITICAS = {
+    "faq_passageiro": _politica("FAQ", "1", 86400),
+    "relatorio": _politica("RELATORIO", "1", 60),
+    "fallback": _politica("FALLBACK", "1", 3600),
+}
+
+# Camada semântica: cosseno mínimo entre as perguntas e quantas ficam indexadas
+SEMANTICO = os.getenv("CECI_LLM_CACHE_SEMANTICO", "0") == "1"
+SEM_LIMIAR = float(os.getenv("CECI_LLM_CACHE_SEM_LIMIAR", 0.95))
+SEM_MAX_ENTRADAS = int(os.getenv("CECI_LLM_CACHE_SEM_SIZE", 1024))
+
+# Replay: até quatro palavras por pedaço, espaços preservados
+_PEDACO = re.compile(r"\s*(?:\S+\s*){1,4}")
+
+
+class IndiceSemantico:
+    """
+    Últimos 'max_entradas' embeddings de perguntas (normalizados) → chave da
+    camada exata, em buffer circular. A busca é um produto escalar contra todos.
+    """
+
+    def __init__(self, max_entradas: int = SEM_MAX_ENTRADAS, limiar: float = SEM_LIMIAR):
+        self.max_entradas = max_entradas
+        self.limiar = limiar
+        self._embs: np.ndarray | None = None
+        self._chaves: list[str] = []
+        self._proximo = 0
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+    def buscar(self, emb: np.ndarray) -> str | None:
+        if not self._chaves:
+            return None
+        sims = self._embs[:len(self._chaves)] @ emb
+        j = int(np.argmax(sims))
+        return self._chaves[j] if sims[j] >= self.limiar else None
+
+    def adicionar(self, emb: np.ndarray, chave: str):
+        if self.max_entradas <= 0:
+            return
+        if self._embs is None:
+            self._embs = np.zeros((self.max_entradas, emb.shape[0]), dtype=np.float32)
+        pos = self._proximo
+        if pos == len(self._chaves):
+            self._chaves.append(chave)
+        else:
+            self._chaves[pos] = chave
+        self._embs[pos] = emb
+        self._proximo = (pos + 1) % self.max_entradas
+
+
+_CACHES = {
+    intent: LRUCache(max_entradas=CACHE_MAX_ENTRADAS, ttl=pol["ttl"])
+    for intent, pol in POLITICAS.items()
+}
+_INDICES: dict[tuple[str, str], IndiceSemantico] = {}
+_CONTADORES = {intent: {"acertos": 0, "acertos_semanticos": 0, "faltas": 0, "descartadas": 0} for intent in POLITICAS}
+
+
+def _intencao(intent: str) -> str:
+    # Smalltalk fora do pipeline e intenções sem serviço seguem o fallback
+    return intent if intent in POLITICAS else "fallback"
+
+
+def ativo(intent: str) -> bool:
+    return CACHE_ATIVO and POLITICAS[_intencao(intent)]["ativo"]
+
+
+def usa_semantico(intent: str) -> bool:
+    return SEMANTICO and ativo(intent)
+
+
+def chave_prompt(prompt: str, lang: str) -> str:
+    dados = json.dumps(
+        [llm.MODELO, llm.TEMPERATURA, llm.MAX_TOKENS, llm.mensagem_sistema(lang), prompt],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+
+async def stream_com_cache(prompt: str, lang: str, intent: str, embedding: np.ndarray | None = None,
+                           gerar=None):
+    """
+    Mesmo contrato de llm.stream_response (gera pedaços de texto). 'embedding'
+    é a pergunta do usuário codificada, usada só pela camada semântica; 'gerar'
+    substitui a chamada à API (padrão: llm.stream_response).
+    Só respostas completas entram no cache: erro ou cancelamento no meio do
+    stream não deixam nada guardado.
+    """
+    gerar = gerar or llm.stream_response
+    if not ativo(intent):
+        async for chunk in gerar(prompt, lang):
+            yield chunk
+        return
+
+    intent = _intencao(intent)
+    cache = _CACHES[intent]
+    contadores = _CONTADORES[intent]
+    chave = chave_prompt(prompt, lang)
+
+    texto = cache.get(chave)
+    if texto is not None:
+        contadores["acertos"] += 1
+    elif embedding is not None:
+        vizinha = _INDICES.get((intent, lang))
+        vizinha = vizinha.buscar(embedding) if vizinha is not None else None
+        if vizinha is not None:
+            texto = cache.get(vizinha)
+            if texto is not None:
+                contadores["acertos_semanticos"] += 1
+                cache.set(chave, texto)
+
+    if texto is not None:
+        for pedaco in _PEDACO.findall(texto):
+            yield pedaco
+        return
+
+    contadores["faltas"] += 1
+    pedacos = []
+    async for chunk in gerar(prompt, lang):
+        pedacos.append(chunk)
+        yield chunk
+
+    texto = "".join(pedacos)
+    if not texto.strip() or len(texto) > CACHE_MAX_CHARS:
+        contadores["descartadas"] += 1
+        return
+    cache.set(chave, texto)
+    if embedding is not None:
+        _INDICES.setdefault((intent, lang), IndiceSemantico()).adicionar(embedding, chave)
+
+
+def limpar():
+    for cache in _CACHES.values():
+        cache.clear()
+    _INDICES.clear()
+
+
+def stats() -> dict:
+    intencoes = {}
+    for intent, pol in POLITICAS.items():
+        c = _CONTADORES[intent]
+        memoria = _CACHES[intent].stats()
+        total = c["acertos"] + c["acertos_semanticos"] + c["faltas"]
+        intencoes[intent] = {
+            **pol,
+            **c,
+            "hit_rate": (c["acertos"] + c["acertos_semanticos"]) / total if total else 0.0,
+            "size": memoria["size"],
+            "evictions": memoria["evictions"],
+            "expirations": memoria["expirations"],
+        }
+    return {
+        "ativo": CACHE_ATIVO,
+        "semantico": SEMANTICO,
+        "indices_semanticos": {f"{i}/{l}": len(ix) for (i, l), ix in _INDICES.items()},
+        "intencoes": intencoes,
+    }
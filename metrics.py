@@ -0,0 +1,193 @@
+# metrics.py
+"""
+Métricas do processo no formato texto do Prometheus (GET /metrics): tempo por
+estágio do pipeline, contadores por intent e desfecho, histogramas da LLM e
+leituras (gauges e contadores) tiradas dos stats() dos módulos na hora da
+coleta. Sem dependências: cada métrica é um dicionário em memória com um lock,
+porque os estágios também rodam em threads (executor.py). Estágios em modo
+"process" medem o que roda no filho dentro do filho; o pipeline ainda mede o
+estágio inteiro, com a fila.
+
+CECI_METRICS=0 desliga tudo: estagio() devolve um contexto vazio, os
+registros viram no-op e o /metrics responde 404.
+"""
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ATIVO = os.getenv("CECI_METRICS", "1") == "1"
+
+# Limites (s) dos histogramas: de uma regex (dezenas de µs) a um stream inteiro da LLM
+BUCKETS_ESTAGIO = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BUCKETS_LLM = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+
+_METRICAS: list = []
+
+
+def _rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _METRICAS.append(self)
+
+    def inc(self, *valores, n: float = 1):
+        if not ATIVO:
+            return
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + n
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0)
+
+    def expor(self) -> list[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        linhas += [f"{self.nome}{_rotulos(self.rotulos, k)} {_numero(v)}" for k, v in valores]
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_ESTAGIO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por faixa (não acumulada, +Inf no fim), soma, total]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _METRICAS.append(self)
+
+    def observar(self, segundos: float, *valores):
+        if not ATIVO:
+            return
+        i = bisect_left(self.buckets, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][i] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def total(self, *valores) -> int:
+        serie = self._series.get(valores)
+        return serie[2] if serie else 0
+
+    def expor(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, [list(s[0]), s[1], s[2]]) for k, s in self._series.items())
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for chave, (faixas, soma, total) in series:
+            acumulado = 0
+            for limite, n in zip((*self.buckets, math.inf), faixas):
+                acumulado += n
+                le = 'le="' + _numero(limite) + '"'
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {total}")
+        return linhas
+
+
+class Leitura:
+    """
+    Valor lido na hora da coleta: 'ler()' devolve um número, um dicionário
+    {tupla de rótulos: número} ou None (sem amostras). Serve para expor os
+    stats() que já existem.
+    """
+
+    def __init__(self, nome: str, ajuda: str, ler, rotulos: tuple = (), tipo: str = "gauge"):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.ler = ler
+        self.rotulos = rotulos
+        self.tipo = tipo
+        _METRICAS.append(self)
+
+    def expor(self) -> list[str]:
+        valor = self.ler()
+        if valor is None:
+            valores = []
+        else:
+            valores = valor.items() if isinstance(valor, dict) else [((), valor)]
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas += [f"{self.nome}{_rotulos(self.rotulos, k)} {_numero(v)}" for k, v in sorted(valores)]
+        return linhas
+
+
+class _Span:
+    __slots__ = ("estagio", "inicio")
+
+    def __init__(self, estagio: str):
+        self.estagio = estagio
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ESTAGIOS.observar(time.perf_counter() - self.inicio, self.estagio)
+        return False
+
+
+class _Vazio:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_VAZIO = _Vazio()
+
+
+def estagio(nome: str):
+    """with metrics.estagio("faq_encode"): ... — tempo do bloco em ceci_estagio_segundos."""
+    return _Span(nome) if ATIVO else _VAZIO
+
+
+def expor() -> str:
+    linhas = []
+    for metrica in _METRICAS:
+        linhas += metrica.expor()
+    return "\n".join(linhas) + "\n"
+
+
+ESTAGIOS = Histograma("ceci_estagio_segundos", "Tempo por estágio do pipeline e dos serviços.", ("estagio",))
+RESPOSTAS = Contador("ceci_respostas_total", "Respostas do pipeline por intent e desfecho.", ("intent", "desfecho"))
+RESPOSTA_SEGUNDOS = Histograma("ceci_resposta_segundos",
+                               "Da mensagem recebida no WebSocket ao fim da resposta, por intent.",
+                               ("intent",), BUCKETS_LLM)
+FAQ = Contador("ceci_faq_total", "Buscas no FAQ por resultado (direta, contexto, lexica, abaixo_limiar).", ("resultado",))
+ROTAS = Contador("ceci_rotas_total", "Pedidos de rota por resultado.", ("resultado",))
+LLM_PRIMEIRO_TOKEN = Histograma("ceci_llm_primeiro_token_segundos",
+                                "Tempo até o primeiro token da LLM (com novas tentativas, sem a fila).",
+                                buckets=BUCKETS_LLM)
+LLM_STREAM = Histograma("ceci_llm_stream_segundos", "Duração dos streams da LLM concluídos.", buckets=BUCKETS_LLM)
+LLM_STREAMS = Contador("ceci_llm_streams_total", "Streams da LLM por resultado (ok, erro, cancelado, recusado).",
+                       ("resultado",))
@@ -1,11 +1,32 @@
 # services/utils/nlp_processor.py
 
 import os
+import re
 import json
 import unidecode
-import re
+from collections import Counter, deque
+from functools import lru_cache
+
+# Partes de nomes compostos que não devem virar apelido (nome da cidade, palavras comuns)
+_ALIASES_IGNORADOS = {"sao paulo", "santos", "primavera", "villa", "lobos"}
+
+# Busca aproximada de estações (erros de digitação) quando a exata acha menos de duas
+FUZZY_ATIVO = os.getenv("CECI_STATION_FUZZY", "1") == "1"
 
+_PALAVRA = re.compile(r"\w+")
+# Listas de trigramas lidas além das 4k + 1 do filtro de prefixo (FuzzyStationIndex._buscar):
+# cada uma a mais exige uma aparição a mais e corta quase todos os candidatos
+_LISTAS_EXTRAS = 2
+# Trechos da mensagem que começam ou terminam nestas palavras não são buscados
+_PALAVRAS_VAZIAS = {"a", "o", "as", "os", "e", "de", "do", "da", "dos", "das", "em", "no", "na",
+                    "ao", "para", "pra", "pro", "ate", "por", "pela", "pelo", "um", "uma"}
+
+@lru_cache(maxsize=1)
 def load_linhas():
+    """
+    Lê data/data_linhas.json uma única vez por processo.
+    O dicionário retornado é compartilhado: trate-o como somente leitura.
+    """
     with open("data/data_linhas.json", "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -15,37 +36,366 @@ def normalize_text(texto: str) -> str:
     """
     return unidecode.unidecode(texto).lower()
 
-def extract_origin_destination(texto: str) -> dict:
+def gerar_aliases(estacoes: list[str]) -> dict[str, str]:
     """
-    Identifica origem e destino em uma frase, buscando todas as estações por substring,
-    ordenando pela posição de aparição, e garantindo que sejam duas estações distintas.
-    
-    Retorna:
-      - {"origem": <station>, "destino": <station>}
-      - ou {"error": "<mensagem de erro>"}
+    Gera apelidos a partir das partes de nomes compostos por hífen
+    ("Trianon-Masp" → "Trianon", "Masp"). Uma parte só vira apelido se for
+    inequívoca (pertence a uma única estação) e não for ela mesma uma estação.
+    Retorna { apelido_normalizado: estação }.
+    """
+    nomes = {normalize_text(est) for est in estacoes}
+    candidatos: dict[str, set[str]] = {}
+    for est in estacoes:
+        if "-" not in est:
+            continue
+        for parte in est.split("-"):
+            norm = normalize_text(parte).strip()
+            if len(norm) >= 4 and norm not in nomes and norm not in _ALIASES_IGNORADOS:
+                candidatos.setdefault(norm, set()).add(est)
+    return {alias: next(iter(ests)) for alias, ests in candidatos.items() if len(ests) == 1}
+
+
+def _padroes(estacoes: list[str], aliases: dict[str, str] | None) -> dict[str, str]:
+    """{ nome ou apelido normalizado: estação }; o nome da própria estação vence o apelido."""
+    padroes = {normalize_text(est): est for est in estacoes}
+    for alias, est in (aliases or {}).items():
+        padroes.setdefault(normalize_text(alias), est)
+    return padroes
+
+
+class StationMatcher:
+    """
+    Autômato Aho-Corasick sobre os nomes normalizados das estações e seus apelidos.
+    Construído uma vez; cada busca percorre a mensagem em uma única passada linear,
+    independente do número de estações cadastradas.
+    """
+
+    def __init__(self, estacoes: list[str], aliases: dict[str, str] | None = None):
+        self.estacoes = list(dict.fromkeys(estacoes))
+        self._set_estacoes = set(self.estacoes)
+
+        padroes = _padroes(self.estacoes, aliases)
+
+        # Tabelas do autômato: transições, link de falha, padrão terminal e link de saída
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._saida: list[tuple[int, str] | None] = [None]  # (tamanho, estação)
+        self._proxima_saida: list[int] = [0]
+
+        for padrao, est in padroes.items():
+            if padrao:
+                self._inserir(padrao, est)
+        self._construir_links()
+
+    def __contains__(self, estacao: str) -> bool:
+        return estacao in self._set_estacoes
+
+    def __len__(self) -> int:
+        return len(self.estacoes)
+
+    def _inserir(self, padrao: str, estacao: str):
+        estado = 0
+        for ch in padrao:
+            prox = self._goto[estado].get(ch)
+            if prox is None:
+                prox = len(self._goto)
+                self._goto[estado][ch] = prox
+                self._goto.append({})
+                self._fail.append(0)
+                self._saida.append(None)
+                self._proxima_saida.append(0)
+            estado = prox
+        self._saida[estado] = (len(padrao), estacao)
+
+    def _construir_links(self):
+        """
+        BFS sobre a trie preenchendo os links de falha e, para cada estado,
+        o próximo estado terminal alcançável pelos links de falha.
+        """
+        fila = deque(self._goto[0].values())
+        while fila:
+            estado = fila.popleft()
+            for ch, filho in self._goto[estado].items():
+                f = self._fail[estado]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                destino = self._goto[f].get(ch, 0)
+                self._fail[filho] = destino if destino != filho else 0
+                alvo = self._fail[filho]
+                self._proxima_saida[filho] = alvo if self._saida[alvo] else self._proxima_saida[alvo]
+                fila.append(filho)
+
+    def find_all(self, texto_norm: str) -> list[tuple[int, int, str]]:
+        """
+        Retorna todas as ocorrências (início, fim, estação) em texto já normalizado
+        que respeitam limites de palavra, inclusive sobrepostas.
+        """
+        goto, fail, saida, prox_saida = self._goto, self._fail, self._saida, self._proxima_saida
+        n = len(texto_norm)
+        encontrados = []
+        estado = 0
+        for i, ch in enumerate(texto_norm):
+            while estado and ch not in goto[estado]:
+                estado = fail[estado]
+            estado = goto[estado].get(ch, 0)
+
+            s = estado if saida[estado] else prox_saida[estado]
+            while s:
+                tamanho, est = saida[s]
+                inicio, fim = i - tamanho + 1, i + 1
+                if (inicio == 0 or not texto_norm[inicio - 1].isalnum()) and \
+                   (fim == n or not texto_norm[fim].isalnum()):
+                    encontrados.append((inicio, fim, est))
+                s = prox_saida[s]
+        return encontrados
+
+    def find(self, texto: str, texto_norm: str | None = None) -> list[tuple[int, str]]:
+        """
+        Normaliza o texto (ou usa 'texto_norm', se já normalizado) e retorna as estações
+        encontradas como (posição, estação), em ordem de aparição. Ocorrências sobrepostas
+        são resolvidas pela mais longa ("Campo Limpo Paulista" vence "Campo Limpo" e "Paulista").
+        """
+        ocorrencias = self.find_all(texto_norm if texto_norm is not None else normalize_text(texto))
+        ocorrencias.sort(key=lambda o: (o[0], o[0] - o[1]))
+
+        selecionadas = []
+        fim_anterior = 0
+        for inicio, fim, est in ocorrencias:
+            if inicio >= fim_anterior:
+                selecionadas.append((inicio, est))
+                fim_anterior = fim
+        return selecionadas
+
+
+def _canonico(texto_norm: str) -> str:
+    # Só as palavras: "trianon-masp" e "trianon masp" são o mesmo nome
+    return " ".join(_PALAVRA.findall(texto_norm))
+
+def _tolerancia(tamanho: int) -> int:
+    """Edições aceitas para um trecho deste tamanho; curtos só casam exatos ("tiene" não vira "Tietê")."""
+    if tamanho < 6:
+        return 0
+    return 1 if tamanho < 10 else 2
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    """
+    Distância de edição com transposição de vizinhos (Damerau restrita):
+    inserção, remoção, troca ou inversão de duas letras custam 1. Só a faixa
+    |i - j| <= limite da matriz é calculada; passando do limite, retorna
+    limite + 1.
     """
-    norm_input = normalize_text(texto)
+    fora = limite + 1
+    m = len(b)
+    if abs(len(a) - m) > limite:
+        return fora
+    if a == b:
+        return 0
+    # Prefixo e sufixo comuns não mudam a distância: a matriz fica só com o miolo
+    ini, fim = 0, min(len(a), m)
+    while ini < fim and a[ini] == b[ini]:
+        ini += 1
+    sufixo = 0
+    while sufixo < fim - ini and a[-1 - sufixo] == b[-1 - sufixo]:
+        sufixo += 1
+    a, b = a[ini:len(a) - sufixo], b[ini:m - sufixo]
+    m = len(b)
+    # Miolos que diferem em uma edição: uma letra a mais, uma trocada ou duas invertidas
+    if len(a) + m == 1 or (len(a) == m == 1) or (len(a) == m == 2 and a == b[::-1]):
+        return min(1, fora)
+    anterior2: list[int] = []
+    anterior = [j if j <= limite else fora for j in range(m + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        atual = [fora] * (m + 1)
+        if i <= limite:
+            atual[0] = i
+        menor = atual[0]
+        for j in range(max(1, i - limite), min(m, i + limite) + 1):
+            cb = b[j - 1]
+            d = anterior[j - 1] + (ca != cb)
+            if anterior[j] < d:
+                d = anterior[j] + 1
+            if atual[j - 1] < d:
+                d = atual[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and anterior2[j - 2] < d:
+                d = anterior2[j - 2] + 1
+            atual[j] = d
+            if d < menor:
+                menor = d
+        if menor > limite:
+            return fora
+        anterior2, anterior = anterior, atual
+    return min(anterior[m], fora)
+
+
+class FuzzyStationIndex:
+    """
+    Busca tolerante a erros de digitação sobre os mesmos nomes e apelidos do
+    StationMatcher. Listas invertidas de trigramas de caracteres, separadas
+    pelo tamanho do nome: quem está a até k edições de uma consulta tem
+    tamanho a ±k dela e mantém todos os trigramas dela menos no máximo 4k
+    (cada edição desfaz até 4). Basta contar sobre as listas dos trigramas
+    mais raros da consulta, o que deixa poucos candidatos mesmo com dezenas
+    de milhares de nomes, e só para eles se calcula a distância de edição.
+    Construído uma vez.
+    """
+
+    def __init__(self, estacoes: list[str], aliases: dict[str, str] | None = None):
+        self._exatos: dict[str, str] = {}
+        for padrao, est in _padroes(list(dict.fromkeys(estacoes)), aliases).items():
+            nome = _canonico(padrao)
+            if nome:
+                self._exatos.setdefault(nome, est)
+        self._nomes = list(self._exatos)
+        self._estacoes = list(self._exatos.values())
+        # (trigrama, tamanho do nome) -> índices dos nomes; trigrama -> em quantos nomes aparece
+        self._listas: dict[tuple[str, int], list[int]] = {}
+        self._frequencia: dict[str, int] = {}
+        for i, nome in enumerate(self._nomes):
+            for tri in self._trigramas(nome):
+                self._listas.setdefault((tri, len(nome)), []).append(i)
+                self._frequencia[tri] = self._frequencia.get(tri, 0) + 1
+        self.max_palavras = max((nome.count(" ") + 1 for nome in self._nomes), default=0)
+        self.max_tamanho = max((len(nome) for nome in self._nomes), default=0)
+
+    def __len__(self) -> int:
+        return len(self._nomes)
+
+    @staticmethod
+    def _trigramas(nome: str) -> set[str]:
+        nome = f"  {nome}  "
+        return {nome[i:i + 3] for i in range(len(nome) - 2)}
+
+    def buscar(self, texto: str, max_dist: int | None = None, limite: int = 5) -> list[tuple[str, int]]:
+        """
+        Estações mais próximas de 'texto' (um nome só, não uma frase), como
+        (estação, distância) da menor distância para a maior. Sem 'max_dist',
+        a tolerância depende do tamanho do texto (_tolerancia).
+        """
+        consulta = _canonico(normalize_text(texto))
+        if not consulta:
+            return []
+        return self._buscar(consulta, _tolerancia(len(consulta)) if max_dist is None else max_dist, limite)
+
+    def _buscar(self, consulta: str, k: int, limite: int) -> list[tuple[str, int]]:
+        exato = self._exatos.get(consulta)
+        if exato is not None and (k == 0 or limite == 1):
+            return [(exato, 0)]
+        if k == 0:
+            return []
 
-    # Carrega lista de todas as estações
+        trigramas = self._trigramas(consulta)
+        n = len(consulta)
+        # Quem está a até k edições perde no máximo 4k dos trigramas da consulta, então
+        # aparece em pelo menos L - 4k das listas de quaisquer L deles. Só as listas dos
+        # 4k + 1 + _LISTAS_EXTRAS mais raros são lidas, e só na faixa de tamanhos n-k..n+k
+        raros = sorted(trigramas, key=lambda tri: self._frequencia.get(tri, 0))
+        del raros[4 * k + 1 + _LISTAS_EXTRAS:]
+        exigidas = len(raros) - 4 * k
+        contagem = Counter()
+        for tri in raros:
+            if tri in self._frequencia:
+                for tamanho in range(n - k, n + k + 1):
+                    lista = self._listas.get((tri, tamanho))
+                    if lista:
+                        contagem.update(lista)
+        # Mais listas em comum primeiro
+        pontuados = sorted((-comuns, i) for i, comuns in contagem.items() if comuns >= exigidas)
+
+        melhores: dict[str, int] = {}
+        for _, i in pontuados:
+            d = distancia_edicao(consulta, self._nomes[i], k)
+            if d <= k:
+                est = self._estacoes[i]
+                if d < melhores.get(est, k + 1):
+                    melhores[est] = d
+                # O exato já saiu acima: com um resultado só, uma edição é o melhor possível
+                if limite == 1 and d <= 1:
+                    break
+        return sorted(melhores.items(), key=lambda par: (par[1], par[0]))[:limite]
+
+    def find(self, texto: str, texto_norm: str | None = None) -> list[tuple[int, str]]:
+        """
+        Como StationMatcher.find, tolerando erros de digitação: os trechos de
+        até max_palavras palavras que não começam nem terminam em artigo ou
+        preposição são buscados no índice, do mais longo ao mais curto a partir
+        de cada palavra; o primeiro exato ou a uma edição fica com as palavras
+        que cobre. Entre trechos sobrepostos fica o de menor distância e,
+        empatados, o mais longo. Retorna (posição, estação) em ordem de aparição.
+        """
+        norm = texto_norm if texto_norm is not None else normalize_text(texto)
+        palavras = [(m.start(), m.end(), m.group()) for m in _PALAVRA.finditer(norm)]
+        achados = []  # (distância, -tamanho, início, fim, estação)
+        vistos: dict[str, list[tuple[str, int]]] = {}  # trecho repetido na mensagem: uma busca só
+        i = 0
+        while i < len(palavras):
+            inicio, _, primeira = palavras[i]
+            proxima = i + 1
+            if primeira in _PALAVRAS_VAZIAS:
+                i = proxima
+                continue
+            trechos = []  # (última palavra, fim, trecho)
+            trecho = ""
+            for j in range(i, min(i + self.max_palavras, len(palavras))):
+                _, fim, palavra = palavras[j]
+                trecho = f"{trecho} {palavra}" if trecho else palavra
+                if len(trecho) > self.max_tamanho + 2:
+                    break
+                if palavra not in _PALAVRAS_VAZIAS:
+                    trechos.append((j, fim, trecho))
+            # Do mais longo ao mais curto; um acerto exato ou a uma edição encerra a
+            # palavra e as que ele cobre não abrem novos trechos
+            for j, fim, trecho in reversed(trechos):
+                melhor = vistos.get(trecho)
+                if melhor is None:
+                    melhor = vistos[trecho] = self._buscar(trecho, _tolerancia(len(trecho)), 1)
+                if melhor:
+                    est, d = melhor[0]
+                    achados.append((d, inicio - fim, inicio, fim, est))
+                    if d <= 1:
+                        proxima = j + 1
+                        break
+            i = proxima
+
+        achados.sort()
+        ocupados: list[tuple[int, int]] = []
+        selecionadas = []
+        for _, _, inicio, fim, est in achados:
+            if all(fim <= a or inicio >= b for a, b in ocupados):
+                ocupados.append((inicio, fim))
+                selecionadas.append((inicio, est))
+        return sorted(selecionadas)
+
+
+def _build_station_matcher() -> StationMatcher:
     linhas_data = load_linhas().get("linhas", [])
     all_stations = [s for linha in linhas_data for s in linha.get("estacoes", [])]
+    return StationMatcher(all_stations, gerar_aliases(all_stations))
+
+# Matcher compartilhado (nlp_pipeline e rota_service), construído uma única vez
+STATION_MATCHER = _build_station_matcher()
+# Índice aproximado sobre os mesmos nomes e apelidos, para mensagens com erros de digitação
+STATION_FUZZY = FuzzyStationIndex(STATION_MATCHER.estacoes, gerar_aliases(STATION_MATCHER.estacoes))
+
+def extract_origin_destination(texto: str, texto_norm: str | None = None) -> dict:
+    """
+    Identifica origem e destino em uma frase usando o STATION_MATCHER,
+    ordenando pela posição de aparição, e garantindo que sejam duas estações distintas.
+    Se a busca exata achar menos de duas, usa a aproximada (STATION_FUZZY), que
+    também aceita nomes com erros de digitação.
 
-    encontrados = []
-    # Para cada estação, encontra todas as posições de ocorrência no texto
-    for station in all_stations:
-        norm_station = normalize_text(station)
-        # faz finditer para capturar todas as ocorrências da string "norm_station"
-        for match in re.finditer(re.escape(norm_station), norm_input):
-            idx = match.start()
-            encontrados.append((idx, station))
+    Retorna:
+      - {"origem": <station>, "destino": <station>}
+      - ou {"error": "<mensagem de erro>"}
+    """
+    encontrados = STATION_MATCHER.find(texto, texto_norm)  # (posição, nome_da_estação)
+    if len(encontrados) < 2 and FUZZY_ATIVO:
+        encontrados = STATION_FUZZY.find(texto, texto_norm)
 
     # Se não houver pelo menos 2 ocorrências (mesmo que duplicadas), não conseguimos extrair
     if len(encontrados) < 2:
         return {"error": "Não foi possível extrair origem e destino da frase."}
 
-    # Ordena tudo pelo índice de ocorrência
-    encontrados.sort(key=lambda x: x[0])  # (posição, nome_da_estação)
-
     # Agora, selecionamos a primeira estação encontrada como origem
     origem = encontrados[0][1]
 
@@ -62,14 +412,14 @@ def extract_origin_destination(texto: str) -> dict:
 
     return {"origem": origem, "destino": destino}
 
-def nlp_pipeline(user_input: str) -> dict:
+def nlp_pipeline(user_input: str, texto_norm: str | None = None) -> dict:
     """
-    Usa apenas matching de string para extrair origem/destino.
+    Usa matching de string (exato e, se preciso, aproximado) para extrair origem/destino.
     Retorna dicionário com:
       {"origem": <station>, "destino": <station>, "modos_de_transporte": ["rapido","simples","acessivel"]}
     Ou {"error": "<mensagem>"} caso falhe.
     """
-    pair = extract_origin_destination(user_input)
+    pair = extract_origin_destination(user_input, texto_norm)
     if "error" in pair:
         return pair
 
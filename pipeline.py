@@ -1,12 +1,15 @@
 # pipeline.py
-import re
 from datetime import datetime
-from langdetect import detect
-from intent import detect_intent
+from contexto import RequestContext
+from idioma import DETECTOR, detectar
+from intent import INTENT_ENGINE
 from services import rota_service, faq_service, relatorio_service
 from services.smalltalk_service import resposta_smalltalk
 from prompt_builder import build_prompt
-from llm import stream_response
+import llm_cache
+import metrics
+from llm import LLMIndisponivel
+from executor import run_stage, StageOverloaded
 
 INTENT_FUNCS = {
     "rota": rota_service.process_user_query,
@@ -14,91 +17,105 @@ INTENT_FUNCS = {
     "relatorio": relatorio_service.gerar_relatorio
 }
 
-# Patterns de smalltalk em pt/en/es
-SAUDACOES_PT      = re.compile(r"\b(oi|ol[aá]|opa|eai|fala|bom dia|boa tarde|boa noite)\b", re.IGNORECASE)
-AGRADECIMENTOS_PT = re.compile(r"\b(obrigad[oa]|valeu|brigad[oa])\b", re.IGNORECASE)
-DESPEDIDAS_PT     = re.compile(r"\b(tchau|até mais|até logo)\b", re.IGNORECASE)
-
-SAUDACOES_EN      = re.compile(r"\b(hello|hi|hey)\b", re.IGNORECASE)
-AGRADECIMENTOS_EN = re.compile(r"\b(thank you|thanks)\b", re.IGNORECASE)
-DESPEDIDAS_EN     = re.compile(r"\b(bye|goodbye)\b", re.IGNORECASE)
-
-SAUDACOES_ES      = re.compile(r"\b(hola)\b", re.IGNORECASE)
-AGRADECIMENTOS_ES = re.compile(r"\b(gracias)\b", re.IGNORECASE)
-DESPEDIDAS_ES     = re.compile(r"\b(adiós|adios)\b", re.IGNORECASE)
+# Resposta quando a fila de um estágio pesado está cheia
+MENSAGEM_OCUPADO = {
+    "pt": "Estou com muitas solicitações agora. Pode tentar de novo em alguns segundos?",
+    "en": "I'm handling a lot of requests right now. Could you try again in a few seconds?",
+    "es": "Estoy atendiendo muchas solicitudes ahora. ¿Puedes intentarlo de nuevo en unos segundos?",
+}
 
 
-async def process_user_input(user_input: str):
-    texto = user_input.strip()
+async def process_user_input(user_input: str, ctx: RequestContext | None = None):
+    # Normalização, idioma e intenção são calculados uma vez e repassados aos serviços;
+    # quem chama pode passar o próprio ctx para ler intent e lang depois (protocolo.py)
+    if ctx is None:
+        ctx = RequestContext.criar(user_input)
 
-    #  SMALLTALK em Português
-    if SAUDACOES_PT.search(texto):
-        yield resposta_smalltalk("greeting", "pt")
-        return
-    if AGRADECIMENTOS_PT.search(texto):
-        yield resposta_smalltalk("thanks", "pt")
-        return
-    if DESPEDIDAS_PT.search(texto):
-        yield resposta_smalltalk("bye", "pt")
-        return
-
-    #  SMALLTALK em Inglês
-    if SAUDACOES_EN.search(texto):
-        yield resposta_smalltalk("greeting", "en")
-        return
-    if AGRADECIMENTOS_EN.search(texto):
-        yield resposta_smalltalk("thanks", "en")
-        return
-    if DESPEDIDAS_EN.search(texto):
-        yield resposta_smalltalk("bye", "en")
-        return
-
-    #  SMALLTALK em Espanhol
-    if SAUDACOES_ES.search(texto):
-        yield resposta_smalltalk("greeting", "es")
-        return
-    if AGRADECIMENTOS_ES.search(texto):
-        yield resposta_smalltalk("thanks", "es")
-        return
-    if DESPEDIDAS_ES.search(texto):
-        yield resposta_smalltalk("bye", "es")
+    # Smalltalk e intenção numa única varredura (intent.INTENT_ENGINE)
+    with metrics.estagio("intent"):
+        intencao = INTENT_ENGINE.detectar(ctx.texto)
+    if intencao.local:
+        ctx.intent, ctx.lang = intencao.intent, intencao.lang
+        metrics.RESPOSTAS.inc(ctx.intent, "smalltalk")
+        yield resposta_smalltalk(intencao.intent, intencao.lang)
         return
 
     # Caso funcional (rota, faq, relatório) ou fallback
+    # Estágios pesados (FAQ, rota e o langdetect, se configurado) rodam fora do event loop (executor.py)
+    # Os tempos dos estágios (metrics.estagio) incluem a espera na fila do executor
     try:
-        user_lang = detect(user_input)
-    except:
-        user_lang = "pt"
+        with metrics.estagio("idioma"):
+            if DETECTOR == "langdetect":
+                ctx.lang = await run_stage("langdetect", detectar, ctx.texto)
+            else:
+                ctx.lang = detectar(ctx.texto)
+    except StageOverloaded:
+        ctx.lang = "pt"
 
-    intent = detect_intent(user_input)
+    ctx.intent = intencao.intent
+    intent = ctx.intent
     fn = INTENT_FUNCS.get(intent)
     
-    if intent == "rota":
-        texto_rota = fn(user_input)
-        yield texto_rota
-        return
-    if fn:
-        resultado = fn(user_input)
+    try:
+        if intent == "rota":
+            with metrics.estagio("rota"):
+                texto_rota = await run_stage("rota", fn, ctx.texto, ctx.texto_norm)
+            metrics.RESPOSTAS.inc(intent, "rota")
+            yield texto_rota
+            return
+        if fn:
+            if intent == "faq_passageiro":
+                with metrics.estagio("faq"):
+                    resultado, direta = await faq_service.resposta_faq_async(ctx.texto, ctx.lang, ctx.texto_norm)
+                # Confiança alta: resposta pré-renderizada no idioma do usuário, sem LLM
+                if direta:
+                    metrics.RESPOSTAS.inc(intent, "faq_direta")
+                    yield resultado
+                    return
+            else:
+                resultado = fn(ctx.texto)
 
-        if intent == "faq_passageiro":
-            context_obj = {"tipo": "faq", "texto_faq": resultado}
-        elif intent == "relatorio":
-            agora = datetime.now().strftime("%d/%m/%Y %H:%M")
-            context_obj = {
-                "tipo": "relatorio",
-                "titulo": f"Relatório - {agora.split(' ')[0]}",
-                "data_hora": agora,
-                "conteudo": resultado
-            }
+            if intent == "faq_passageiro":
+                context_obj = {"tipo": "faq", "texto_faq": resultado}
+            elif intent == "relatorio":
+                agora = datetime.now().strftime("%d/%m/%Y %H:%M")
+                context_obj = {
+                    "tipo": "relatorio",
+                    "titulo": f"Relatório - {agora.split(' ')[0]}",
+                    "data_hora": agora,
+                    "conteudo": resultado
+                }
+            else:
+                context_obj = {"texto": resultado}
         else:
-            context_obj = {"texto": resultado}
+            # Fallback genérico (LLM lida com a frase curta ou sem intenção)
+            context_obj = {"texto": "Desculpe, não entendi exatamente o que você quis dizer. Poderia reformular?"}
 
-        prompt = build_prompt(context_obj, user_input)
-        async for chunk in stream_response(prompt, user_lang):
-            yield chunk
-    else:
-        # Fallback genérico (LLM lida com a frase curta ou sem intenção)
-        context_obj = {"texto": "Desculpe, não entendi exatamente o que você quis dizer. Poderia reformular?"}
-        prompt = build_prompt(context_obj, user_input)
-        async for chunk in stream_response(prompt, user_lang):
+        with metrics.estagio("prompt"):
+            prompt = build_prompt(context_obj, ctx.texto, ctx.lang)
+    except StageOverloaded:
+        metrics.RESPOSTAS.inc(intent, "ocupado")
+        yield MENSAGEM_OCUPADO.get(ctx.lang, MENSAGEM_OCUPADO["pt"])
+        return
+
+    # Respostas já geradas para o mesmo prompt (ou pergunta parecida) saem do llm_cache
+    embedding = None
+    if llm_cache.usa_semantico(ctx.intent):
+        try:
+            with metrics.estagio("embedding"):
+                embedding = await run_stage("faq", faq_service.embedding_consulta, ctx.texto, ctx.texto_norm)
+        except StageOverloaded:
+            pass
+
+    # LLM saturada ou fora do ar: se nada foi enviado ainda, avisa o usuário
+    enviou = False
+    try:
+        async for chunk in llm_cache.stream_com_cache(prompt, ctx.lang, ctx.intent, embedding):
+            enviou = True
             yield chunk
+    except (StageOverloaded, LLMIndisponivel) as e:
+        metrics.RESPOSTAS.inc(intent, "ocupado" if isinstance(e, StageOverloaded) else "llm_erro")
+        if not enviou:
+            yield MENSAGEM_OCUPADO.get(ctx.lang, MENSAGEM_OCUPADO["pt"])
+        return
+    metrics.RESPOSTAS.inc(intent, "llm")
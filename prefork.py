@@ -0,0 +1,121 @@
+# prefork.py
+"""
+Vários workers do uvicorn com um só carregamento. O processo mestre importa o
+app e todos os subsistemas (inicializacao.precarregar: motor de rotas,
+encoder e índice do FAQ, SDK da OpenAI, pipeline), congela o heap
+(gc.freeze) e só então abre a porta e faz fork dos workers: pesos do modelo,
+tabelas e módulos ficam nas mesmas páginas (copy-on-write) em vez de uma
+cópia por worker, como no `uvicorn --workers`, em que cada worker importa
+tudo de novo. Os embeddings (e as listas do índice IVF) já são mapeados do
+disco (services/faq_index.py) e o kernel os compartilha nos dois modos; um
+índice flat ou HNSW só é compartilhado aqui, via copy-on-write.
+
+Pools de threads criados antes do fork não existiriam nos filhos, então as
+bibliotecas nativas ficam com 1 thread, no mestre e nos workers (o
+paralelismo vem dos processos): ONNX Runtime, PyTorch (intra e inter-op),
+OpenMP (PyTorch e FAISS) e o tokenizer. Isso vale também na primeira subida
+sem artefatos, em que o mestre codifica o FAQ inteiro (obter_indice) antes do
+fork. Aquecimento, StatusPoller e pools do executor sobem em cada worker, no
+lifespan. Métricas, caches e o /status são por worker. Worker que morre é
+recriado.
+
+Uso (na raiz do projeto):
+    CECI_WORKERS=4 python app.py
+"""
+import gc
+import os
+import signal
+import sys
+import time
+import traceback
+
+import uvicorn
+
+# Worker que morre antes disso (s) é recriado com atraso: erro na subida não vira um laço de forks
+VIDA_MINIMA = 1.0
+
+
+def _worker(config: uvicorn.Config, sock) -> None:
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, signal.SIG_DFL)
+    gc.enable()
+    codigo = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        traceback.print_exc()
+        codigo = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(codigo)
+
+
+def _uma_thread() -> None:
+    """Antes de importar as bibliotecas nativas: cada uma lê o número de threads ao carregar."""
+    for var in ("CECI_FAQ_ONNX_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        if os.environ.get(var, "1") != "1":
+            print(f"prefork: {var} ignorado, 1 thread por worker")
+        os.environ[var] = "1"
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    from services.encoders import ENCODER_BACKEND
+    if ENCODER_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(1)
+        torch.set_num_interop_threads(1)
+
+
+def servir(app, host: str, porta: int, workers: int, **opcoes) -> None:
+    # Sem coletas no mestre: objetos liberados deixariam buracos em páginas que os workers herdam
+    gc.disable()
+    _uma_thread()
+
+    import inicializacao
+
+    inicio = time.perf_counter()
+    config = uvicorn.Config(app, host=host, port=porta, **opcoes)
+    config.load()
+    inicializacao.precarregar()
+    sock = config.bind_socket()
+    gc.collect()
+    gc.freeze()
+    print(f"prefork: subsistemas carregados em {time.perf_counter() - inicio:.1f} s; "
+          f"{workers} workers em {host}:{porta}")
+
+    filhos: dict[int, float] = {}
+    parar = False
+
+    def _parar(sinal, _frame):
+        nonlocal parar
+        parar = True
+        for pid in list(filhos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _criar():
+        pid = os.fork()
+        if pid == 0:
+            _worker(config, sock)
+        filhos[pid] = time.monotonic()
+
+    signal.signal(signal.SIGINT, _parar)
+    signal.signal(signal.SIGTERM, _parar)
+    for _ in range(workers):
+        _criar()
+    while filhos:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        criado = filhos.pop(pid, None)
+        if criado is None or parar:
+            continue
+        print(f"prefork: worker {pid} saiu (código {os.waitstatus_to_exitcode(status)}), criando outro")
+        if time.monotonic() - criado < VIDA_MINIMA:
+            time.sleep(VIDA_MINIMA)
+        if not parar:
+            _criar()
+    sock.close()
@@ -1,7 +1,7 @@
 # prompt_builder.py
 
 import json
-from langdetect import detect
+from idioma import detectar
 
 # Mapeia código ISO (‘pt’, ‘en’, ‘es’) para nome legível
 LANG_NAME = {
@@ -10,14 +10,15 @@ LANG_NAME = {
     "es": "espanhol"
 }
 
-def build_prompt(contexto: dict, user_input: str) -> str:
+def build_prompt(contexto: dict, user_input: str, lang: str | None = None) -> str:
     """
     Monta o prompt para a LLM, escolhendo e
     traduzindo o texto de sistema inteiro conforme o idioma detectado.
+    O pipeline repassa o idioma já detectado (RequestContext.lang).
     """
 
-    # 1) Detecta idioma do usuário (langdetect retorna 'pt', 'en', 'es', etc.)
-    lang = detect(user_input)
+    # 1) Idioma do usuário ('pt', 'en' ou 'es'); detecta só se não vier do pipeline
+    lang = lang or detectar(user_input)
     idioma_nome = LANG_NAME.get(lang, "português")  # padrão pt se não reconhecer
 
     tipo = contexto.get("tipo", None)
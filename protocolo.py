@@ -0,0 +1,323 @@
+# protocolo.py
+"""
+Saída do WebSocket /ws/ceci: os pedaços da resposta são agrupados antes do
+envio (menos quadros e syscalls por resposta) e o cliente escolhe o formato
+com ?formato=... na URL:
+
+- "texto" (padrão, clientes atuais): o texto puro e "[DONE]" no fim. Uma
+  resposta por vez: mensagem nova espera a que está saindo terminar, como
+  sempre foi. Com CECI_WS_SUBSTITUIR=1, a nova interrompe a atual, que
+  termina com "[DONE]" igual a uma completa: só para clientes que não
+  precisam distinguir as duas (quem precisa usa o formato json).
+- "json": um objeto por quadro, todos com o id da mensagem:
+    {"id": 1, "tipo": "inicio", "intent": "faq_passageiro", "lang": "pt"}
+    {"id": 1, "tipo": "delta", "texto": "..."}
+    {"id": 1, "tipo": "fim"}
+    {"id": 1, "tipo": "erro", "mensagem": "..."}   (encerra no lugar de "fim")
+    {"id": 1, "tipo": "cancelado"}                 (idem, após um cancelamento)
+  O cliente envia texto puro ou
+    {"id": 2, "texto": "..."}                      (sem id: próximo número da conexão)
+    {"id": 2, "texto": "...", "substituir": true}  (cancela as que estão em andamento)
+    {"cancelar": 1}
+  e as respostas saem em paralelo, intercaladas, até CECI_WS_MAX_PENDENTES
+  por conexão; acima disso vem {"tipo": "erro", "codigo": "limite"}. Um id
+  repetido cancela a resposta anterior com esse id.
+
+Cancelar uma resposta (ou fechar a conexão) interrompe o pipeline na hora e,
+com ele, o stream da LLM e a requisição HTTP.
+"""
+import asyncio
+import json
+import os
+import time
+import traceback
+from collections import deque
+from typing import NamedTuple
+
+from fastapi import WebSocketDisconnect
+
+import metrics
+from contexto import RequestContext
+
+FORMATOS = ("texto", "json")
+
+# Um quadro sai quando o acumulado chega a AGRUPAR_BYTES (UTF-8) ou quando o
+# pedaço mais antigo espera há AGRUPAR_MS; os dois em 0 desligam o agrupamento
+AGRUPAR_BYTES = int(os.getenv("CECI_WS_AGRUPAR_BYTES", 64))
+AGRUPAR_MS = float(os.getenv("CECI_WS_AGRUPAR_MS", 30))
+
+# Respostas em andamento por conexão no formato json
+MAX_PENDENTES = int(os.getenv("CECI_WS_MAX_PENDENTES", 4))
+# Formato texto: mensagem nova espera a resposta em andamento (0, padrão) ou a interrompe (1)
+SUBSTITUIR = os.getenv("CECI_WS_SUBSTITUIR", "0") == "1"
+
+FIM_TEXTO = "[DONE]"
+
+_CONTADORES = {"conexoes": 0, "mensagens": 0, "canceladas": 0, "recusadas": 0}
+_SESSOES: set["Sessao"] = set()
+
+
+async def _fechar(it):
+    aclose = getattr(it, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def agrupar(chunks, max_bytes: int = AGRUPAR_BYTES, max_ms: float = AGRUPAR_MS):
+    """
+    Junta os pedaços de 'chunks' e os repassa quando o acumulado chega a
+    'max_bytes' ou quando o mais antigo espera há 'max_ms'; o que sobrar sai
+    no fim. O primeiro pedaço sai na hora, para não atrasar o primeiro byte.
+    Se o consumidor desistir, a fonte é fechada junto.
+    """
+    it = chunks.__aiter__()
+    if max_bytes <= 0 and max_ms <= 0:
+        try:
+            async for chunk in it:
+                yield chunk
+        finally:
+            await _fechar(it)
+        return
+
+    # Uma tarefa lê a fonte para a fila; o consumidor só é acordado quando está
+    # esperando (por um pedaço novo ou pelo prazo), sem uma tarefa por pedaço
+    loop = asyncio.get_running_loop()
+    fila: deque[str] = deque()
+    aviso: asyncio.Future | None = None
+
+    def acordar():
+        if aviso is not None and not aviso.done():
+            aviso.set_result(None)
+
+    async def bombear():
+        try:
+            async for chunk in it:
+                fila.append(chunk)
+                acordar()
+        finally:
+            acordar()
+
+    leitor = asyncio.ensure_future(bombear())
+    buf: list[str] = []
+    tamanho = 0
+    prazo = 0.0
+    primeiro = True
+    try:
+        while True:
+            while fila:
+                chunk = fila.popleft()
+                if primeiro:
+                    primeiro = False
+                    yield chunk
+                    continue
+                if not buf:
+                    prazo = loop.time() + max_ms / 1000
+                buf.append(chunk)
+                tamanho += len(chunk.encode("utf-8"))
+                if max_bytes > 0 and tamanho >= max_bytes:
+                    yield "".join(buf)
+                    buf, tamanho = [], 0
+            if leitor.done():
+                break
+            if buf and max_ms > 0 and loop.time() >= prazo:
+                yield "".join(buf)
+                buf, tamanho = [], 0
+                continue
+            aviso = loop.create_future()
+            timer = loop.call_at(prazo, acordar) if buf and max_ms > 0 else None
+            try:
+                await aviso
+            finally:
+                aviso = None
+                if timer is not None:
+                    timer.cancel()
+        if buf:
+            yield "".join(buf)
+        # Repassa o erro da fonte (ex.: LLMIndisponivel) depois do que já chegou
+        leitor.result()
+    finally:
+        if not leitor.done():
+            leitor.cancel()
+            try:
+                await leitor
+            except (asyncio.CancelledError, Exception):
+                pass
+        await _fechar(it)
+
+
+def quadro(tipo: str, id_msg, **campos) -> str:
+    return json.dumps({"id": id_msg, "tipo": tipo, **campos}, ensure_ascii=False, separators=(",", ":"))
+
+
+class Mensagem(NamedTuple):
+    """Mensagem do cliente: uma pergunta ou, com cancelar=True, o id a interromper."""
+    id: object
+    texto: str | None = None
+    cancelar: bool = False
+    substituir: bool = False
+
+
+def _id(valor, padrao):
+    # O id vira chave de dicionário: só str ou int
+    return valor if isinstance(valor, (str, int)) and not isinstance(valor, bool) else padrao
+
+
+def ler_mensagem(recebido: str, formato: str, sequencia: int) -> Mensagem:
+    """No formato json aceita os objetos do protocolo ou texto puro; no texto, tudo é pergunta."""
+    if formato == "json" and recebido.lstrip().startswith("{"):
+        try:
+            dados = json.loads(recebido)
+        except ValueError:
+            dados = None
+        if isinstance(dados, dict):
+            if "cancelar" in dados:
+                return Mensagem(_id(dados["cancelar"], None), cancelar=True)
+            if isinstance(dados.get("texto"), str):
+                return Mensagem(_id(dados.get("id"), sequencia), dados["texto"],
+                                substituir=dados.get("substituir") is True)
+    return Mensagem(sequencia, recebido)
+
+
+async def responder(websocket, chunks, formato: str, id_msg, ctx: RequestContext):
+    """Envia uma resposta inteira (já agrupada) no formato da conexão."""
+    if formato == "texto":
+        async for pedaco in agrupar(chunks):
+            await websocket.send_text(pedaco)
+        await websocket.send_text(FIM_TEXTO)
+        return
+
+    iniciou = False
+    try:
+        async for pedaco in agrupar(chunks):
+            if not iniciou:
+                # intent e lang já estão no ctx quando o primeiro pedaço sai do pipeline
+                await websocket.send_text(quadro("inicio", id_msg, intent=ctx.intent, lang=ctx.lang))
+                iniciou = True
+            await websocket.send_text(quadro("delta", id_msg, texto=pedaco))
+    except WebSocketDisconnect:
+        raise
+    except Exception:
+        traceback.print_exc()
+        await websocket.send_text(quadro("erro", id_msg, mensagem="Falha ao gerar a resposta."))
+        return
+    if not iniciou:
+        await websocket.send_text(quadro("inicio", id_msg, intent=ctx.intent, lang=ctx.lang))
+    await websocket.send_text(quadro("fim", id_msg))
+
+
+class Sessao:
+    """
+    Uma conexão do /ws/ceci. As mensagens são lidas sem esperar as respostas:
+    cada uma vira uma tarefa, guardada pelo id, e os envios das tarefas passam
+    por um lock. Cancelar a tarefa interrompe o gerador de 'processar' onde ele
+    estiver (o stream da LLM fecha a resposta HTTP no finally).
+    """
+
+    def __init__(self, websocket, processar, formato: str = "texto",
+                 max_pendentes: int = MAX_PENDENTES, substituir: bool = SUBSTITUIR):
+        self.websocket = websocket
+        self.processar = processar
+        self.formato = formato
+        self.max_pendentes = max(max_pendentes, 1)
+        self.substituir = substituir
+        self.pendentes: dict[object, asyncio.Task] = {}
+        self.sequencia = 0
+        self._envio = asyncio.Lock()
+
+    async def send_text(self, texto: str):
+        async with self._envio:
+            await self.websocket.send_text(texto)
+
+    def iniciar(self, id_msg, texto: str):
+        ctx = RequestContext.criar(texto)
+        tarefa = asyncio.create_task(self._responder(id_msg, texto, ctx))
+        self.pendentes[id_msg] = tarefa
+        tarefa.add_done_callback(lambda t: self._concluir(id_msg, t))
+        _CONTADORES["mensagens"] += 1
+
+    def _concluir(self, id_msg, tarefa: asyncio.Task):
+        if self.pendentes.get(id_msg) is tarefa:
+            del self.pendentes[id_msg]
+
+    async def _responder(self, id_msg, texto: str, ctx: RequestContext):
+        inicio = time.perf_counter()
+        try:
+            await responder(self, self.processar(texto, ctx), self.formato, id_msg, ctx)
+            metrics.RESPOSTA_SEGUNDOS.observar(time.perf_counter() - inicio, ctx.intent)
+        except WebSocketDisconnect:
+            pass  # o laço de leitura também vê a desconexão e cancela o resto
+        except Exception:
+            # No json o erro do pipeline já virou quadro "erro"; no texto a conexão
+            # fecha com 1011, como quando a exceção escapava do endpoint
+            traceback.print_exc()
+            if self.formato == "texto":
+                try:
+                    await self.websocket.close(code=1011)
+                except Exception:
+                    pass
+
+    async def cancelar(self, id_msg) -> bool:
+        """Interrompe a resposta 'id_msg' e avisa o cliente. False se ela não está em andamento."""
+        tarefa = self.pendentes.get(id_msg)
+        if tarefa is None:
+            return False
+        tarefa.cancel()
+        await asyncio.gather(tarefa, return_exceptions=True)
+        if tarefa.cancelled():
+            _CONTADORES["canceladas"] += 1
+            await self.send_text(FIM_TEXTO if self.formato == "texto" else quadro("cancelado", id_msg))
+        return True
+
+    async def cancelar_todas(self):
+        for id_msg in list(self.pendentes):
+            await self.cancelar(id_msg)
+
+    async def receber(self, recebido: str):
+        self.sequencia += 1
+        msg = ler_mensagem(recebido, self.formato, self.sequencia)
+        if msg.cancelar:
+            await self.cancelar(msg.id)
+            return
+        if self.formato == "texto":
+            # O cliente em texto não distingue respostas intercaladas: uma por vez
+            if self.substituir:
+                await self.cancelar_todas()
+            else:
+                await asyncio.gather(*self.pendentes.values(), return_exceptions=True)
+        elif msg.substituir:
+            await self.cancelar_todas()
+        elif msg.id in self.pendentes:
+            await self.cancelar(msg.id)
+        if len(self.pendentes) >= self.max_pendentes:
+            _CONTADORES["recusadas"] += 1
+            await self.send_text(quadro("erro", msg.id, mensagem="Muitas mensagens em andamento.", codigo="limite"))
+            return
+        self.iniciar(msg.id, msg.texto)
+
+    async def atender(self):
+        _CONTADORES["conexoes"] += 1
+        _SESSOES.add(self)
+        try:
+            while True:
+                await self.receber(await self.websocket.receive_text())
+        finally:
+            # Conexão encerrada: nada do que ainda está gerando tem quem leia
+            _SESSOES.discard(self)
+            tarefas = list(self.pendentes.values())
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+async def atender(websocket, processar, formato: str = "texto"):
+    """Atende a conexão até o cliente sair; cada mensagem vira processar(texto, ctx)."""
+    await Sessao(websocket, processar, formato).atender()
+
+
+def stats() -> dict:
+    return {
+        **_CONTADORES,
+        "conexoes_abertas": len(_SESSOES),
+        "em_andamento": sum(len(sessao.pendentes) for sessao in _SESSOES),
+        "max_pendentes": MAX_PENDENTES,
+    }
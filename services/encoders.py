@@ -0,0 +1,219 @@
+# services/encoders.py
+"""
+Backends de embedding do FAQ, todos com a mesma interface:
+    encoder.encode(textos, batch_size=32) -> np.ndarray float32 (n, dim), normalizado (L2)
+
+- "torch": SentenceTransformer em PyTorch (float32), como antes.
+- "onnx":  o mesmo modelo exportado para ONNX Runtime com quantização dinâmica
+           int8 (sem importar torch em tempo de execução).
+
+Escolha com CECI_FAQ_ENCODER=torch|onnx. O modelo ONNX é gerado offline por:
+    python -m services.encoders export [--saida data/encoder_onnx]
+e validado contra o PyTorch (cosseno e concordância do top-1 do FAQ) por:
+    python -m services.encoders validar
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+MODEL_NAME = os.getenv("CECI_FAQ_MODEL", "all-MiniLM-L6-v2")
+ENCODER_BACKEND = os.getenv("CECI_FAQ_ENCODER", "torch")
+ONNX_DIR = os.getenv("CECI_FAQ_ONNX_DIR", "data/encoder_onnx")
+ONNX_THREADS = int(os.getenv("CECI_FAQ_ONNX_THREADS", 0))  # 0 = padrão do ONNX Runtime
+
+ARQ_ONNX = "model_int8.onnx"
+ARQ_ONNX_FP32 = "model.onnx"
+ARQ_CONFIG = "encoder.json"
+
+# Frases fora do FAQ usadas na validação (paráfrases e outros idiomas)
+CONSULTAS_VALIDACAO = [
+    "que horas o metrô abre?",
+    "como recarregar o bilhete unico",
+    "posso levar minha bike no trem?",
+    "perdi minha carteira na estação, o que faço?",
+    "what time does the subway open?",
+    "how do I top up my transit card?",
+    "¿a qué hora abre el metro?",
+    "¿puedo llevar mi bicicleta en el tren?",
+    "criança paga passagem?",
+    "tem wifi nas estações?",
+]
+
+
+def normalizar(embs: np.ndarray) -> np.ndarray:
+    embs = np.asarray(embs, dtype=np.float32)
+    normas = np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs / np.maximum(normas, 1e-12)
+
+
+class TorchEncoder:
+    nome = "torch"
+
+    def __init__(self, modelo: str = MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.modelo = SentenceTransformer(modelo, device="cpu")
+
+    def encode(self, textos: list[str], batch_size: int = 32, **_) -> np.ndarray:
+        embs = self.modelo.encode(textos, convert_to_numpy=True, batch_size=batch_size)
+        return normalizar(embs)
+
+
+class OnnxEncoder:
+    """
+    Transformer exportado (ONNX, pesos int8) + tokenizer rápido (tokenizers) +
+    mean pooling com a máscara de atenção, como o módulo Pooling do SentenceTransformer.
+    """
+    nome = "onnx"
+
+    def __init__(self, diretorio: str = ONNX_DIR, arquivo: str = ARQ_ONNX):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(diretorio, ARQ_CONFIG), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(diretorio, "tokenizer.json"))
+        self.tokenizer.enable_truncation(config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=config.get("pad_id", 0))
+
+        opcoes = ort.SessionOptions()
+        if ONNX_THREADS:
+            opcoes.intra_op_num_threads = ONNX_THREADS
+        self.sessao = ort.InferenceSession(os.path.join(diretorio, arquivo), opcoes,
+                                           providers=["CPUExecutionProvider"])
+        self._entradas = {e.name for e in self.sessao.get_inputs()}
+
+    def encode(self, textos: list[str], batch_size: int = 32, **_) -> np.ndarray:
+        saida = []
+        for i in range(0, len(textos), batch_size):
+            lote = self.tokenizer.encode_batch(textos[i:i + batch_size])
+            mascara = np.array([t.attention_mask for t in lote], dtype=np.int64)
+            feed = {
+                "input_ids": np.array([t.ids for t in lote], dtype=np.int64),
+                "attention_mask": mascara,
+                "token_type_ids": np.array([t.type_ids for t in lote], dtype=np.int64),
+            }
+            feed = {k: v for k, v in feed.items() if k in self._entradas}
+            tokens = self.sessao.run(None, feed)[0]
+
+            m = mascara[..., None].astype(np.float32)
+            saida.append((tokens * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9))
+        if not saida:
+            return np.zeros((0, 0), dtype=np.float32)
+        return normalizar(np.concatenate(saida))
+
+
+BACKENDS = {"torch": TorchEncoder, "onnx": OnnxEncoder}
+
+def carregar_encoder(backend: str = ENCODER_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"CECI_FAQ_ENCODER inválido: {backend!r} (use {', '.join(BACKENDS)})")
+    return BACKENDS[backend]()
+
+def assinatura_encoder(backend: str = ENCODER_BACKEND) -> str:
+    """
+    Identifica o encoder nos artefatos do índice FAQ (embeddings de backends
+    diferentes não são intercambiáveis) sem precisar carregá-lo. No ONNX entram
+    os arquivos exportados: reexportar ou requantizar muda a assinatura.
+    """
+    if backend != "onnx":
+        return f"{backend}:{MODEL_NAME}"
+    h = hashlib.sha256()
+    for nome in (ARQ_CONFIG, "tokenizer.json", ARQ_ONNX):
+        with open(os.path.join(ONNX_DIR, nome), "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    return f"onnx:{ARQ_ONNX}:{h.hexdigest()[:16]}"
+
+
+def exportar(saida: str = ONNX_DIR, modelo: str = MODEL_NAME):
+    """
+    Exporta o transformer do SentenceTransformer para ONNX e gera a versão com
+    quantização dinâmica int8 (pesos das camadas lineares em int8).
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(modelo, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    os.makedirs(saida, exist_ok=True)
+
+    exemplo = tokenizer(["exemplo de pergunta"], return_tensors="pt")
+    nomes = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in exemplo]
+    eixos = {n: {0: "lote", 1: "tokens"} for n in nomes}
+    eixos["last_hidden_state"] = {0: "lote", 1: "tokens"}
+
+    class _SaidaTokens(torch.nn.Module):
+        # Só last_hidden_state, com as entradas nomeadas (o tracing não lida com os kwargs do forward)
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *entradas):
+            return self.transformer(**dict(zip(nomes, entradas))).last_hidden_state
+
+    caminho_fp32 = os.path.join(saida, ARQ_ONNX_FP32)
+    with torch.no_grad():
+        torch.onnx.export(
+            _SaidaTokens(),
+            tuple(exemplo[n] for n in nomes),
+            caminho_fp32,
+            input_names=nomes,
+            output_names=["last_hidden_state"],
+            dynamic_axes=eixos,
+            opset_version=17,
+            dynamo=False,
+        )
+    quantize_dynamic(caminho_fp32, os.path.join(saida, ARQ_ONNX), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(saida)
+    with open(os.path.join(saida, ARQ_CONFIG), "w", encoding="utf-8") as f:
+        json.dump({
+            "modelo": modelo,
+            "max_seq_length": st.max_seq_length,
+            "pad_id": tokenizer.pad_token_id or 0,
+            "dim": transformer.config.hidden_size,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Modelo ONNX gravado em {saida} ({ARQ_ONNX_FP32} e {ARQ_ONNX})")
+
+
+def validar(referencia, candidato, textos: list[str], corpus: list[str]) -> dict:
+    """
+    Compara dois encoders: cosseno entre os embeddings de cada texto e
+    concordância do top-1 ao buscar 'textos' no 'corpus' (perguntas do FAQ),
+    cada backend com os seus próprios embeddings do corpus.
+    """
+    ref, cand = referencia.encode(textos), candidato.encode(textos)
+    cossenos = (ref * cand).sum(axis=1)
+    top1_ref = (ref @ referencia.encode(corpus).T).argmax(axis=1)
+    top1_cand = (cand @ candidato.encode(corpus).T).argmax(axis=1)
+    return {
+        "textos": len(textos),
+        "cosseno_medio": float(cossenos.mean()),
+        "cosseno_min": float(cossenos.min()),
+        "top1_concordancia": float((top1_ref == top1_cand).mean()),
+    }
+
+
+def main(argv: list[str]):
+    comando = argv[0] if argv else ""
+    if comando == "export":
+        saida = argv[argv.index("--saida") + 1] if "--saida" in argv else ONNX_DIR
+        exportar(saida)
+    elif comando == "validar":
+        from services.faq_index import carregar_faq
+        perguntas, _ = carregar_faq()
+        textos = perguntas + [p.lower().rstrip("?") for p in perguntas] + CONSULTAS_VALIDACAO
+        r = validar(TorchEncoder(), OnnxEncoder(), textos, perguntas)
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,262 @@
+# services/faq_index.py
+"""
+Artefatos do índice FAQ gerados offline: embeddings normalizados, índice FAISS e
+tabela de perguntas/respostas, gravados em FAQ_INDEX_DIR/<hash>/, onde o hash
+cobre o conteúdo dos JSONs de FAQ e o nome do modelo. Em tempo de execução os
+embeddings (e as listas de um índice IVF) são mapeados em memória; só se
+reconstrói quando o hash muda.
+
+Uso (na raiz do projeto):
+    python -m services.faq_index build [--force]
+    python -m services.faq_index info
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+
+import faiss
+import numpy as np
+
+from services.encoders import assinatura_encoder, carregar_encoder, normalizar
+
+FAQ_FILES = ("data/faq_ccr.json", "data/faq_passageiro.json")
+FAQ_INDEX_DIR = os.getenv("CECI_FAQ_INDEX_DIR", "data/faq_index")
+
+# Tipo de índice: flat (busca exata), ivf, hnsw, sq8 ou auto (pelo tamanho do corpus)
+FAQ_INDEX_TYPE = os.getenv("CECI_FAQ_INDEX", "auto")
+TIPOS_INDICE = ("flat", "ivf", "hnsw", "sq8")
+# Até este número de entradas a busca exata fica abaixo de ~0,5 ms por consulta
+AUTO_FLAT_MAX = int(os.getenv("CECI_FAQ_AUTO_FLAT_MAX", 10_000))
+IVF_NPROBE = os.getenv("CECI_FAQ_NPROBE")           # padrão: nlist // 4
+HNSW_M = int(os.getenv("CECI_FAQ_HNSW_M", 32))
+HNSW_EF_SEARCH = int(os.getenv("CECI_FAQ_HNSW_EF", 64))
+HNSW_EF_CONSTRUCTION = int(os.getenv("CECI_FAQ_HNSW_EF_CONSTRUCTION", 128))
+
+ARQ_EMBEDDINGS = "embeddings.npy"
+ARQ_INDICE = "index.faiss"
+ARQ_TABELA = "faq.json"
+ARQ_META = "meta.json"
+
+
+@dataclass
+class FaqIndex:
+    hash: str
+    embs: np.ndarray
+    index: faiss.Index
+    perguntas: list[str]
+    respostas: list[str]
+    # True só quando o índice FAISS foi de fato mapeado (IVF); os embeddings sempre são
+    mmap: bool = False
+
+
+def _extract_list(raw: list, key: str):
+    for item in raw:
+        if isinstance(item, dict) and key in item:
+            return item[key]
+    return []
+
+def carregar_entradas() -> list[dict]:
+    """
+    Lê os JSONs de FAQ e retorna as entradas (question, context, answer, ...)
+    na ordem do índice.
+    """
+    faq_ccr_raw        = json.load(open(FAQ_FILES[0], "r", encoding="utf-8"))
+    faq_passageiro_raw = json.load(open(FAQ_FILES[1], "r", encoding="utf-8"))
+
+    faq_ccr        = _extract_list(faq_ccr_raw,        "faqs_colaborador")
+    faq_passageiro = _extract_list(faq_passageiro_raw, "faqs_passageiro")
+
+    return [*faq_ccr, *faq_passageiro]
+
+def carregar_faq() -> tuple[list[str], list[str]]:
+    """
+    Retorna (perguntas, respostas) na ordem do índice.
+    """
+    _all_faq = carregar_entradas()
+    return [f["question"] for f in _all_faq], [f["answer"] for f in _all_faq]
+
+def hash_conteudo(arquivos=FAQ_FILES, modelo: str | None = None, tipo: str = FAQ_INDEX_TYPE) -> str:
+    # Parâmetros de construção entram no hash; os de busca (nprobe, efSearch) não
+    modelo = modelo or assinatura_encoder()
+    h = hashlib.sha256(f"{modelo}|{tipo}|{AUTO_FLAT_MAX}|{HNSW_M}|{HNSW_EF_CONSTRUCTION}".encode("utf-8"))
+    for arq in arquivos:
+        with open(arq, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+def escolher_tipo(n: int, tipo: str = FAQ_INDEX_TYPE) -> str:
+    if tipo == "auto":
+        return "flat" if n <= AUTO_FLAT_MAX else "hnsw"
+    if tipo not in TIPOS_INDICE:
+        raise ValueError(f"CECI_FAQ_INDEX inválido: {tipo!r} (use auto, {', '.join(TIPOS_INDICE)})")
+    return tipo
+
+def nlist_para(n: int) -> int:
+    """
+    ~4·√n listas, limitado para que cada centróide tenha ao menos 39 pontos
+    de treino (mínimo recomendado pelo FAISS).
+    """
+    return max(1, min(int(4 * n ** 0.5), n // 39))
+
+def ajustar_busca(index: faiss.Index):
+    """
+    Parâmetros de busca (não fazem parte do treino): nprobe do IVF e efSearch do HNSW.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = int(IVF_NPROBE) if IVF_NPROBE else max(1, index.nlist // 4)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+def construir_indice(embs: np.ndarray, tipo: str = FAQ_INDEX_TYPE) -> faiss.Index:
+    """
+    Constrói o índice de produto interno (embeddings já normalizados → cosseno).
+    """
+    n, d = embs.shape
+    tipo = escolher_tipo(n, tipo)
+    if tipo == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif tipo == "ivf":
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFFlat(quantizer, d, nlist_para(n), faiss.METRIC_INNER_PRODUCT)
+        index.train(embs)
+    elif tipo == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(embs)
+    index.add(embs)
+    ajustar_busca(index)
+    return index
+
+
+def construir(encode, diretorio: str = FAQ_INDEX_DIR, hash_: str | None = None,
+              forcar: bool = False) -> FaqIndex:
+    """
+    Codifica as perguntas com 'encode', constrói o índice e grava os artefatos em
+    diretorio/<hash>/. A gravação é feita em um diretório temporário, publicado
+    com um único rename, que falha se o destino já existir: quando vários
+    processos sobem juntos sem artefatos (uvicorn --workers), o primeiro a
+    publicar vence e os outros descartam o seu e carregam o dele. Um conjunto
+    publicado nunca é apagado no lugar; com 'forcar' (ou se estiver incompleto)
+    ele antes sai do caminho com um rename, e quem já mapeou os arquivos
+    continua com eles.
+    """
+    hash_ = hash_ or hash_conteudo()
+    perguntas, respostas = carregar_faq()
+
+    embs = normalizar(encode(perguntas, batch_size=8))
+    index = construir_indice(embs)
+
+    destino = os.path.join(diretorio, hash_)
+    tmp = f"{destino}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, ARQ_EMBEDDINGS), embs)
+    faiss.write_index(index, os.path.join(tmp, ARQ_INDICE))
+    with open(os.path.join(tmp, ARQ_TABELA), "w", encoding="utf-8") as f:
+        json.dump({"perguntas": perguntas, "respostas": respostas}, f, ensure_ascii=False)
+    with open(os.path.join(tmp, ARQ_META), "w", encoding="utf-8") as f:
+        json.dump({
+            "hash": hash_,
+            "modelo": assinatura_encoder(),
+            "entradas": len(perguntas),
+            "dim": int(embs.shape[1]),
+            "indice": type(index).__name__,
+            "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, ensure_ascii=False, indent=2)
+
+    if not forcar and os.path.isfile(os.path.join(destino, ARQ_META)):
+        shutil.rmtree(tmp, ignore_errors=True)
+        return carregar(diretorio, hash_)
+    antigo = None
+    if os.path.isdir(destino):
+        antigo = f"{destino}.old-{os.getpid()}"
+        try:
+            os.rename(destino, antigo)
+        except FileNotFoundError:
+            antigo = None
+    try:
+        os.rename(tmp, destino)
+    except OSError:
+        # Outro processo publicou o mesmo hash entre a checagem e o rename
+        shutil.rmtree(tmp, ignore_errors=True)
+        return carregar(diretorio, hash_)
+    finally:
+        if antigo:
+            shutil.rmtree(antigo, ignore_errors=True)
+    return FaqIndex(hash_, embs, index, perguntas, respostas)
+
+
+def carregar(diretorio: str = FAQ_INDEX_DIR, hash_: str | None = None) -> FaqIndex | None:
+    """
+    Abre os artefatos de diretorio/<hash>/ com mmap (embeddings via np.load e
+    índice via faiss.IO_FLAG_MMAP, que só mapeia as listas do IVF).
+    Retorna None se não existirem para o hash atual.
+    """
+    hash_ = hash_ or hash_conteudo()
+    pasta = os.path.join(diretorio, hash_)
+    if not os.path.isfile(os.path.join(pasta, ARQ_META)):
+        return None
+
+    embs = np.load(os.path.join(pasta, ARQ_EMBEDDINGS), mmap_mode="r")
+    caminho_indice = os.path.join(pasta, ARQ_INDICE)
+    try:
+        index = faiss.read_index(caminho_indice, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        index = faiss.read_index(caminho_indice)
+    # A flag só vira mapeamento de fato nas listas invertidas do IVF; flat e HNSW
+    # são lidos inteiros para a memória de cada processo, mesmo sem erro
+    mmap = isinstance(index, faiss.IndexIVF)
+    ajustar_busca(index)
+    with open(os.path.join(pasta, ARQ_TABELA), "r", encoding="utf-8") as f:
+        tabela = json.load(f)
+    return FaqIndex(hash_, embs, index, tabela["perguntas"], tabela["respostas"], mmap)
+
+
+def obter_indice(encode) -> FaqIndex:
+    """
+    Carrega o índice do hash atual ou, se os artefatos não existirem (FAQ ou
+    modelo mudaram), reconstrói com 'encode' e grava para os próximos processos.
+    """
+    hash_ = hash_conteudo()
+    try:
+        faq = carregar(hash_=hash_)
+    except FileNotFoundError:
+        # Conjunto trocado no meio da leitura (build --force em outro processo)
+        faq = None
+    if faq is None:
+        print(f"Índice FAQ {hash_} não encontrado em {FAQ_INDEX_DIR}: reconstruindo.")
+        construir(encode, hash_=hash_)
+        faq = carregar(hash_=hash_)
+    return faq
+
+
+def main(argv: list[str]):
+    comando = argv[0] if argv else "info"
+    hash_ = hash_conteudo()
+    if comando == "build":
+        if "--force" not in argv and carregar(hash_=hash_) is not None:
+            print(f"Índice {hash_} já existe em {FAQ_INDEX_DIR} (use --force para reconstruir).")
+            return
+        inicio = time.perf_counter()
+        faq = construir(carregar_encoder().encode, hash_=hash_, forcar="--force" in argv)
+        print(f"Índice {hash_} gravado em {FAQ_INDEX_DIR}: {len(faq.perguntas)} entradas "
+              f"({time.perf_counter() - inicio:.1f} s)")
+    elif comando == "info":
+        pasta = os.path.join(FAQ_INDEX_DIR, hash_)
+        if not os.path.isfile(os.path.join(pasta, ARQ_META)):
+            print(f"Hash atual {hash_}: sem artefatos em {FAQ_INDEX_DIR}.")
+            return
+        with open(os.path.join(pasta, ARQ_META), "r", encoding="utf-8") as f:
+            print(json.dumps(json.load(f), ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+# services/faq_lexico.py
+"""
+Índice invertido com pontuação BM25 sobre os campos question/context/answer do
+FAQ. Serve de pré-filtro do faq_service: quando uma pergunta tem um vencedor
+léxico claro ("bilhete único", "bicicleta", "achados e perdidos"), a resposta
+sai sem passar pelo modelo de embeddings, como contexto da LLM.
+"""
+import math
+import os
+import re
+
+from nlp_processor import normalize_text
+
+# Peso de cada campo na frequência do termo (BM25F simplificado)
+PESOS_CAMPOS = {"question": 3.0, "context": 1.0, "answer": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Vencedor confiável: pontuação mínima e vantagem relativa sobre o segundo colocado
+BM25_MIN = float(os.getenv("CECI_FAQ_BM25_MIN", 5.0))
+BM25_MARGEM = float(os.getenv("CECI_FAQ_BM25_MARGEM", 0.4))
+
+_STOPWORDS = set("""
+a o as os um uma uns umas de da do das dos em no na nos nas por pelo pela para pra
+com sem e ou que se eu meu minha meus minhas voce seu sua me te lhe ele ela isso
+esse essa este esta como qual quais quando onde porque ha tem ter posso pode podem
+ser sao e foi faco fazer the is do does can i my to in on of a an el la los las
+de del en mi puedo como que es un una por para con
+""".split())
+
+
+def tokenizar(texto: str, normalizado: bool = False) -> list[str]:
+    """
+    Sem acentos e minúsculas (normalize_text, a menos que o texto já venha
+    normalizado), sem stopwords e com um radical simples (plural em -s) para
+    "bicicleta"/"bicicletas" coincidirem.
+    """
+    tokens = []
+    for tok in re.findall(r"\w+", texto if normalizado else normalize_text(texto)):
+        if len(tok) < 2 or tok in _STOPWORDS:
+            continue
+        if len(tok) > 4 and tok.endswith("s"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, entradas: list[dict], pesos: dict[str, float] = PESOS_CAMPOS,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(entradas)
+
+        # termo → [(doc, frequência ponderada)]
+        self.postings: dict[str, list[tuple[int, float]]] = {}
+        self.tamanhos: list[float] = []
+        for doc, entrada in enumerate(entradas):
+            tf: dict[str, float] = {}
+            for campo, peso in pesos.items():
+                for tok in tokenizar(entrada.get(campo, "")):
+                    tf[tok] = tf.get(tok, 0.0) + peso
+            self.tamanhos.append(sum(tf.values()))
+            for tok, freq in tf.items():
+                self.postings.setdefault(tok, []).append((doc, freq))
+
+        self.tamanho_medio = sum(self.tamanhos) / self.n_docs if self.n_docs else 0.0
+        self.idf = {
+            tok: math.log(1 + (self.n_docs - len(lista) + 0.5) / (len(lista) + 0.5))
+            for tok, lista in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def pontuar(self, query: str, normalizado: bool = False) -> dict[int, float]:
+        """
+        Retorna {doc: pontuação BM25} apenas para documentos com algum termo da consulta.
+        """
+        scores: dict[int, float] = {}
+        k1, b, medio = self.k1, self.b, self.tamanho_medio or 1.0
+        for tok in set(tokenizar(query, normalizado)):
+            lista = self.postings.get(tok)
+            if not lista:
+                continue
+            idf = self.idf[tok]
+            for doc, freq in lista:
+                norm = k1 * (1 - b + b * self.tamanhos[doc] / medio)
+                scores[doc] = scores.get(doc, 0.0) + idf * freq * (k1 + 1) / (freq + norm)
+        return scores
+
+    def vencedor(self, query: str, minimo: float = BM25_MIN, margem: float = BM25_MARGEM,
+                 normalizado: bool = False) -> tuple[int, float] | None:
+        """
+        Retorna (doc, pontuação) se o melhor documento passar de 'minimo' e superar o
+        segundo colocado em pelo menos 'margem' (fração da própria pontuação);
+        senão None, e a consulta segue para a busca vetorial.
+        """
+        scores = self.pontuar(query, normalizado)
+        if not scores:
+            return None
+        melhores = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:2]
+        doc, melhor = melhores[0]
+        segundo = melhores[1][1] if len(melhores) > 1 else 0.0
+        if melhor >= minimo and (melhor - segundo) >= margem * melhor:
+            return doc, melhor
+        return None
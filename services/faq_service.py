@@ -1,52 +1,178 @@
 # services/faq_service.py
 import os
-import json 
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from sklearn.preprocessing import normalize
-from langdetect import detect
+import re
+import metrics
+from cache import LRUCache
+from executor import Batcher
+from idioma import detectar
+from nlp_processor import normalize_text
+from services.encoders import carregar_encoder
+from services.faq_index import carregar_entradas, obter_indice
+from services.faq_lexico import BM25Index
+from services.faq_traducoes import carregar_traducoes, hash_resposta
 
 
-MODEL = SentenceTransformer(
-    'all-MiniLM-L6-v2',
-    device="cpu"
-)
+# Backend de embedding (CECI_FAQ_ENCODER=torch|onnx), ver services/encoders.py
+ENCODER = carregar_encoder()
 
 SIM_THRESHOLD = 0.75
 
-faq_ccr_raw        = json.load(open("data/faq_ccr.json",        "r", encoding="utf-8"))
-faq_passageiro_raw = json.load(open("data/faq_passageiro.json", "r", encoding="utf-8"))
+# Resposta direta: acima deste segundo limiar a resposta pré-renderizada no idioma
+# do usuário (services/faq_traducoes.py) vai ao cliente sem passar pela LLM.
+# DIRETO_SIM vale para o cosseno (pergunta exata ou busca vetorial). O vencedor
+# léxico (BM25) nunca sai direto, só como contexto da LLM: palavras em comum não
+# bastam ("bicicleta no ônibus" casa com a do metrô)
+DIRETO_ATIVO = os.getenv("CECI_FAQ_DIRETO", "1") == "1"
+DIRETO_SIM = float(os.getenv("CECI_FAQ_DIRETO_SIM", 0.85))
+
+# Micro-batching: janela de espera (ms) e tamanho máximo do lote de consultas
+BATCH_WINDOW_MS = float(os.getenv("CECI_FAQ_BATCH_WINDOW_MS", 3))
+BATCH_MAX = int(os.getenv("CECI_FAQ_BATCH_MAX", 32))
+
+# Cache de consultas já codificadas: texto normalizado → (similaridade, índice, embedding)
+QUERY_CACHE = LRUCache(
+    max_entradas=int(os.getenv("CECI_FAQ_QUERY_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("CECI_FAQ_QUERY_CACHE_TTL", 3600)),
+)
+
+# Pré-filtro léxico (BM25): vencedor claro dispensa o modelo e vira contexto da LLM.
+# Com FUSAO, as consultas que seguem para a busca vetorial desempatam o top-k
+# somando a pontuação BM25
+LEXICO_ATIVO = os.getenv("CECI_FAQ_LEXICO", "1") == "1"
+FUSAO = os.getenv("CECI_FAQ_FUSAO", "0") == "1"
+FUSAO_PESO = float(os.getenv("CECI_FAQ_FUSAO_PESO", 0.1))
+FUSAO_K = 5
+
+# Embeddings, índice e tabela de respostas vêm dos artefatos de services/faq_index
+# (mapeados em memória); só são recalculados se os JSONs de FAQ ou o encoder mudarem
+_faq = obter_indice(ENCODER.encode)
+
+_perguntas = _faq.perguntas
+_respostas = _faq.respostas
+_embs = _faq.embs
+index = _faq.index
+
+# Respostas em pt/en/es por índice; o português é a própria resposta do FAQ
+_traducoes = carregar_traducoes()
+_renderizadas = [{"pt": r, **_traducoes.get(hash_resposta(r), {})} for r in _respostas]
+
+# Mesma ordem do índice vetorial (os artefatos são amarrados ao hash dos JSONs)
+LEXICO = BM25Index(carregar_entradas())
+
+
+def chave_consulta(texto: str, texto_norm: str | None = None) -> str:
+    """
+    Chave das camadas rápidas: sem acentos, minúsculas (normalize_text),
+    sem pontuação e com espaços colapsados.
+    """
+    if texto_norm is None:
+        texto_norm = normalize_text(texto)
+    return " ".join(re.findall(r"\w+", texto_norm))
+
+# Perguntas do FAQ feitas palavra por palavra: resposta sem passar pelo modelo
+_exatas = {chave_consulta(p): i for i, p in enumerate(_perguntas)}
+acertos_exatos = 0
+acertos_lexicos = 0
+respostas_diretas = 0
+
+
+def busca_rapida(query: str, texto_norm: str | None = None) -> tuple[str, float, int] | None:
+    """
+    Camadas à frente do modelo: tabela de perguntas exatas, cache de consultas e
+    vencedor léxico (BM25). Retorna (origem, pontuação, índice_da_resposta) ou
+    None se for preciso codificar. Em "exata" e "cache" a pontuação é o cosseno
+    (a pergunta do FAQ contra ela mesma: 1.0); em "lexica" é a pontuação BM25,
+    que não se compara com SIM_THRESHOLD nem com DIRETO_SIM.
+    """
+    global acertos_exatos
+    chave = chave_consulta(query, texto_norm)
+    idx = _exatas.get(chave)
+    if idx is not None:
+        acertos_exatos += 1
+        return "exata", 1.0, idx
+    item = QUERY_CACHE.get(chave)
+    if item is not None:
+        return "cache", item[0], item[1]
+    if LEXICO_ATIVO:
+        if texto_norm is None:
+            vencedor = LEXICO.vencedor(query)
+        else:
+            vencedor = LEXICO.vencedor(texto_norm, normalizado=True)
+        if vencedor is not None:
+            return "lexica", vencedor[1], vencedor[0]
+    return None
+
+
+def _encontrada(origem: str, pontuacao: float) -> bool:
+    """O vencedor léxico já passou de BM25_MIN e BM25_MARGEM; as demais origens são cossenos."""
+    return origem == "lexica" or pontuacao >= SIM_THRESHOLD
 
-def _extract_list(raw: list, key: str):
-    for item in raw:
-        if isinstance(item, dict) and key in item:
-            return item[key]
-    return []
 
-faq_ccr        = _extract_list(faq_ccr_raw,        "faqs_colaborador")
-faq_passageiro = _extract_list(faq_passageiro_raw, "faqs_passageiro")
+# IVF/HNSW com nprobe/efSearch baixo podem devolver índice -1 (vizinho não achado):
+# conta como abaixo de qualquer limiar, sem tocar em _respostas/_renderizadas
+SEM_RESULTADO = (-1.0, -1)
 
-_all_faq = [*faq_ccr, *faq_passageiro]
 
-_perguntas = [f["question"] for f in _all_faq]
-_respostas = [f["answer"]   for f in _all_faq]
+def _fundir(query: str, sims, indices) -> tuple[float, int]:
+    """
+    Reordena o top-k vetorial por cosseno + FUSAO_PESO · BM25 normalizado.
+    A similaridade devolvida continua sendo o cosseno do escolhido (SIM_THRESHOLD).
+    """
+    candidatos = [(float(s), int(i)) for s, i in zip(sims, indices) if i >= 0]
+    if not candidatos:
+        return SEM_RESULTADO
+    lexico = LEXICO.pontuar(query)
+    teto = max(lexico.values(), default=0.0) or 1.0
+    return max(candidatos, key=lambda c: c[0] + FUSAO_PESO * lexico.get(c[1], 0.0) / teto)
 
-# Gera embeddings (já embarca em INT8) e normaliza
-_embs = MODEL.encode(_perguntas, convert_to_numpy=True, batch_size=8)
-_embs = normalize(_embs, axis=1)
 
-# Constroi índice FAISS
-d = _embs.shape[1]
-nlist = 26
-quantizer = faiss.IndexFlatIP(d)
-index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
-index.train(_embs)
-index.add(_embs)
+def buscar_faq(queries: list[str]) -> list[tuple[str, float, int]]:
+    """
+    Codifica um lote de consultas e faz uma única busca no índice.
+    Retorna ("vetorial", similaridade, índice_da_resposta) para cada consulta,
+    no formato de busca_rapida.
+    """
+    with metrics.estagio("faq_encode"):
+        q_embs = ENCODER.encode(queries, batch_size=max(len(queries), 1))
 
+    with metrics.estagio("faq_busca"):
+        sim_scores, indices = index.search(q_embs, FUSAO_K if FUSAO else 1)
+    resultados = []
+    for i, query in enumerate(queries):
+        if FUSAO:
+            sim, idx = _fundir(query, sim_scores[i], indices[i])
+        else:
+            sim, idx = float(sim_scores[i][0]), int(indices[i][0])
+            if idx < 0:
+                sim, idx = SEM_RESULTADO
+        QUERY_CACHE.set(chave_consulta(query), (sim, idx, q_embs[i]))
+        resultados.append(("vetorial", sim, idx))
+    return resultados
+
+
+# Dispatcher de embeddings: junta consultas concorrentes em um único encode + index.search
+BATCHER = Batcher("faq", buscar_faq, janela_ms=BATCH_WINDOW_MS, max_lote=BATCH_MAX)
+
+
+def embedding_consulta(query: str, texto_norm: str | None = None):
+    """
+    Embedding normalizado da pergunta (camada semântica do llm_cache). Depois de
+    resposta_faq_async ele já existe: o da pergunta do FAQ, se ela veio palavra
+    por palavra, ou o que buscar_faq guardou no QUERY_CACHE (lido com peek, que
+    não conta de novo a falta de busca_rapida). Só codifica o vencedor léxico,
+    que dispensou o modelo, e as demais intenções.
+    """
+    chave = chave_consulta(query, texto_norm)
+    idx = _exatas.get(chave)
+    if idx is not None:
+        return _embs[idx]
+    item = QUERY_CACHE.peek(chave)
+    if item is not None:
+        return item[2]
+    return ENCODER.encode([query])[0]
 
-def resposta_faq(user_query: str) -> str:
-    lang = detect(user_query)
+
+def _formatar_resposta(user_query: str, lang: str, idx: int | None) -> str:
     if lang.startswith("en"):
         saudacao = "Sure! "
     elif lang.startswith("es"):
@@ -54,14 +180,7 @@ def resposta_faq(user_query: str) -> str:
     else:
         saudacao = ""
 
-    q_emb = MODEL.encode([user_query], convert_to_numpy=True)
-    q_emb = normalize(q_emb, axis=1)
-    
-    sim_scores, indices = index.search(q_emb, 1)
-    best_sim = float(sim_scores[0][0])
-    idx      = int(indices[0][0])
-
-    if best_sim < SIM_THRESHOLD:
+    if idx is None:
         if lang.startswith("en"):
             return "Sorry, I couldn’t find an answer for your question."
         elif lang.startswith("es"):
@@ -70,4 +189,69 @@ def resposta_faq(user_query: str) -> str:
             return f"Não consegui responder essa pergunta: “{user_query}”."
 
     resposta_match = _respostas[idx]
-    return f"{saudacao}{resposta_match}"
\ No newline at end of file
+    return f"{saudacao}{resposta_match}"
+
+
+def resposta_direta(lang: str, origem: str, pontuacao: float, idx: int) -> str | None:
+    """
+    Resposta pré-renderizada no idioma do usuário, se o cosseno passou de
+    DIRETO_SIM e a tradução existe; senão None (segue pela LLM). O vencedor
+    léxico não tem cosseno e sempre segue pela LLM.
+    """
+    if not DIRETO_ATIVO or origem == "lexica" or pontuacao < DIRETO_SIM:
+        return None
+    return _renderizadas[idx].get(lang[:2])
+
+
+def resposta_faq(user_query: str, lang: str | None = None) -> str:
+    lang = lang or detectar(user_query)
+    origem, pontuacao, idx = busca_rapida(user_query) or buscar_faq([user_query])[0]
+    return _formatar_resposta(user_query, lang, idx if _encontrada(origem, pontuacao) else None)
+
+
+async def resposta_faq_async(user_query: str, lang: str | None = None,
+                             texto_norm: str | None = None) -> tuple[str, bool]:
+    """
+    Versão para o pipeline, com idioma e texto normalizado do RequestContext:
+    perguntas exatas e repetidas são resolvidas na hora; as demais passam pelo
+    BATCHER (lotes entre conexões).
+    Retorna (texto, direta): com direta=True o texto já é a resposta final no
+    idioma do usuário e vai ao cliente sem LLM; senão é o contexto do prompt.
+    """
+    global acertos_lexicos, respostas_diretas
+    lang = lang or detectar(user_query)
+    with metrics.estagio("faq_rapida"):
+        rapida = busca_rapida(user_query, texto_norm)
+    origem, pontuacao, idx = rapida or await BATCHER.buscar(user_query)
+    direta = resposta_direta(lang, origem, pontuacao, idx)
+    if direta is not None:
+        respostas_diretas += 1
+        metrics.FAQ.inc("direta")
+        return direta, True
+    if not _encontrada(origem, pontuacao):
+        metrics.FAQ.inc("abaixo_limiar")
+        return _formatar_resposta(user_query, lang, None), False
+    if origem == "lexica":
+        # Contado aqui, no event loop, e não em busca_rapida (resposta_faq roda em threads)
+        acertos_lexicos += 1
+    metrics.FAQ.inc("lexica" if origem == "lexica" else "contexto")
+    return _formatar_resposta(user_query, lang, idx), False
+
+
+def aquecer():
+    """
+    Uma codificação e uma busca de ensaio (sessão do encoder, alocações), fora
+    dos caches e das métricas; chamada no worker do estágio "faq" (inicializacao.py).
+    """
+    index.search(ENCODER.encode(["como funciona o bilhete único?"]), 1)
+
+
+def stats() -> dict:
+    return {
+        "acertos_exatos": acertos_exatos,
+        "acertos_lexicos": acertos_lexicos,
+        "respostas_diretas": respostas_diretas,
+        "traducoes": sum(len(r) == 3 for r in _renderizadas),
+        "cache_consultas": QUERY_CACHE.stats(),
+        "lotes": BATCHER.stats(),
+    }
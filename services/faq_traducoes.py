@@ -0,0 +1,109 @@
+# services/faq_traducoes.py
+"""
+Respostas do FAQ já renderizadas em pt/en/es, geradas offline e guardadas ao
+lado dos dados do FAQ (data/faq_respostas.json). Com elas o pipeline envia a
+resposta direto ao usuário quando a busca tem confiança alta, sem passar pela LLM.
+
+Cada entrada é amarrada ao hash da resposta original em português: se o texto
+do FAQ mudar, a tradução antiga deixa de valer e o build a refaz.
+
+Uso (na raiz do projeto):
+    python -m services.faq_traducoes build [--force]   # traduz o que falta ou mudou (usa a OpenAI)
+    python -m services.faq_traducoes info
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+
+from services.faq_index import carregar_entradas
+
+ARQ_TRADUCOES = os.getenv("CECI_FAQ_TRADUCOES", "data/faq_respostas.json")
+IDIOMAS = ("pt", "en", "es")
+
+NOMES_IDIOMAS = {"en": "English", "es": "Spanish"}
+INSTRUCAO = (
+    "Translate the answer below from Brazilian Portuguese to {idioma}. It is shown to "
+    "passengers of the São Paulo metro by Ceci, a virtual assistant. Keep the same tone "
+    "and length. Keep proper names (stations, lines, apps, Bilhete Único), phone numbers, "
+    "prices and times exactly as they are. Reply with the translation only."
+)
+
+
+def hash_resposta(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def carregar_traducoes(arquivo: str = ARQ_TRADUCOES) -> dict[str, dict[str, str]]:
+    """
+    { hash_da_resposta_pt: {"pt": ..., "en": ..., "es": ...} }; vazio se o
+    arquivo não existir.
+    """
+    if not os.path.isfile(arquivo):
+        return {}
+    with open(arquivo, "r", encoding="utf-8") as f:
+        itens = json.load(f)
+    return {item["hash"]: {lang: item[lang] for lang in IDIOMAS if item.get(lang)} for item in itens}
+
+
+async def traduzir(texto: str, lang: str) -> str:
+    import llm
+
+    resposta = await llm.CLIENTE.backend.openai.chat.completions.create(
+        model=llm.MODELO,
+        messages=[
+            {"role": "system", "content": INSTRUCAO.format(idioma=NOMES_IDIOMAS[lang])},
+            {"role": "user", "content": texto},
+        ],
+        temperature=0,
+        max_tokens=llm.MAX_TOKENS,
+    )
+    return resposta.choices[0].message.content.strip()
+
+
+async def construir(forcar: bool = False, arquivo: str = ARQ_TRADUCOES) -> tuple[int, int]:
+    """
+    Renderiza cada resposta do FAQ nos três idiomas, reaproveitando as traduções
+    cujo hash ainda bate (a menos que 'forcar'). Retorna (entradas, traduções novas).
+    """
+    existentes = {} if forcar else carregar_traducoes(arquivo)
+    itens, novas = [], 0
+    for entrada in carregar_entradas():
+        original = entrada["answer"]
+        hash_ = hash_resposta(original)
+        textos = dict(existentes.get(hash_, {}), pt=original)
+        for lang in IDIOMAS[1:]:
+            if lang not in textos:
+                textos[lang] = await traduzir(original, lang)
+                novas += 1
+        itens.append({"hash": hash_, "question": entrada["question"], **{lang: textos[lang] for lang in IDIOMAS}})
+
+    tmp = f"{arquivo}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(itens, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, arquivo)
+    return len(itens), novas
+
+
+def main(argv: list[str]):
+    comando = argv[0] if argv else "info"
+    if comando == "build":
+        total, novas = asyncio.run(construir(forcar="--force" in argv))
+        print(f"{total} respostas em {ARQ_TRADUCOES} ({novas} traduções novas)")
+    elif comando == "info":
+        traducoes = carregar_traducoes()
+        entradas = carregar_entradas()
+        completas = sum(
+            len(traducoes.get(hash_resposta(e["answer"]), {})) == len(IDIOMAS) for e in entradas
+        )
+        print(f"{completas}/{len(entradas)} respostas do FAQ renderizadas em {'/'.join(IDIOMAS)} "
+              f"({len(traducoes)} entradas em {ARQ_TRADUCOES})")
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,467 @@
+# services/rota_engine.py
+import heapq
+import unicodedata
+from array import array
+from dataclasses import dataclass, field, replace
+
+# Constante base de tempo (em minutos) por aresta
+TEMPO_BASE = 3
+
+# Penalidades (em minutos) usadas no cálculo de peso
+PENALIDADE_FALHA = 10
+PENALIDADE_BALDEACAO = 3
+PENALIDADE_ACESSIVEL = 2
+
+MODOS = ("rapido", "simples", "acessivel")
+
+# Pontos de inacessibilidade por estação percorrida, conforme 'nivel-acessibilidade' da linha
+NIVEL_ACESSIBILIDADE = {"acessivel": 0, "alto": 1, "baixo": 2}
+
+def normalize(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ASCII", "ignore").decode("ASCII").casefold()
+
+def penalidade_status(situacao: str) -> int:
+    """
+    Penalidade de uma linha conforme a situação informada pela API de status.
+    """
+    if any(palavra in situacao for palavra in ["reduzida", "falha", "interrup"]):
+        return PENALIDADE_FALHA
+    return 0
+
+
+@dataclass
+class Snapshot:
+    """
+    Pesos publicados para um estado do status das linhas. Uma busca lê o
+    snapshot uma única vez e nunca vê uma atualização pela metade.
+    """
+    pen_linha: list[int]
+    pesos: dict[str, array]
+    peso_minimo: dict[str, float]
+    custo_ate: dict[tuple[int, str], array] = field(default_factory=dict)
+
+
+@dataclass
+class Rota:
+    estacoes: list[str]
+    baldeacoes: list[tuple[str, str, str]]  # (estação, linha_anterior, linha_nova)
+    custo: float           # custo no modo buscado
+    trocas: int
+    tempo: float = 0.0     # minutos (pesos do modo 'rapido')
+    acessibilidade: int = 0  # pontos de inacessibilidade (0 = totalmente acessível)
+    linhas: list[str] = field(default_factory=list)  # linhas percorridas, em ordem
+
+
+class RoutingEngine:
+    """
+    Rede expandida por linha: um nó por (estação, linha), arcos de viagem entre
+    estações consecutivas da mesma linha e arcos de baldeação entre os nós de
+    uma mesma estação. Tudo em CSR (indptr/indices) com IDs inteiros; os pesos de
+    cada modo ficam pré-calculados em arrays paralelos a 'indices'.
+    """
+
+    def __init__(self, linhas: list[dict], status_operacao: dict | None = None,
+                 baldeacoes: list[dict] | None = None):
+        # Estações
+        self.nomes: list[str] = []
+        self.ids: dict[str, int] = {}
+        # Linhas
+        self.linhas: list[str] = []
+        self._linha_norm: list[str] = []
+        # Nós (estação, linha)
+        self.no_estacao = array("l")
+        self.no_linha = array("l")
+        self._nos: dict[tuple[int, int], int] = {}
+
+        self.nivel_linha: list[int] = []
+
+        arcos: list[tuple[int, int]] = []
+        for linha in linhas:
+            id_linha = len(self.linhas)
+            self.linhas.append(linha.get("nome", ""))
+            self._linha_norm.append(normalize(self.linhas[-1]))
+            self.nivel_linha.append(NIVEL_ACESSIBILIDADE.get(linha.get("nivel-acessibilidade", ""), 2))
+            nos = [self._no(self._id(est), id_linha) for est in linha.get("estacoes", [])]
+            for a, b in zip(nos[:-1], nos[1:]):
+                arcos += [(a, b), (b, a)]
+
+        # Índice de pertencimento: linhas e nós de cada estação
+        self.linhas_por_estacao: list[list[int]] = [[] for _ in self.nomes]
+        self.nos_por_estacao: list[list[int]] = [[] for _ in self.nomes]
+        for (est, id_linha), no in self._nos.items():
+            self.linhas_por_estacao[est].append(id_linha)
+            self.nos_por_estacao[est].append(no)
+
+        # Pontos de baldeação: nós interligados por arcos de troca de linha
+        pares_troca = set()
+        for nos in self.nos_por_estacao:
+            pares_troca.update((a, b) for a in nos for b in nos if a != b)
+        for item in baldeacoes or []:
+            nos = [no for no in (self._resolver(item.get("estacao", ""), ln) for ln in item.get("linhas", []))
+                   if no is not None]
+            pares_troca.update((a, b) for a in nos for b in nos if a != b)
+        arcos += sorted(pares_troca)
+
+        self.pontos_baldeacao: dict[str, list[str]] = {}
+        for a, b in pares_troca:
+            ests = self.pontos_baldeacao.setdefault(self.nomes[self.no_estacao[a]], [])
+            if self.linhas[self.no_linha[b]] not in ests:
+                ests.append(self.linhas[self.no_linha[b]])
+
+        # CSR dos arcos
+        n_nos = len(self.no_estacao)
+        arcos.sort()
+        self.indptr = array("l", [0]) * (n_nos + 1)
+        self.indices = array("l", (b for _, b in arcos))
+        for a, _ in arcos:
+            self.indptr[a + 1] += 1
+        for i in range(n_nos):
+            self.indptr[i + 1] += self.indptr[i]
+        # Arco de baldeação ⇔ troca de linha (arcos de viagem nunca mudam de linha)
+        self.troca_arco = array("b", (self.no_linha[a] != self.no_linha[b] for a, b in arcos))
+        self.acess_arco = array("b", (0 if self.no_linha[a] != self.no_linha[b] else self.nivel_linha[self.no_linha[a]]
+                                      for a, b in arcos))
+
+        # Arcos de viagem de cada linha, para atualizar só os pesos da linha que mudou
+        self.arcos_por_linha: list[array] = [array("l") for _ in self.linhas]
+        for u in range(n_nos):
+            for k in range(self.indptr[u], self.indptr[u + 1]):
+                if not self.troca_arco[k]:
+                    self.arcos_por_linha[self.no_linha[u]].append(k)
+
+        self._construir_grupos(arcos)
+        self._hops: dict[int, dict[int, int]] = {}
+        self.snapshot: Snapshot | None = None
+        self.aplicar_status(status_operacao or {})
+
+    @property
+    def pesos(self) -> dict[str, array]:
+        return self.snapshot.pesos
+
+    def _id(self, nome: str) -> int:
+        idx = self.ids.get(nome)
+        if idx is None:
+            idx = self.ids[nome] = len(self.nomes)
+            self.nomes.append(nome)
+        return idx
+
+    def _no(self, est: int, id_linha: int) -> int:
+        no = self._nos.get((est, id_linha))
+        if no is None:
+            no = self._nos[(est, id_linha)] = len(self.no_estacao)
+            self.no_estacao.append(est)
+            self.no_linha.append(id_linha)
+        return no
+
+    def _resolver(self, estacao: str, nome_linha: str) -> int | None:
+        """
+        Nó de 'estacao' na linha 'nome_linha'. Aceita nomes parciais da tabela de
+        baldeações ("Barra Funda" → "Palmeiras-Barra Funda" na Linha 3).
+        """
+        if nome_linha not in self.linhas:
+            return None
+        id_linha = self.linhas.index(nome_linha)
+        est = self.ids.get(estacao)
+        if (est, id_linha) in self._nos:
+            return self._nos[(est, id_linha)]
+        alvo = normalize(estacao)
+        for (est, ln), no in self._nos.items():
+            if ln == id_linha and alvo in (normalize(parte) for parte in self.nomes[est].split("-")):
+                return no
+        return None
+
+    def _construir_grupos(self, arcos: list[tuple[int, int]]):
+        """
+        Agrupa estações ligadas por baldeação (mesmo prédio, nomes distintos) e monta
+        a adjacência entre grupos usada pelo limite inferior de saltos.
+        """
+        grupo = list(range(len(self.nomes)))
+
+        def raiz(x):
+            while grupo[x] != x:
+                grupo[x] = grupo[grupo[x]]
+                x = grupo[x]
+            return x
+
+        for a, b in arcos:
+            ea, eb = self.no_estacao[a], self.no_estacao[b]
+            if ea != eb and self.no_linha[a] != self.no_linha[b]:
+                grupo[raiz(ea)] = raiz(eb)
+        self.grupo = array("l", (raiz(e) for e in range(len(self.nomes))))
+
+        vizinhos: dict[int, set[int]] = {}
+        for a, b in arcos:
+            ga, gb = self.grupo[self.no_estacao[a]], self.grupo[self.no_estacao[b]]
+            if ga != gb:
+                vizinhos.setdefault(ga, set()).add(gb)
+        self._vizinhos_grupo = {g: sorted(vs) for g, vs in vizinhos.items()}
+
+    def aplicar_status(self, status_operacao: dict):
+        """
+        Recalcula os arrays de pesos de todos os modos a partir do status das linhas.
+        Arcos de viagem custam TEMPO_BASE (+ falha da linha, + PENALIDADE_ACESSIVEL por
+        ponto de inacessibilidade no modo 'acessivel'); arcos de baldeação custam
+        PENALIDADE_BALDEACAO no modo 'simples'.
+        """
+        pen_linha = [penalidade_status(status_operacao.get(ln, "")) for ln in self._linha_norm]
+        pesos = {}
+        for modo in MODOS:
+            custo_troca = PENALIDADE_BALDEACAO if modo == "simples" else 0
+            arr = array("d", (custo_troca if troca else 0.0 for troca in self.troca_arco))
+            for id_linha in range(len(self.linhas)):
+                viagem = self._peso_viagem(modo, id_linha, pen_linha[id_linha])
+                for k in self.arcos_por_linha[id_linha]:
+                    arr[k] = viagem
+            pesos[modo] = arr
+        self._publicar(pen_linha, pesos)
+
+    def atualizar_linhas(self, penalidades: dict[int, int]):
+        """
+        Atualização incremental: { id_linha: nova_penalidade }. Copia os arrays do
+        snapshot atual e reescreve apenas os arcos das linhas alteradas.
+        """
+        atual = self.snapshot
+        pen_linha = list(atual.pen_linha)
+        pesos = {modo: array("d", arr) for modo, arr in atual.pesos.items()}
+        for id_linha, pen in penalidades.items():
+            pen_linha[id_linha] = pen
+            for modo, arr in pesos.items():
+                viagem = self._peso_viagem(modo, id_linha, pen)
+                for k in self.arcos_por_linha[id_linha]:
+                    arr[k] = viagem
+        self._publicar(pen_linha, pesos)
+
+    def _peso_viagem(self, modo: str, id_linha: int, pen: int) -> float:
+        fator_acess = PENALIDADE_ACESSIVEL if modo == "acessivel" else 0
+        return TEMPO_BASE + pen + fator_acess * self.nivel_linha[id_linha]
+
+    def _publicar(self, pen_linha: list[int], pesos: dict[str, array]):
+        com_arcos = [ln for ln in range(len(self.linhas)) if self.arcos_por_linha[ln]]
+        peso_minimo = {
+            modo: min((self._peso_viagem(modo, ln, pen_linha[ln]) for ln in com_arcos), default=TEMPO_BASE)
+            for modo in MODOS
+        }
+        # Troca de referência única: buscas em andamento seguem com o snapshot antigo
+        self.snapshot = Snapshot(pen_linha, pesos, peso_minimo)
+
+    def hops_ate(self, grupo_alvo: int) -> dict[int, int]:
+        """
+        Distância em saltos de todo grupo de estações até 'grupo_alvo' (BFS único,
+        memorizado). Multiplicada pelo menor peso de viagem, é um limite inferior
+        admissível para o A*: baldeações nunca custam menos que zero.
+        """
+        dist = self._hops.get(grupo_alvo)
+        if dist is None:
+            dist = {grupo_alvo: 0}
+            fronteira = [grupo_alvo]
+            while fronteira:
+                proxima = []
+                for g in fronteira:
+                    for v in self._vizinhos_grupo.get(g, ()):
+                        if v not in dist:
+                            dist[v] = dist[g] + 1
+                            proxima.append(v)
+                fronteira = proxima
+            self._hops[grupo_alvo] = dist
+        return dist
+
+    def custo_ate(self, destino: int, snapshot: Snapshot, modo: str = "rapido") -> array:
+        """
+        Menor custo de cada nó até a estação 'destino' no modo (Dijkstra reverso,
+        memorizado por destino no próprio snapshot). Os arcos são simétricos,
+        então basta partir dos nós do destino com os pesos do modo.
+        """
+        cache = snapshot.custo_ate
+        dist = cache.get((destino, modo))
+        if dist is None:
+            pesos, indptr, indices = snapshot.pesos[modo], self.indptr, self.indices
+            dist = array("d", [float("inf")]) * len(self.no_estacao)
+            heap = [(0.0, no) for no in self.nos_por_estacao[destino]]
+            while heap:
+                du, u = heapq.heappop(heap)
+                if du > dist[u]:
+                    continue
+                dist[u] = du
+                for k in range(indptr[u], indptr[u + 1]):
+                    v = indices[k]
+                    dv = du + pesos[k]
+                    if dv < dist[v]:
+                        dist[v] = dv
+                        heapq.heappush(heap, (dv, v))
+            cache[(destino, modo)] = dist
+        return dist
+
+    def buscar(self, origem: int, destino: int, modo: str = "rapido") -> Rota | None:
+        """
+        A* lexicográfico (custo, trocas) sobre a rede expandida, partindo de todos os
+        nós da estação de origem. Retorna a Rota ou None se não houver caminho.
+        """
+        hops = self.hops_ate(self.grupo[destino])
+        grupo = self.grupo
+        if grupo[origem] not in hops:
+            return None
+        snapshot = self.snapshot
+        pesos = snapshot.pesos[modo]
+        peso_min = snapshot.peso_minimo[modo]
+        indptr, indices, troca_arco, no_estacao = self.indptr, self.indices, self.troca_arco, self.no_estacao
+
+        melhor: dict[int, tuple[float, int]] = {}
+        pai: dict[int, tuple[int, int]] = {}  # nó → (nó anterior, arco)
+        heap = []
+        h0 = hops[grupo[origem]] * peso_min
+        for no in self.nos_por_estacao[origem]:
+            melhor[no] = (0.0, 0)
+            heap.append((h0, 0, 0.0, no))
+        heapq.heapify(heap)
+
+        fechados = set()
+        while heap:
+            _, tu, gu, u = heapq.heappop(heap)
+            if no_estacao[u] == destino:
+                arcos = []
+                while u in pai:
+                    u, k = pai[u]
+                    arcos.append(k)
+                return self._montar_rota(u, arcos[::-1], snapshot, gu, tu)
+            if u in fechados:
+                continue
+            fechados.add(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                chave = (gu + pesos[k], tu + troca_arco[k])
+                if chave < melhor.get(v, (float("inf"), 0)):
+                    melhor[v] = chave
+                    pai[v] = (u, k)
+                    hv = hops.get(grupo[no_estacao[v]])
+                    if hv is not None:
+                        heapq.heappush(heap, (chave[0] + hv * peso_min, chave[1], chave[0], v))
+        return None
+
+    def buscar_pareto(self, origem: int, destino: int) -> list[Rota]:
+        """
+        Busca multicritério (label-setting) em uma única passada: devolve o conjunto
+        de Pareto das rotas considerando (tempo, trocas, acessibilidade), ordenado por
+        tempo. Cada modo de MODOS é uma escalarização monotônica desses critérios,
+        então a melhor rota de cada modo está no conjunto (ver escolher_rota).
+
+        Os rótulos saem do heap em ordem de tempo + tempo restante exato, então a
+        primeira rota que chega é a mais rápida. Com os custos restantes exatos de
+        'simples' e 'acessivel' (custo_ate), rótulos que já não podem empatar com a
+        melhor rota encontrada nesses modos são descartados: o conjunto devolvido é o
+        Pareto restrito às rotas relevantes para algum modo.
+        """
+        snapshot = self.snapshot
+        falta = self.custo_ate(destino, snapshot, "rapido")
+        falta_simples = self.custo_ate(destino, snapshot, "simples")
+        falta_acess = self.custo_ate(destino, snapshot, "acessivel")
+        if min(falta[no] for no in self.nos_por_estacao[origem]) == float("inf"):
+            return []
+        tempo_arco = snapshot.pesos["rapido"]
+        indptr, indices, no_estacao = self.indptr, self.indices, self.no_estacao
+        troca_arco, acess_arco = self.troca_arco, self.acess_arco
+
+        # Rótulo: [tempo, trocas, acess, nó, rótulo_pai, arco, vivo]
+        rotulos: list[list] = []
+        bolsas: dict[int, list[list]] = {}  # nó → rótulos não dominados
+        finais: list[list] = []
+        # Melhores custos já alcançados nos modos 'simples' e 'acessivel'
+        teto_simples = teto_acess = float("inf")
+
+        heap = []
+        for no in self.nos_por_estacao[origem]:
+            rotulo = [0.0, 0, 0, no, None, -1, True]
+            bolsas[no] = [rotulo]
+            heap.append((falta[no], 0, 0, len(rotulos)))
+            rotulos.append(rotulo)
+        heapq.heapify(heap)
+
+        while heap:
+            f, tr, ac, r = heapq.heappop(heap)
+            if f > teto_simples and f > teto_acess:
+                break
+            rotulo = rotulos[r]
+            if not rotulo[6]:
+                continue
+            t, u = rotulo[0], rotulo[3]
+            if t + PENALIDADE_BALDEACAO * tr + falta_simples[u] > teto_simples and \
+               t + PENALIDADE_ACESSIVEL * ac + falta_acess[u] > teto_acess:
+                continue
+            if no_estacao[u] == destino:
+                # Poda pelo alvo: descarta se uma rota completa já domina este rótulo
+                if any(x[0] <= t and x[1] <= tr and x[2] <= ac for x in finais):
+                    continue
+                teto_simples = min(teto_simples, t + PENALIDADE_BALDEACAO * tr)
+                teto_acess = min(teto_acess, t + PENALIDADE_ACESSIVEL * ac)
+                finais.append(rotulo)
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nt, ntr, nac = t + tempo_arco[k], tr + troca_arco[k], ac + acess_arco[k]
+                if nt + PENALIDADE_BALDEACAO * ntr + falta_simples[v] > teto_simples and \
+                   nt + PENALIDADE_ACESSIVEL * nac + falta_acess[v] > teto_acess:
+                    continue
+                bolsa = bolsas.get(v)
+                if bolsa is None:
+                    bolsa = bolsas[v] = []
+                elif any(x[0] <= nt and x[1] <= ntr and x[2] <= nac for x in bolsa):
+                    continue
+                else:
+                    for x in bolsa:
+                        if nt <= x[0] and ntr <= x[1] and nac <= x[2]:
+                            x[6] = False
+                    bolsa[:] = [x for x in bolsa if x[6]]
+                novo = [nt, ntr, nac, v, rotulo, k, True]
+                bolsa.append(novo)
+                heapq.heappush(heap, (nt + falta[v], ntr, nac, len(rotulos)))
+                rotulos.append(novo)
+
+        rotas = []
+        for rotulo in finais:
+            t, tr = rotulo[0], rotulo[1]
+            arcos = []
+            while rotulo[4] is not None:
+                arcos.append(rotulo[5])
+                rotulo = rotulo[4]
+            rotas.append(self._montar_rota(rotulo[3], arcos[::-1], snapshot, t, tr))
+        return sorted(rotas, key=lambda rota: (rota.tempo, rota.trocas, rota.acessibilidade))
+
+    def _montar_rota(self, no: int, arcos: list[int], snapshot: Snapshot,
+                     custo: float, trocas: int) -> Rota:
+        nos = [no] + [self.indices[k] for k in arcos]
+        tempo = sum(snapshot.pesos["rapido"][k] for k in arcos)
+        acessibilidade = sum(self.acess_arco[k] for k in arcos)
+
+        estacoes, baldeacoes = [], []
+        linhas = [self.linhas[self.no_linha[nos[0]]]]
+        for anterior, atual in zip([-1] + nos[:-1], nos):
+            nome = self.nomes[self.no_estacao[atual]]
+            if not estacoes or estacoes[-1] != nome:
+                estacoes.append(nome)
+            if anterior >= 0 and self.no_linha[anterior] != self.no_linha[atual]:
+                baldeacoes.append((
+                    self.nomes[self.no_estacao[anterior]],
+                    self.linhas[self.no_linha[anterior]],
+                    self.linhas[self.no_linha[atual]],
+                ))
+                linhas.append(self.linhas[self.no_linha[atual]])
+        return Rota(estacoes, baldeacoes, custo, trocas, tempo, acessibilidade, linhas)
+
+
+def custo_modo(rota: Rota, modo: str) -> float:
+    """
+    Custo de uma rota em um modo, a partir dos seus critérios (mesmos pesos de aplicar_status).
+    """
+    if modo == "simples":
+        return rota.tempo + PENALIDADE_BALDEACAO * rota.trocas
+    if modo == "acessivel":
+        return rota.tempo + PENALIDADE_ACESSIVEL * rota.acessibilidade
+    return rota.tempo
+
+def escolher_rota(rotas: list[Rota], modo: str) -> Rota | None:
+    """
+    Melhor rota de um conjunto de Pareto para o modo: menor custo, depois menos trocas.
+    """
+    if not rotas:
+        return None
+    melhor = min(rotas, key=lambda rota: (custo_modo(rota, modo), rota.trocas))
+    return replace(melhor, custo=custo_modo(melhor, modo))
@@ -5,122 +5,98 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
-import unicodedata
-import requests
-import networkx as nx
-from nlp_processor import nlp_pipeline, load_linhas
+import itertools
+import threading
+import metrics
+from cache import LRUCache
+from nlp_processor import nlp_pipeline, load_linhas, STATION_MATCHER
+from services.rota_engine import MODOS, Rota, RoutingEngine, escolher_rota, normalize, penalidade_status
 
 # Carrega dados de linhas
 dados = load_linhas()
 
-# Constante base de tempo (em minutos) por aresta
-TEMPO_BASE = 3
+# Situação das linhas { 'nome_linha_normalizada': 'situação' }, mantida pelo
+# StatusPoller (services/status_service.py) via atualizar_status
+status_operacao: dict[str, str] = {}
 
-# Grafo global
-G = nx.Graph()
+# Motor de rotas (rede expandida por linha, CSR + IDs inteiros), construído uma única vez
+engine = RoutingEngine(dados.get("linhas", []), status_operacao, dados.get("baldeacoes", []))
 
-def normalize(texto: str) -> str:
-    return unicodedata.normalize("NFKD", texto).encode("ASCII", "ignore").decode("ASCII").casefold()
+# Cache de rotas prontas: (origem, destino, modo) → (texto, versões das linhas usadas, época)
+ROUTE_CACHE = LRUCache(
+    max_entradas=int(os.getenv("CECI_ROUTE_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("CECI_ROUTE_CACHE_TTL", 900)),
+)
+# Versão do status de cada linha (incrementada quando a penalidade da linha muda)
+versao_linha: dict[str, int] = {linha: 0 for linha in engine.linhas}
+# Incrementada quando alguma linha melhora: uma rota que evitava a linha pode deixar de ser a melhor
+epoca_melhora = 0
+_status_lock = threading.Lock()
 
-def get_status() -> dict:
+# Pares mais frequentes no horário de pico, usados no aquecimento do cache
+PARES_FREQUENTES = list(itertools.permutations(["Sé", "Luz", "Paulista", "Barra Funda", "República", "Paraíso"], 2))
+
+def atualizar_status(novo_status: dict) -> list[str]:
     """
-    (Opcional) Consulta API externa para saber se uma linha está com problema:
-    retorna dicionário { 'nome_linha_normalizada': 'situação' }
-    Se não precisar, pode deixar vazio.
+    Aplica um novo mapa { 'nome_linha_normalizada': 'situação' } e devolve as linhas
+    cuja penalidade mudou. Só os pesos dessas linhas são reescritos no motor, e só
+    as entradas do cache que as usam ficam inválidas (ou todas, se alguma melhorou).
     """
-    status_operacao = {}
-    try:
-        resp = requests.get(
-            "https://www.diretodostrens.com.br/api/status",
-            verify=False,
-            timeout=5,
-        )
-        resp.raise_for_status()
-        for item in resp.json():
-            nome = normalize(item.get("nome", ""))
-            status_operacao[nome] = item.get("situacao", "").strip().lower()
-    except Exception:
-        pass
-    return status_operacao
-
-status_operacao = get_status()
-
-def _build_graph():
-    """
-    Monta o grafo G: cada estação é um nó, cada par adjacente de estações
-    vira uma aresta com peso inicial TEMPO_BASE e atributo 'linha'.
-    """
-    for linha in dados.get("linhas", []):
-        nome_linha = linha.get("nome", "")
-        estacoes = linha.get("estacoes", [])
-        for a, b in zip(estacoes[:-1], estacoes[1:]):
-            G.add_edge(a, b, tempo=TEMPO_BASE, linha=nome_linha)
-
-    # Marca baldeações: se uma estação aparece em ≥2 linhas, G.nodes[est]['baldeacoes'] armazenará essa lista de linhas
-    for est in list(G.nodes):
-        linhas_na_est = [l["nome"] for l in dados.get("linhas", []) if est in l["estacoes"]]
-        if len(linhas_na_est) > 1:
-            G.nodes[est]["baldeacoes"] = linhas_na_est
-
-# Constroi o grafo uma única vez
-_build_graph()
-
-def calcular_peso(u: str, v: str, modo: str = "rapido") -> float:
-    """
-    Retorna peso da aresta (u,v), aumentando se a linha estiver com falha
-    ou se, no modo 'simples', existir baldeação.
-    Como estamos usando apenas 'rapido', praticamente devolve TEMPO_BASE (+ penalidade).
-    """
-    attr = G.get_edge_data(u, v) or {}
-    tempo = attr.get("tempo", TEMPO_BASE)
-    linha = attr.get("linha", "")
-    situacao = status_operacao.get(normalize(linha), "")
-    # Se a linha tiver alguma falha, penaliza:
-    if any(palavra in situacao for palavra in ["reduzida", "falha", "interrup"]):
-        tempo += 10
-    # No modo 'simples', penaliza cada baldeação:
-    if modo == "simples" and G.nodes[u].get("baldeacoes"):
-        tempo += 3
-    # No modo 'acessivel', penaliza fixo:
-    elif modo == "acessivel":
-        tempo += 2
-    return tempo
-
-def custo_total(caminho: list[str], modo: str) -> float:
-    """
-    Soma o peso de cada aresta em 'caminho'
-    """
-    total = 0.0
-    for u, v in zip(caminho[:-1], caminho[1:]):
-        total += calcular_peso(u, v, modo)
-    return total
-
-def detectar_baldeacoes(caminho: list[str]) -> list[tuple[str,str,str]]:
-    """
-    Recebe uma lista de estações (caminho), e devolve lista de tuplas
-    (estação_de_baldeação, linha_anterior, linha_nova) somente quando 
-    a linha do segmento muda de um par para o próximo.
-    """
-    baldeacoes = []
-    # Compila a lista de linhas para cada par adjacente
-    segmentos = []
-    for u, v in zip(caminho[:-1], caminho[1:]):
-        data = G.get_edge_data(u, v) or {}
-        segmentos.append(data.get("linha", ""))
-
-    # Se a linha no índice i for diferente de i-1, existe baldeação na estação i
-    for i in range(1, len(segmentos)):
-        if segmentos[i] != segmentos[i - 1]:
-            est_transferencia = caminho[i]
-            linha_anterior = segmentos[i - 1]
-            linha_nova = segmentos[i]
-            baldeacoes.append((est_transferencia, linha_anterior, linha_nova))
-    return baldeacoes
-
-def obter_melhor_rota(origem: str = None, destino: str = None) -> str:
+    global status_operacao, epoca_melhora
+    with _status_lock:
+        alteradas = {}
+        melhorou = False
+        for id_linha, linha in enumerate(engine.linhas):
+            chave = normalize(linha)
+            antes = penalidade_status(status_operacao.get(chave, ""))
+            depois = penalidade_status(novo_status.get(chave, ""))
+            if antes != depois:
+                alteradas[id_linha] = depois
+                versao_linha[linha] += 1
+                melhorou = melhorou or depois < antes
+        status_operacao = dict(novo_status)
+        if alteradas:
+            engine.atualizar_linhas(alteradas)
+            if melhorou:
+                epoca_melhora += 1
+        return [engine.linhas[id_linha] for id_linha in alteradas]
+
+def _entrada_valida(entrada: tuple) -> bool:
+    _, versoes, epoca = entrada
+    return epoca == epoca_melhora and all(versao_linha[linha] == v for linha, v in versoes)
+
+def _cache_get(chave: tuple) -> str | None:
+    entrada = ROUTE_CACHE.get(chave, validar=_entrada_valida)
+    return entrada[0] if entrada else None
+
+def _versoes_atuais() -> tuple[dict[str, int], int]:
+    """
+    Versões das linhas e época lidas antes da busca: se o StatusPoller mudar o
+    status durante a busca, a rota calculada com o status antigo não é guardada
+    como se fosse do novo.
+    """
+    with _status_lock:
+        return dict(versao_linha), epoca_melhora
+
+def _cache_set(chave: tuple, texto: str, rotas: list[Rota], versoes: tuple[dict[str, int], int]):
+    linhas = {linha for rota in rotas for linha in rota.linhas}
+    versao, epoca = versoes
+    ROUTE_CACHE.set(chave, (texto, tuple((linha, versao[linha]) for linha in linhas), epoca))
+
+def cache_stats() -> dict:
+    return ROUTE_CACHE.stats()
+
+# Motivo exibido para cada modo de rota
+MOTIVOS = {
+    "rapido": "rota mais rápida considerando falhas e transferências.",
+    "simples": "menos trocas de linha, mesmo que leve um pouco mais de tempo.",
+    "acessivel": "prioriza linhas com melhor acessibilidade.",
+}
+
+def _validar_estacoes(origem: str | None, destino: str | None) -> tuple[str, str] | str:
     """
     Se origem ou destino for None, usa nlp_pipeline para extrair.
-    Só calcula modo “rapido” (A* + heurística de número de saltos).
+    Retorna (origem, destino) ou a mensagem de erro.
     """
     if not origem or not destino:
         resultado = nlp_pipeline(f"{origem or ''} até {destino or ''}")
@@ -129,52 +105,125 @@ def obter_melhor_rota(origem: str = None, destino: str = None) -> str:
         origem, destino = resultado["origem"], resultado["destino"]
 
     # Garante que as estações existem:
-    all_stations = [s for linha in dados.get("linhas", []) for s in linha.get("estacoes", [])]
-    if origem not in all_stations or destino not in all_stations:
+    if origem not in STATION_MATCHER or destino not in STATION_MATCHER:
         return f"Não encontrei a estação “{origem}” ou “{destino}”."
+    return origem, destino
 
-    modo = "rapido"
-    try:
-        # Heurística: TEMPO_BASE × (número de saltos)
-        heur = lambda u, v: TEMPO_BASE * (len(nx.shortest_path(G, u, v)) - 1)
-        caminho = nx.astar_path(
-            G, origem, destino,
-            heuristic=heur,
-            weight=lambda u, v, d: calcular_peso(u, v, modo)
-        )
-    except nx.NetworkXNoPath:
-        return f"Não há rota disponível de {origem} até {destino}."
-
-    custo = custo_total(caminho, modo)
-    baldeacoes = detectar_baldeacoes(caminho)
-    rota_str = " → ".join(caminho)
+def formatar_rota(origem: str, destino: str, modo: str, rota: Rota,
+                  titulo: str = "Rota recomendada") -> str:
+    rota_str = " → ".join(rota.estacoes)
 
     texto = [
-        f"🚌 **Rota recomendada** de {origem} até {destino}:",
+        f"🚌 **{titulo}** de {origem} até {destino}:",
         f"   • 🚆 Modo: {modo.capitalize()}",
         f"   • 📍 Caminho: {rota_str}",
-        f"   • ⏱️ Tempo estimado: {custo:.0f} minutos",
+        f"   • ⏱️ Tempo estimado: {rota.tempo:.0f} minutos",
     ]
 
-    if baldeacoes:
+    if rota.baldeacoes:
         texto.append("   • 🔄 Trocas de linha:")
-        for est, ant, novo in baldeacoes:
+        for est, ant, novo in rota.baldeacoes:
             texto.append(f"      – Em {est}: de {ant} para {novo}")
     else:
         texto.append("   • 🔄 Sem trocas de linha")
 
-    texto.append("   • 🧭 Motivo: rota mais rápida considerando falhas e transferências.")
+    texto.append(f"   • 🧭 Motivo: {MOTIVOS[modo]}")
     return "\n".join(texto)
 
-def process_user_query(user_input: str) -> str:
+def obter_melhor_rota(origem: str = None, destino: str = None, modo: str = "rapido") -> str:
     """
-    Chamado pelo pipeline. Retorna string formatada (ou mensagem de erro).
+    Calcula a melhor rota em um único modo (A* + heurística de número de saltos pré-calculada).
+    """
+    if modo not in MODOS:
+        return f"Não conheço o modo “{modo}”. Use um destes: {', '.join(MODOS)}."
+    validado = _validar_estacoes(origem, destino)
+    if isinstance(validado, str):
+        return validado
+    origem, destino = validado
+
+    texto = _cache_get((origem, destino, modo))
+    if texto is not None:
+        return texto
+
+    versoes = _versoes_atuais()
+    rota = engine.buscar(engine.ids[origem], engine.ids[destino], modo)
+    if rota is None:
+        return f"Não há rota disponível de {origem} até {destino}."
+    texto = formatar_rota(origem, destino, modo, rota)
+    _cache_set((origem, destino, modo), texto, [rota], versoes)
+    return texto
+
+def obter_rotas(origem: str = None, destino: str = None) -> str:
+    """
+    Uma única busca multicritério devolve as opções mais rápida, com menos trocas
+    e mais acessível. Opções iguais a uma já listada são omitidas.
+    """
+    validado = _validar_estacoes(origem, destino)
+    if isinstance(validado, str):
+        metrics.ROTAS.inc("estacao_desconhecida")
+        return validado
+    origem, destino = validado
+
+    texto = _cache_get((origem, destino, "todos"))
+    if texto is not None:
+        metrics.ROTAS.inc("cache")
+        return texto
+
+    versoes = _versoes_atuais()
+    with metrics.estagio("rota_busca"):
+        pareto = engine.buscar_pareto(engine.ids[origem], engine.ids[destino])
+    if not pareto:
+        metrics.ROTAS.inc("sem_rota")
+        return f"Não há rota disponível de {origem} até {destino}."
+
+    blocos, vistas = [], []
+    for modo in MODOS:
+        rota = escolher_rota(pareto, modo)
+        if any(rota.estacoes == v.estacoes and rota.baldeacoes == v.baldeacoes for v in vistas):
+            continue
+        titulo = "Rota recomendada" if not blocos else "Alternativa"
+        blocos.append(formatar_rota(origem, destino, modo, rota, titulo))
+        vistas.append(rota)
+    texto = "\n\n".join(blocos)
+    # Só as linhas das rotas exibidas importam: piorar outra linha não muda a escolha
+    _cache_set((origem, destino, "todos"), texto, vistas, versoes)
+    metrics.ROTAS.inc("ok")
+    return texto
+
+def aquecer_cache(pares: list[tuple[str, str]] | None = None):
+    """
+    Pré-calcula as rotas dos pares mais frequentes (padrão: PARES_FREQUENTES).
+    """
+    for origem, destino in pares or PARES_FREQUENTES:
+        obter_rotas(origem, destino)
+
+def process_user_query(user_input: str, texto_norm: str | None = None) -> str:
+    """
+    Chamado pelo pipeline (com o texto já normalizado do RequestContext).
+    Retorna string formatada (ou mensagem de erro).
     """
     try:
-        query = nlp_pipeline(user_input)
+        with metrics.estagio("rota_extracao"):
+            query = nlp_pipeline(user_input, texto_norm)
         if "error" in query:
+            metrics.ROTAS.inc("nao_entendida")
             return query["error"]
         origem, destino = query["origem"], query["destino"]
-        return obter_melhor_rota(origem, destino)
+        return obter_rotas(origem, destino)
     except Exception as e:
+        metrics.ROTAS.inc("erro")
         return f"Desculpe, algo deu errado ao calcular a rota: {e}"
+
+def aquecer():
+    """
+    Extração de estações e uma busca de ensaio, fora do cache de rotas e das
+    métricas; chamada no worker do estágio "rota" (inicializacao.py).
+    """
+    nlp_pipeline("quero ir da Sé até a Luz")
+    nomes = list(engine.ids)
+    engine.buscar_pareto(engine.ids[nomes[0]], engine.ids[nomes[-1]])
+
+# Aquecimento opcional do cache com os N pares mais frequentes (CECI_ROUTE_CACHE_WARM=N)
+_warm = int(os.getenv("CECI_ROUTE_CACHE_WARM", 0))
+if _warm:
+    aquecer_cache(PARES_FREQUENTES[:_warm])
@@ -0,0 +1,132 @@
+# services/status_service.py
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from services.rota_engine import normalize
+
+STATUS_URL = os.getenv("CECI_STATUS_URL", "https://www.diretodostrens.com.br/api/status")
+STATUS_FILE = os.getenv("CECI_STATUS_FILE", "")
+STATUS_INTERVAL = float(os.getenv("CECI_STATUS_INTERVAL", 60))
+STATUS_TIMEOUT = float(os.getenv("CECI_STATUS_TIMEOUT", 5))
+STATUS_VERIFY_TLS = os.getenv("CECI_STATUS_VERIFY_TLS", "0") == "1"
+
+def parse_status(itens: list[dict]) -> dict:
+    """
+    Converte a resposta da API ([{"nome": ..., "situacao": ...}, ...]) em
+    { 'nome_linha_normalizada': 'situação' }.
+    """
+    status_operacao = {}
+    for item in itens:
+        nome = normalize(item.get("nome", ""))
+        status_operacao[nome] = item.get("situacao", "").strip().lower()
+    return status_operacao
+
+
+class HttpStatusSource:
+    """
+    Fonte HTTP (diretodostrens ou um servidor local de teste) com cliente
+    reaproveitado entre consultas (pool de conexões keep-alive).
+    """
+
+    def __init__(self, url: str = STATUS_URL, timeout: float = STATUS_TIMEOUT,
+                 verify: bool = STATUS_VERIFY_TLS):
+        self.url = url
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            verify=verify,
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=1),
+        )
+
+    async def fetch(self) -> dict:
+        resp = await self._client.get(self.url)
+        resp.raise_for_status()
+        return parse_status(resp.json())
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class FileStatusSource:
+    """
+    Fonte local: arquivo JSON no mesmo formato da API. Útil em testes e desenvolvimento.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return parse_status(json.load(f))
+
+    async def aclose(self):
+        pass
+
+
+def default_source():
+    return FileStatusSource(STATUS_FILE) if STATUS_FILE else HttpStatusSource()
+
+
+class StatusPoller:
+    """
+    Tarefa asyncio que consulta a fonte de status a cada 'intervalo' segundos e
+    repassa o resultado para 'aplicar' (rota_service.atualizar_status), que só
+    atualiza os pesos das linhas cuja situação mudou.
+    """
+
+    def __init__(self, source, aplicar, intervalo: float = STATUS_INTERVAL):
+        self.source = source
+        self.aplicar = aplicar
+        self.intervalo = intervalo
+        self.ultimo_sucesso: float | None = None
+        self.ultimo_erro: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def idade_ultimo_sucesso(self) -> float | None:
+        """
+        Segundos desde a última consulta bem-sucedida (None se nunca houve uma).
+        """
+        if self.ultimo_sucesso is None:
+            return None
+        return time.monotonic() - self.ultimo_sucesso
+
+    async def poll_once(self) -> list[str]:
+        try:
+            alteradas = self.aplicar(await self.source.fetch())
+        except Exception as e:
+            self.ultimo_erro = repr(e)
+            return []
+        self.ultimo_sucesso = time.monotonic()
+        self.ultimo_erro = None
+        return alteradas
+
+    async def run(self):
+        while True:
+            alteradas = await self.poll_once()
+            if alteradas:
+                print(f"Status das linhas atualizado: {', '.join(alteradas)}")
+            await asyncio.sleep(self.intervalo)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.source.aclose()
+
+    def info(self) -> dict:
+        return {
+            "ultimo_sucesso_ha_s": self.idade_ultimo_sucesso(),
+            "ultimo_erro": self.ultimo_erro,
+            "intervalo_s": self.intervalo,
+        }